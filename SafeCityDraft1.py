@@ -1,95 +1,1360 @@
-import pdfplumber
-import pandas as pd
-import folium
-from folium.features import DivIcon
+# pdfplumber and pandas are only needed to ingest the PDF, so they are imported where they are used
+# rather than here - a worker serving a prebuilt snapshot never loads them
+import numpy as np
 import requests
 import time
 import os
-from flask import Flask, render_template, jsonify, send_from_directory, request
+import bisect
+import contextlib
+import gzip
+import hashlib
+import json
+import math
+import queue
+import random
+import re
+import shutil
+import struct
+import sqlite3
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from flask import Flask, Response, g, render_template, jsonify, send_from_directory, request, url_for
+
+# brotli is optional - without it payloads are only pre-compressed with gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# fcntl (Unix only) locks the shared metrics directory; gunicorn, the only multi-process setup, needs Unix anyway
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 app = Flask(__name__)
 
 # Directory for static files
 os.makedirs('static', exist_ok=True)
 
-# Function to get coordinates using Nominatim OpenStreetMap API
-def get_coordinates(location_name, state="Telangana", country="India"):
-    """Get coordinates for a location using Nominatim OpenStreetMap API"""
-    print(f"🔍 Geocoding: {location_name}...", end="", flush=True)
-    
-    base_url = "https://nominatim.openstreetmap.org/search"
-    
-    # Append state and country for better results
-    query = f"{location_name}, {state}, {country}"
-    
+# Path to the crime statement PDF - set SAFECITY_PDF_PATH, or leave it unset to use sample data
+# e.g. r"C:\Users\kp\Downloads\TELANGANA STATE CRIME STATEMENT.pdf"
+PDF_PATH = os.environ.get("SAFECITY_PDF_PATH") or None
+
+# Directory where each process publishes its counters and histograms, so /metrics can sum them
+# across gunicorn workers (gunicorn.conf.py sets one). Unset, /metrics reports this process only.
+METRICS_DIR = os.environ.get("SAFECITY_METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = 1.0
+
+# Latency buckets in seconds, shared by every histogram
+METRIC_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, labels, extra=()):
+    # {name="value",...} with backslashes, quotes and newlines escaped
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """A monotonically increasing count per label set"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """{labels: value} with the label values as strings, so it survives a round trip through JSON"""
+        with self._lock:
+            return {tuple(str(label) for label in labels): value for labels, value in self._values.items()}
+
+    @staticmethod
+    def merge(into, labels, value):
+        into[labels] = into.get(labels, 0) + value
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        values = self.snapshot() if values is None else values
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """A latency histogram per label set
+
+    observe() is one bisect and a short locked update, so it is cheap enough for every
+    request; the cumulative bucket counts Prometheus expects are only built on render().
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=METRIC_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """{labels: [bucket counts, sum, count]} with the label values as strings"""
+        with self._lock:
+            return {tuple(str(label) for label in labels): [list(counts), total, count]
+                    for labels, (counts, total, count) in self._series.items()}
+
+    @staticmethod
+    def merge(into, labels, value):
+        counts, total, count = value
+        merged = into.get(labels)
+        if merged is None:
+            into[labels] = [list(counts), total, count]
+            return
+        merged[0] = [a + b for a, b in zip(merged[0], counts)]
+        merged[1] += total
+        merged[2] += count
+
+    def render(self, series=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        series = self.snapshot() if series is None else series
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Counters and histograms, plus gauges read from the caches at scrape time
+
+    With a directory set, each process writes its counters and histograms to
+    metrics-<pid>.json there (every METRICS_FLUSH_SECONDS and on each scrape), and render()
+    sums every file - so whichever gunicorn worker answers /metrics reports the whole server.
+    Files of exited workers are folded into metrics-archive.json, keeping the totals monotonic.
+    Gauges describe the process that answered.
+    """
+
+    def __init__(self, directory=None):
+        self.metrics = []
+        self.gauge_collectors = []
+        self.directory = directory
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=METRIC_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauges(self, collect):
+        """Register collect() -> [(name, help, {((label, value), ...): value})], called on every scrape"""
+        self.gauge_collectors.append(collect)
+        return collect
+
+    def reset(self):
+        """Drop every recorded sample - run in forked children, whose parent reports its own samples"""
+        for metric in self.metrics:
+            metric.reset()
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+
+    def _process_path(self, pid):
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    @contextlib.contextmanager
+    def _directory_lock(self, exclusive):
+        # Readers share the lock; folding a dead worker's file into the archive takes it alone,
+        # so a scrape never sees the samples twice or not at all
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_state(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, path, state):
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def _merge_state(self, merged, state):
+        for metric in self.metrics:
+            for labels, value in state.get(metric.name, ()):
+                metric.merge(merged[metric.name], tuple(labels), value)
+
+    def flush(self):
+        """Write this process's counters and histograms to its file in the shared directory"""
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        state = {metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+                 for metric in self.metrics}
+        self._write_state(self._process_path(os.getpid()), state)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(METRICS_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {self.directory}: {e}")
+
+    def start_flusher(self):
+        """Start this process's background flush thread, once per pid (threads don't survive a fork)"""
+        if self.directory is None or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def fold_process(self, pid):
+        """Add an exited process's samples to metrics-archive.json and remove its file"""
+        if self.directory is None:
+            return
+        path = self._process_path(pid)
+        if not os.path.exists(path):
+            return
+        archive_path = os.path.join(self.directory, "metrics-archive.json")
+        with self._directory_lock(exclusive=True):
+            merged = {metric.name: {} for metric in self.metrics}
+            self._merge_state(merged, self._read_state(archive_path))
+            self._merge_state(merged, self._read_state(path))
+            self._write_state(archive_path, {name: [[list(labels), value] for labels, value in values.items()]
+                                             for name, values in merged.items()})
+            os.remove(path)
+
+    def _collect(self):
+        # {metric name: {labels: value}} for this process, or summed over every process sharing the directory
+        if self.directory is None:
+            return {metric.name: metric.snapshot() for metric in self.metrics}
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"⚠️ Could not write metrics to {self.directory}: {e}")
+            return {metric.name: metric.snapshot() for metric in self.metrics}
+        merged = {metric.name: {} for metric in self.metrics}
+        with self._directory_lock(exclusive=False):
+            for name in sorted(os.listdir(self.directory)):
+                if name.startswith("metrics-") and name.endswith(".json"):
+                    self._merge_state(merged, self._read_state(os.path.join(self.directory, name)))
+        return merged
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        collected = self._collect()
+        for metric in self.metrics:
+            lines.extend(metric.render(collected[metric.name]))
+        for collect in self.gauge_collectors:
+            for name, help_text, values in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in values.items():
+                    lines.append(f"{name}{_format_labels([k for k, _ in labels], [v for _, v in labels])} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(METRICS_DIR)
+# A forked child starts from zero - its parent's samples are already in the parent's own file
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=metrics.reset)
+STAGE_SECONDS = metrics.histogram("safecity_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+HTTP_REQUEST_SECONDS = metrics.histogram("safecity_http_request_seconds", "Request latency by route",
+                                         ("endpoint", "method", "status"))
+GEOCODER_UPSTREAM_SECONDS = metrics.histogram("safecity_geocoder_upstream_seconds",
+                                              "Latency of Nominatim requests", ("outcome",))
+GEOCODER_ERRORS = metrics.counter("safecity_geocoder_errors_total", "Failed Nominatim requests", ("error",))
+# Counted where the lookups happen rather than read from each cache's stats(), so the totals are
+# summed across workers like every other counter
+CACHE_LOOKUPS = metrics.counter("safecity_cache_lookups_total", "Lookups per cache and result", ("cache", "result"))
+BATCH_GEOCODER_REQUESTS = metrics.counter("safecity_batch_geocoder_requests_total",
+                                          "Nominatim requests sent by the batch geocoder, by result", ("result",))
+
+@contextlib.contextmanager
+def timed_stage(stage):
+    """Record how long the with-block takes in safecity_stage_seconds{stage=...}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+# Nominatim search endpoint - point SAFECITY_NOMINATIM_URL at stub_nominatim.py to test offline
+NOMINATIM_URL = os.environ.get("SAFECITY_NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+
+# Add a user-agent to comply with Nominatim usage policy
+NOMINATIM_HEADERS = {
+    "User-Agent": "TelanganaDistrict_CrimeMap/1.0"
+}
+
+def nominatim_search(query, url=None, timeout=5, session=None):
+    """Single Nominatim request - returns [lat, lon], or None if nothing matched. Raises on network/HTTP errors.
+
+    Pass a requests.Session to reuse its keep-alive connections.
+    """
     params = {
         "q": query,
         "format": "json",
         "limit": 1,
     }
-    
-    # Add a user-agent to comply with Nominatim usage policy
-    headers = {
-        "User-Agent": "TelanganaDistrict_CrimeMap/1.0"
-    }
-    
+    started = time.perf_counter()
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=5)
+        response = (session or requests).get(url or NOMINATIM_URL, params=params, headers=NOMINATIM_HEADERS,
+                                             timeout=timeout)
+        response.raise_for_status()
         data = response.json()
-        
-        # If we got results, return the first one's coordinates
-        if data and len(data) > 0:
-            lat = float(data[0]["lat"])
-            lon = float(data[0]["lon"])
-            print(f" ✅ Found: [{lat}, {lon}]")
-            return [lat, lon]
-        else:
-            print(f" ❌ Not found")
-            return None
     except Exception as e:
-        print(f" ❌ Error: {str(e)[:50]}...")
+        GEOCODER_UPSTREAM_SECONDS.observe(time.perf_counter() - started, "error")
+        GEOCODER_ERRORS.inc(type(e).__name__)
+        raise
+    
+    # If we got results, return the first one's coordinates
+    if data and len(data) > 0:
+        GEOCODER_UPSTREAM_SECONDS.observe(time.perf_counter() - started, "found")
+        return [float(data[0]["lat"]), float(data[0]["lon"])]
+    GEOCODER_UPSTREAM_SECONDS.observe(time.perf_counter() - started, "not_found")
+    return None
+
+# What a failed Nominatim call raises: network and HTTP errors, or a body that isn't the JSON we expect
+UPSTREAM_ERRORS = (requests.RequestException, ValueError, KeyError, IndexError, TypeError)
+
+# Circuit breaker for Nominatim: once at least half of the calls in the last 30 seconds failed
+# (with 10 or more calls), fail fast for 15 seconds, then let one probe request through
+BREAKER_FAILURE_RATIO = float(os.environ.get("SAFECITY_BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_MIN_CALLS = 10
+BREAKER_WINDOW = 30.0
+BREAKER_COOLDOWN = float(os.environ.get("SAFECITY_BREAKER_COOLDOWN", "15"))
+# Queries that just failed upstream are not retried for this long
+UPSTREAM_FAILURE_TTL = 30.0
+# Keep-alive connections kept open to Nominatim per process
+UPSTREAM_POOL_SIZE = 16
+
+
+class UpstreamUnavailable(Exception):
+    """Nominatim wasn't asked: the breaker is open, the query failed moments ago, or the deadline ran out"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class Deadline:
+    """A time budget started by a route: how long it waits for upstream work before giving up"""
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+
+class CircuitBreaker:
+    """closed -> open when the failure ratio over a rolling window crosses a threshold; after
+    the cooldown one probe call is let through (half-open) and its outcome closes or re-opens it"""
+
+    def __init__(self, failure_ratio=BREAKER_FAILURE_RATIO, min_calls=BREAKER_MIN_CALLS,
+                 window=BREAKER_WINDOW, cooldown=BREAKER_COOLDOWN):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened = 0
+        self.rejected = 0
+        self._calls = deque()       # (time, ok)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead - otherwise raises UpstreamUnavailable"""
+        with self._lock:
+            if self.state == "open":
+                wait = self._opened_at + self.cooldown - time.monotonic()
+                if wait > 0 or self._probing:
+                    self.rejected += 1
+                    raise UpstreamUnavailable("Geocoding service is unavailable", retry_after=max(wait, 1))
+                # Cooldown over - this caller is the probe
+                self._probing = True
+            return True
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if self._probing:
+                self._probing = False
+                self._calls.clear()
+                if ok:
+                    self.state = "closed"
+                else:
+                    self._opened_at = now
+                return
+            self._calls.append((now, ok))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            failures = sum(1 for _, call_ok in self._calls if not call_ok)
+            if (self.state == "closed" and len(self._calls) >= self.min_calls
+                    and failures / len(self._calls) >= self.failure_ratio):
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = now
+
+    def stats(self):
+        with self._lock:
+            failures = sum(1 for _, ok in self._calls if not ok)
+            return {"state": self.state, "opened": self.opened, "rejected": self.rejected,
+                    "recentCalls": len(self._calls), "recentFailures": failures}
+
+
+class NominatimClient:
+    """The one way this process talks to Nominatim
+
+    All calls share a pooled keep-alive session and one circuit breaker, and each one gets the
+    client's own timeout. Queries that failed are remembered for UPSTREAM_FAILURE_TTL seconds
+    and fail fast instead of being re-sent.
+    """
+
+    def __init__(self, url=None, timeout=5, pool_size=UPSTREAM_POOL_SIZE, breaker=None,
+                 failure_ttl=UPSTREAM_FAILURE_TTL):
+        self.url = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.failure_ttl = failure_ttl
+        self.calls = 0
+        self.failures = 0
+        self.recent_failure_hits = 0
+        self._failed = {}           # query -> monotonic time the failure expires
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def session(self):
+        # Created lazily, and re-created in forked worker processes so they don't share sockets
+        if self._session is None or self._pid != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
+    def search(self, query, url=None, fail_fast=True):
+        """[lat, lon] or None like nominatim_search(); raises UpstreamUnavailable without calling
+        Nominatim, or requests/parsing errors when the call itself fails
+
+        fail_fast=False skips the recent-failure check, for callers that do their own retries.
+        """
+        now = time.monotonic()
+        with self._lock:
+            failed_until = self._failed.get(query) if fail_fast else None
+            if failed_until is not None:
+                if failed_until > now:
+                    self.recent_failure_hits += 1
+                    raise UpstreamUnavailable("Geocoding failed moments ago", retry_after=failed_until - now)
+                del self._failed[query]
+
+        self.breaker.allow()
+        with self._lock:
+            self.calls += 1
+        ok = False
+        try:
+            coords = nominatim_search(query, url=url or self.url, timeout=self.timeout, session=self.session())
+            ok = True
+        except UPSTREAM_ERRORS:
+            with self._lock:
+                self.failures += 1
+                self._failed[query] = time.monotonic() + self.failure_ttl
+                # Drop expired entries now and then so the map stays small
+                if len(self._failed) > 1000:
+                    now = time.monotonic()
+                    self._failed = {q: t for q, t in self._failed.items() if t > now}
+            raise
+        finally:
+            # Whatever happened, the breaker hears about it - a half-open probe that never
+            # reported back would keep the breaker open for good
+            self.breaker.record(ok)
+        return coords
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "recentFailureHits": self.recent_failure_hits,
+            "breaker": self.breaker.stats(),
+        }
+
+
+nominatim_client = NominatimClient()
+
+# Persistent geocode cache so a place is only ever looked up on Nominatim once
+GEOCODE_CACHE_PATH = os.environ.get("SAFECITY_GEOCODE_CACHE", "geocode_cache.sqlite3")
+GEOCODE_CACHE_TTL = 30 * 24 * 3600          # found places, 30 days
+# places Nominatim didn't know, 1 day - a misspelt place shouldn't be re-asked on every request
+GEOCODE_NEGATIVE_TTL = int(os.environ.get("SAFECITY_GEOCODE_NEGATIVE_TTL", 24 * 3600))
+GEOCODE_CACHE_MAX_ENTRIES = 50000
+# Cache hits only note the access time in memory; the notes are written in one batch with the
+# next put, or once this many have piled up or this many seconds have passed
+GEOCODE_TOUCH_BATCH = 256
+GEOCODE_TOUCH_INTERVAL = 30.0
+
+def normalise_geocode_query(location, state="Telangana", country="India"):
+    """Cache key for a geocoding query: case-folded, whitespace-collapsed, without state/country suffixes"""
+    def clean(text):
+        text = re.sub(r"\s+", " ", str(text or "").casefold())
+        return text.strip(" ,.")
+
+    state_key = clean(state)
+    country_key = clean(country)
+    parts = [clean(part) for part in str(location).split(",")]
+    parts = [part for part in parts if part]
+    # "Gachibowli, Hyderabad, Telangana, India" and "gachibowli,  hyderabad" share one key
+    while parts and parts[-1] in (state_key, country_key):
+        parts.pop()
+    return f"{', '.join(parts)}|{state_key}|{country_key}"
+
+
+class GeocodeCache:
+    """SQLite-backed geocode cache with TTLs, separate negative entries and LRU eviction
+
+    Found coordinates and misses are stored in the same table; misses (found = 0) get
+    the shorter negative TTL. When the table grows past max_entries the least recently
+    used rows are evicted. Reads don't write: access times of hits are kept in memory
+    and saved in batches.
+    """
+
+    MISSING = (False, None)
+
+    def __init__(self, path, ttl=GEOCODE_CACHE_TTL, negative_ttl=GEOCODE_NEGATIVE_TTL,
+                 max_entries=GEOCODE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._touched = {}          # key -> last access time not yet written
+        self._touched_since = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # Opened lazily, and re-opened in forked worker processes
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY,"
+                " lat REAL, lon REAL,"
+                " found INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS geocode_last_access ON geocode(last_access)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+            # Access times noted by the parent process belong to its connection
+            self._touched = {}
+        return self._conn
+
+    def _write_touched(self, conn):
+        # Save the pending access times; the caller holds the lock and commits
+        if self._touched:
+            conn.executemany("UPDATE geocode SET last_access = ? WHERE key = ?",
+                             [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched = {}
+        self._touched_since = time.monotonic()
+
+    def lookup(self, key):
+        """Return (True, coords) on a cache hit - coords is None for a cached miss - or (False, None)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT lat, lon, found, created_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc("geocode", "miss")
+                return self.MISSING
+            lat, lon, found, created_at = row
+            ttl = self.ttl if found else self.negative_ttl
+            if now - created_at > ttl:
+                # Left for the next put of this key, or for LRU eviction
+                self.misses += 1
+                CACHE_LOOKUPS.inc("geocode", "miss")
+                return self.MISSING
+            self._touched[key] = now
+            if (len(self._touched) >= GEOCODE_TOUCH_BATCH
+                    or time.monotonic() - self._touched_since > GEOCODE_TOUCH_INTERVAL):
+                self._write_touched(conn)
+                conn.commit()
+            if found:
+                self.hits += 1
+                CACHE_LOOKUPS.inc("geocode", "hit")
+                return (True, [lat, lon])
+            self.negative_hits += 1
+            CACHE_LOOKUPS.inc("geocode", "negative_hit")
+            return (True, None)
+
+    def put(self, key, coords):
+        """Store coordinates for key, or a negative entry when coords is None"""
+        now = time.time()
+        lat, lon = coords if coords else (None, None)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, found, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, lat, lon, 1 if coords else 0, now, now),
+            )
+            self._touched.pop(key, None)
+            # Eviction goes by last_access, so bring it up to date first
+            self._write_touched(conn)
+            count = conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+            if count > self.max_entries:
+                # Evict the least recently used rows, plus some slack so we don't evict on every insert
+                excess = count - self.max_entries + max(1, self.max_entries // 20)
+                conn.execute(
+                    "DELETE FROM geocode WHERE key IN"
+                    " (SELECT key FROM geocode ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            hits, negative_hits, misses = self.hits, self.negative_hits, self.misses
+        total = hits + negative_hits + misses
+        return {
+            "hits": hits,
+            "negativeHits": negative_hits,
+            "misses": misses,
+            "hitRatio": round((hits + negative_hits) / total, 4) if total else 0.0,
+            "path": self.path,
+        }
+
+
+geocode_cache = GeocodeCache(GEOCODE_CACHE_PATH)
+
+# Settings for batch geocoding during ingestion. Nominatim's public policy is 1 request/second;
+# raise SAFECITY_GEOCODE_RATE when pointing at your own instance or the local stub.
+GEOCODE_RATE = float(os.environ.get("SAFECITY_GEOCODE_RATE", "1.0"))
+GEOCODE_BURST = int(os.environ.get("SAFECITY_GEOCODE_BURST", "1"))
+GEOCODE_WORKERS = int(os.environ.get("SAFECITY_GEOCODE_WORKERS", "4"))
+GEOCODE_RETRIES = 3
+
+
+class TokenBucket:
+    """Thread-safe token bucket - acquire() blocks until a request is allowed"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SingleFlight:
+    """Runs one call per key at a time - concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def submit(self, key, fn, executor):
+        """Like do(), but fn runs on `executor` - returns (future, leader), the Future shared by every
+        caller with this key and whether this call started it"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = executor.submit(fn)
+                self._calls[key] = future
+        if leader:
+            # Outside the lock: the callback runs right here if fn has already finished
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return future, leader
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class BatchGeocoder:
+    """Geocodes many place names concurrently behind a shared rate limit
+
+    Names already in the geocode cache never reach the network. The rest are looked
+    up on a thread pool; every request takes a token from one shared TokenBucket,
+    failures are retried with exponential backoff, and identical queries that are
+    in flight at the same time are only sent once.
+    """
+
+    def __init__(self, rate=GEOCODE_RATE, burst=GEOCODE_BURST, workers=GEOCODE_WORKERS,
+                 retries=GEOCODE_RETRIES, backoff=0.5, cache=None, url=None,
+                 state="Telangana", country="India"):
+        self.limiter = TokenBucket(rate, burst)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else geocode_cache
+        self.url = url
+        self.state = state
+        self.country = country
+        self.requests_sent = 0
+        self.errors = 0
+        self._flight = SingleFlight()
+        self._counter_lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        # Created lazily, and re-created in forked worker processes
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="geocode")
+            self._pid = os.getpid()
+        return self._executor
+
+    def _fetch(self, name, key):
+        query = f"{name}, {self.state}, {self.country}"
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            with self._counter_lock:
+                self.requests_sent += 1
+            BATCH_GEOCODER_REQUESTS.inc("sent")
+            try:
+                coords = nominatim_client.search(query, url=self.url, fail_fast=False)
+            except UpstreamUnavailable as e:
+                # The breaker is open - don't queue more retries behind it, the next ingest picks this up
+                with self._counter_lock:
+                    self.errors += 1
+                BATCH_GEOCODER_REQUESTS.inc("error")
+                print(f"❌ Geocoding skipped for {name}: {e}")
+                return None
+            except UPSTREAM_ERRORS as e:
+                with self._counter_lock:
+                    self.errors += 1
+                BATCH_GEOCODER_REQUESTS.inc("error")
+                if attempt == self.retries:
+                    print(f"❌ Geocoding failed for {name} after {attempt + 1} attempts: {str(e)[:50]}")
+                    return None
+                # Exponential backoff with jitter so retries don't arrive in lockstep
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+                continue
+            # Only definite answers are cached - errors are retried on the next ingest
+            self.cache.put(key, coords)
+            return coords
         return None
 
+    @timed_stage("geocode_district")
+    def geocode(self, name):
+        """Geocode one name through the gazetteer, cache, rate limiter and in-flight de-duplication"""
+        coords = gazetteer_coordinates(name, self.state, self.country)
+        if coords:
+            return coords
+        key = normalise_geocode_query(name, self.state, self.country)
+        cached, coords = self.cache.lookup(key)
+        if cached:
+            return coords
+        return self._flight.do(key, lambda: self._fetch(name, key))
+
+    def geocode_many(self, names):
+        """Geocode a batch of names concurrently - returns {name: [lat, lon] or None}"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        started = time.perf_counter()
+        futures = {name: self._pool().submit(self.geocode, name) for name in names}
+        results = {name: future.result() for name, future in futures.items()}
+        STAGE_SECONDS.observe(time.perf_counter() - started, "geocode_batch")
+        found = sum(1 for coords in results.values() if coords)
+        print(f"🌐 Geocoded {found}/{len(names)} places in {time.perf_counter() - started:.2f}s")
+        return results
+
+    def stats(self):
+        return {
+            "requestsSent": self.requests_sent,
+            "errors": self.errors,
+            "inFlight": self._flight.in_flight(),
+            "rate": self.limiter.rate,
+            "workers": self.workers,
+        }
+
+
+batch_geocoder = BatchGeocoder()
+
+# Interactive lookups from /api/geocode run on their own small thread pool, so slow Nominatim
+# answers queue up there instead of holding every web worker thread
+GEOCODE_UPSTREAM_WORKERS = int(os.environ.get("SAFECITY_GEOCODE_UPSTREAM_WORKERS", "4"))
+# How long one /api/geocode request waits for the upstream answer before it gets a 503
+GEOCODE_WAIT_SECONDS = float(os.environ.get("SAFECITY_GEOCODE_WAIT", "2.0"))
+
+
+class AddressGeocoder:
+    """Geocodes addresses for the API off the request thread
+
+    Lookups go to the geocode cache first. Misses run on a dedicated thread pool through the
+    shared NominatimClient, and concurrent requests for the same address share one upstream
+    call and its result. The deadline only bounds how long a caller waits: the upstream call
+    keeps the client's own timeout and finishes in the background, so the retry of a request
+    that gave up is answered from the cache.
+    """
+
+    def __init__(self, workers=GEOCODE_UPSTREAM_WORKERS, cache=None, url=None, client=None):
+        self.workers = workers
+        self.cache = cache
+        self.url = url
+        self.client = client
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self._flight = SingleFlight()
+        self._counter_lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        # Created lazily, and re-created in forked worker processes
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="geocode-upstream")
+            self._pid = os.getpid()
+        return self._executor
+
+    def _cache(self):
+        # The module-level cache unless one was passed in
+        return self.cache if self.cache is not None else geocode_cache
+
+    def _fetch(self, query, key):
+        with self._counter_lock:
+            self.upstream_calls += 1
+        coords = (self.client or nominatim_client).search(query, url=self.url)
+        # Misses are cached too, with the shorter negative TTL; errors are not cached
+        self._cache().put(key, coords)
+        return coords
+
+    def lookup(self, address, state="Telangana", country="India"):
+        """Future with [lat, lon] or None - already resolved on a cache hit"""
+        key = normalise_geocode_query(address, state, country)
+        cached, coords = self._cache().lookup(key)
+        if cached:
+            future = Future()
+            future.set_result(coords)
+            return future
+        query = f"{address}, {state}, {country}"
+        future, leader = self._flight.submit(key, lambda: self._fetch(query, key), self._pool())
+        if not leader:
+            with self._counter_lock:
+                self.coalesced += 1
+        return future
+
+    def geocode(self, address, state="Telangana", country="India", deadline=None):
+        """[lat, lon] or None; raises FutureTimeoutError if the deadline runs out first, and
+        UpstreamUnavailable if Nominatim wasn't asked"""
+        deadline = deadline or Deadline(GEOCODE_WAIT_SECONDS)
+        try:
+            return self.lookup(address, state, country).result(deadline.remaining())
+        except FutureTimeoutError:
+            with self._counter_lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self):
+        return {
+            "upstreamCalls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "inFlight": self._flight.in_flight(),
+            "workers": self.workers,
+        }
+
+
+address_geocoder = AddressGeocoder()
+
+# Hard-coded coordinates for districts in Telangana (2020-2022)
+MANUAL_COORDS = {
+    "Adilabad": [19.6641, 78.5320],
+    "Bhadradri Kothagudem": [17.5555, 80.6190],
+    "Hyderabad": [17.3850, 78.4867],
+    "Jagtial": [18.7947, 78.9138],
+    "Jangaon": [17.7250, 79.1520],
+    "Jayashankar Bhupalpalli": [18.1973, 79.9383],
+    "Jogulamba Gadwal": [16.2342, 77.8062],
+    "Kamareddy": [18.3219, 78.3410],
+    "Karimnagar": [18.4392, 79.1288],
+    "Khammam": [17.2473, 80.1514],
+    "Komaram Bheem Asifabad": [19.3647, 79.2798],
+    "Mahabubabad": [17.6033, 80.0021],
+    "Mahabubnagar": [16.7375, 77.9803],
+    "Mancherial": [18.8741, 79.4637],
+    "Medak": [18.0453, 78.2608],
+    "Medchal-Malkajgiri": [17.5409, 78.4891],
+    "Mulugu": [18.1972, 80.1846],
+    "Nagarkurnool": [16.4822, 78.3245],
+    "Nalgonda": [17.0583, 79.2671],
+    "Narayanpet": [16.7452, 77.4954],
+    "Nirmal": [19.0965, 78.3441],
+    "Nizamabad": [18.6730, 78.1000],
+    "Peddapalli": [18.6150, 79.3742],
+    "Rajanna Sircilla": [18.3866, 78.8318],
+    "Rangareddy": [17.3026, 78.3641],
+    "Sangareddy": [17.6291, 78.0938],
+    "Siddipet": [18.1019, 78.8521],
+    "Suryapet": [17.1449, 79.6339],
+    "Vikarabad": [17.3384, 77.9045],
+    "Wanaparthy": [16.3679, 77.8121],
+    "Warangal": [17.9784, 79.5910],
+    "Yadadri Bhuvanagiri": [17.5083, 78.8824],
+    "Cyberabad Commissionerate": [17.4949, 78.3995],
+    "Rachakonda Commissionerate": [17.3000, 78.6000],
+    "Secunderabad RP": [17.4399, 78.4983],
+}
+
+# PDF extraction settings. Page numbers are 0-based like pdf.pages, e.g. "29-35" or "29-31,34".
+PDF_PAGES = os.environ.get("SAFECITY_PDF_PAGES", "29-35")
+# Extra pdfplumber table_settings as JSON, e.g. '{"vertical_strategy": "lines"}'
+PDF_TABLE_SETTINGS = json.loads(os.environ.get("SAFECITY_PDF_TABLE_SETTINGS") or "{}")
+PDF_WORKERS = int(os.environ.get("SAFECITY_PDF_WORKERS", "0")) or os.cpu_count() or 1
+
+def parse_page_range(spec):
+    """Turn "29-35,40" into [29, 30, ..., 35, 40]"""
+    pages = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            pages.extend(range(int(first), int(last) + 1))
+        else:
+            pages.append(int(part))
+    return pages
+
+def _extract_page_table(pdf_path, page_num, table_settings):
+    """Extract the table on one page - runs inside a process pool worker"""
+    import pdfplumber
+
+    started = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        rows = pdf.pages[page_num].extract_table(table_settings or None)
+    return page_num, rows or [], time.perf_counter() - started
+
+def extract_pdf_tables(pdf_path, pages=None, table_settings=None, workers=None):
+    """Extract the tables on `pages` across a process pool
+
+    Returns (rows, timings): rows from every page reassembled in page order, and
+    a list of {"page", "rows", "seconds"} dicts with the per-page timing.
+    """
+    pages = parse_page_range(PDF_PAGES) if pages is None else list(pages)
+    table_settings = PDF_TABLE_SETTINGS if table_settings is None else table_settings
+    workers = min(workers or PDF_WORKERS, len(pages)) if pages else 1
+
+    started = time.perf_counter()
+    if workers <= 1:
+        results = [_extract_page_table(pdf_path, page_num, table_settings) for page_num in pages]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_extract_page_table, [pdf_path] * len(pages), pages,
+                                    [table_settings] * len(pages)))
+
+    # pool.map already yields in submission order; sort anyway so callers can pass pages in any order
+    results.sort(key=lambda result: result[0])
+    rows = []
+    timings = []
+    for page_num, page_rows, seconds in results:
+        if page_rows:
+            print(f"✅ Extracted Table from Page {page_num+1} ({len(page_rows)} rows, {seconds:.2f}s)")
+        rows.extend(page_rows)
+        timings.append({"page": page_num + 1, "rows": len(page_rows), "seconds": round(seconds, 4)})
+        STAGE_SECONDS.observe(seconds, "pdf_page")
+
+    total = time.perf_counter() - started
+    STAGE_SECONDS.observe(total, "pdf_extract")
+    cpu_time = sum(timing["seconds"] for timing in timings)
+    print(f"⏱️ Extracted {len(pages)} pages in {total:.2f}s on {workers} worker(s) ({cpu_time:.2f}s of page work)")
+    return rows, timings
+
+# Other spellings of district names seen in crime reports -> the name used in MANUAL_COORDS
+DISTRICT_ALIASES = {
+    "Jayashankar Bhupalpally": "Jayashankar Bhupalpalli",
+    "Bhupalpally": "Jayashankar Bhupalpalli",
+    "Jagitial": "Jagtial",
+    "Jangoan": "Jangaon",
+    "Janagaon": "Jangaon",
+    "Kumuram Bheem Asifabad": "Komaram Bheem Asifabad",
+    "Komuram Bheem Asifabad": "Komaram Bheem Asifabad",
+    "Asifabad": "Komaram Bheem Asifabad",
+    "Mahbubnagar": "Mahabubnagar",
+    "Mahboobnagar": "Mahabubnagar",
+    "Mahbubabad": "Mahabubabad",
+    "Ranga Reddy": "Rangareddy",
+    "Nagar Kurnool": "Nagarkurnool",
+    "Sircilla": "Rajanna Sircilla",
+    "Yadadri": "Yadadri Bhuvanagiri",
+    "Bhuvanagiri": "Yadadri Bhuvanagiri",
+    "Kothagudem": "Bhadradri Kothagudem",
+    "Gadwal": "Jogulamba Gadwal",
+    "Medchal": "Medchal-Malkajgiri",
+    "Malkajgiri": "Medchal-Malkajgiri",
+}
+
+# Abbreviations expanded word by word before matching, e.g. "Secunderabad RP" = "Secunderabad Railway Police"
+NAME_TOKEN_ALIASES = {
+    "rp": "railway police",
+    "rly": "railway",
+    "dist": "district",
+    "commr": "commissionerate",
+    "commissionarate": "commissionerate",
+}
+
+# Trailing words that can be left off, e.g. "Cyberabad" for "Cyberabad Commissionerate"
+OPTIONAL_NAME_SUFFIXES = ("commissionerate", "district", "police commissionerate")
+
+def normalise_district_name(name):
+    """Case-folded, punctuation-free form of a district name with abbreviations expanded"""
+    text = str(name).casefold().replace("&", " and ")
+    text = re.sub(r"[^\w\s]", " ", text)
+    # Re-join dotted initials, so "R.P." reads as "rp"
+    text = re.sub(r"\b(?:[a-z] )+[a-z]\b", lambda m: m.group(0).replace(" ", ""), text)
+    tokens = []
+    for token in text.split():
+        tokens.extend(NAME_TOKEN_ALIASES.get(token, token).split())
+    return " ".join(tokens)
+
+def district_id(name):
+    """Stable URL-safe ID for a district, e.g. medchal-malkajgiri"""
+    return normalise_district_name(name).replace(" ", "-")
+
+
+class DistrictNameIndex:
+    """Constant-time lookup of a district by any spelling of its name
+
+    Each canonical name is registered under its normalised form, the same form
+    without spaces ("medchalmalkajgiri"), the form without an optional suffix
+    ("cyberabad") and every alias in DISTRICT_ALIASES that points at it. When two
+    districts would share a key, the first one registered keeps it.
+    """
+
+    def __init__(self, names, aliases=None):
+        self.names = list(names)
+        self._positions = {}
+        for position, name in enumerate(self.names):
+            for key in self._keys(name):
+                self._positions.setdefault(key, position)
+        for alias, canonical in (DISTRICT_ALIASES if aliases is None else aliases).items():
+            position = self.lookup(canonical)
+            if position is not None:
+                for key in self._keys(alias):
+                    self._positions.setdefault(key, position)
+
+    @staticmethod
+    def _keys(name):
+        key = normalise_district_name(name)
+        keys = [key, key.replace(" ", "")]
+        for suffix in OPTIONAL_NAME_SUFFIXES:
+            if key.endswith(" " + suffix):
+                keys.append(key[:-len(suffix) - 1])
+        return keys
+
+    def lookup(self, name):
+        """Position of the district called `name` in the indexed list, or None"""
+        if not name:
+            return None
+        key = normalise_district_name(name)
+        position = self._positions.get(key)
+        if position is None:
+            position = self._positions.get(key.replace(" ", ""))
+        return position
+
+    def canonical(self, name):
+        """Canonical spelling of `name`, or None if it isn't a known district"""
+        position = self.lookup(name)
+        return None if position is None else self.names[position]
+
+
+# Used during ingestion to map report spellings onto MANUAL_COORDS before geocoding anything
+MANUAL_NAME_INDEX = DistrictNameIndex(MANUAL_COORDS)
+
+# Local gazetteer answering forward geocoding and /api/geocode/suggest without a network call.
+# It always holds the districts in MANUAL_COORDS; point SAFECITY_GAZETTEER at a GeoNames country
+# dump (e.g. IN.txt from https://download.geonames.org/export/dump/) or at a CSV with
+# name,latitude,longitude[,population] columns to add towns, villages and landmarks.
+GAZETTEER_PATH = os.environ.get("SAFECITY_GAZETTEER") or None
+# GeoNames admin1 code for Telangana - rows for other states in the dump are skipped
+GAZETTEER_ADMIN1 = os.environ.get("SAFECITY_GAZETTEER_ADMIN1", "40")
+
+
+class Gazetteer:
+    """Place names in sorted arrays, for exact lookup and prefix search in microseconds
+
+    Every name and alternate name is indexed under its normalised form and under each
+    word-start suffix of it ("medchal malkajgiri", "malkajgiri"), so the keys matching a
+    prefix are one contiguous run found with two bisects. Places are ranked once up front
+    (manual districts first, then by population), and that run is reduced to the best few
+    with NumPy. When two places share a name, exact lookup picks the best-ranked one.
+    """
+
+    def __init__(self, places):
+        # places: (name, latitude, longitude, population, alternate names, source) tuples,
+        # source "districts" for MANUAL_COORDS and "gazetteer" for the local extract
+        self.names = []
+        self.latitudes = []
+        self.longitudes = []
+        self.populations = []
+        self.sources = []
+        self._exact = {}
+        keys = set()
+        for name, lat, lon, population, alternate_names, source in places:
+            position = len(self.names)
+            self.names.append(name)
+            self.latitudes.append(float(lat))
+            self.longitudes.append(float(lon))
+            self.populations.append(int(population or 0))
+            self.sources.append(source)
+            for label in (name, *alternate_names):
+                key = normalise_district_name(label)
+                if not key:
+                    continue
+                current = self._exact.get(key)
+                if current is None or self._rank(position) < self._rank(current):
+                    self._exact[key] = position
+                words = key.split()
+                for start in range(len(words)):
+                    keys.add((" ".join(words[start:]), position))
+        ordered = sorted(keys)
+        self._keys = [key for key, _ in ordered]
+        # Rank of every place, and the place at every rank
+        self._by_rank = np.array(sorted(range(len(self.names)), key=self._rank), dtype=np.int32)
+        self._ranks = np.empty(len(self.names), dtype=np.int32)
+        self._ranks[self._by_rank] = np.arange(len(self.names), dtype=np.int32)
+        # Rank of the place behind every key
+        self._key_ranks = self._ranks[np.array([position for _, position in ordered], dtype=np.int32)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _rank(self, position):
+        # Manual districts first, then bigger places, then alphabetical
+        return (self.sources[position] != "districts", -self.populations[position], self.names[position])
+
+    def place(self, position):
+        return {
+            "name": self.names[position],
+            "latitude": self.latitudes[position],
+            "longitude": self.longitudes[position],
+            "source": self.sources[position],
+        }
+
+    def find(self, address, state="Telangana", country="India"):
+        """The place whose name is exactly `address` (ignoring case, punctuation and a trailing
+        state/country), or None"""
+        parts = [part for part in str(address).split(",") if part.strip()]
+        suffixes = {normalise_district_name(state), normalise_district_name(country)}
+        while parts and normalise_district_name(parts[-1]) in suffixes:
+            parts.pop()
+        position = self._exact.get(normalise_district_name(" ".join(parts)))
+        return None if position is None else self.place(position)
+
+    def suggest(self, prefix, limit=10):
+        """Up to `limit` places with a name, or a word in a name, starting with `prefix`"""
+        key = normalise_district_name(prefix)
+        if not key:
+            return []
+        # Every key starting with `key` sorts between key and key + the highest code point
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_left(self._keys, key + "\U0010ffff", start)
+        if start == end:
+            return []
+        ranks = self._key_ranks[start:end]
+        # A place can sit under several matching keys, so take a few times `limit` of the
+        # smallest ranks; if they hold `limit` different places those are the best ones
+        wanted = limit * 8
+        if len(ranks) > wanted:
+            best = np.unique(np.partition(ranks, wanted - 1)[:wanted])
+            if len(best) >= limit:
+                ranks = best
+        # np.unique sorts, so the best-ranked places come first and duplicates collapse
+        ranks = np.unique(ranks)[:limit]
+        return [self.place(int(position)) for position in self._by_rank[ranks]]
+
+    def stats(self):
+        return {"places": len(self.names), "keys": len(self._keys)}
+
+
+def manual_places():
+    """MANUAL_COORDS as gazetteer places, with DISTRICT_ALIASES as alternate names"""
+    aliases = {}
+    for alias, canonical in DISTRICT_ALIASES.items():
+        aliases.setdefault(canonical, []).append(alias)
+    for name, (lat, lon) in MANUAL_COORDS.items():
+        yield name, lat, lon, 0, aliases.get(name, []), "districts"
+
+def read_geonames(path, admin1=GAZETTEER_ADMIN1):
+    """Places in one state from a tab-separated GeoNames dump"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) < 15 or (admin1 and columns[10] != admin1):
+                continue
+            # Alternate names include codes and links - keep the ones that look like names
+            alternate_names = [columns[2]] + [
+                name for name in columns[3].split(",")
+                if name and "/" not in name and not name.isdigit()
+            ]
+            population = int(columns[14]) if columns[14].isdigit() else 0
+            yield columns[1], columns[4], columns[5], population, alternate_names, "gazetteer"
+
+def read_gazetteer_csv(path):
+    """Places from a CSV with name, latitude, longitude and optional population columns"""
+    import csv
+
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield (row["name"], row["latitude"], row["longitude"],
+                   int(row.get("population") or 0), [], "gazetteer")
+
+def load_gazetteer(path=None):
+    """Gazetteer of the manual districts plus the extract at `path`, if there is one"""
+    started = time.perf_counter()
+    places = list(manual_places())
+    if path and os.path.exists(path):
+        reader = read_gazetteer_csv if path.lower().endswith(".csv") else read_geonames
+        places.extend(reader(path))
+    elif path:
+        print(f"⚠️ Gazetteer file {path} not found, only the districts are available offline")
+    gazetteer = Gazetteer(places)
+    print(f"📚 Gazetteer: {len(gazetteer)} places in {time.perf_counter() - started:.2f}s")
+    return gazetteer
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer():
+    """The process-wide Gazetteer, loaded on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+def gazetteer_coordinates(name, state="Telangana", country="India"):
+    """[lat, lon] from the local gazetteer, or None if it doesn't know the name"""
+    place = get_gazetteer().find(name, state, country)
+    return [place["latitude"], place["longitude"]] if place else None
+
+def manual_coords_frame():
+    """MANUAL_COORDS as a District/latitude/longitude DataFrame for merging"""
+    import pandas as pd
+
+    return pd.DataFrame(
+        [(name, lat, lon) for name, (lat, lon) in MANUAL_COORDS.items()],
+        columns=["District", "latitude", "longitude"],
+    )
+
+@timed_stage("process_crime_data")
 def process_crime_data(pdf_path):
-    # Hard-coded coordinates for districts in Telangana (2020-2022)
-    manual_coords = {
-        "Adilabad": [19.6641, 78.5320],
-        "Bhadradri Kothagudem": [17.5555, 80.6190],
-        "Hyderabad": [17.3850, 78.4867],
-        "Jagtial": [18.7947, 78.9138],
-        "Jangaon": [17.7250, 79.1520],
-        "Jayashankar Bhupalpalli": [18.1973, 79.9383],
-        "Jogulamba Gadwal": [16.2342, 77.8062],
-        "Kamareddy": [18.3219, 78.3410],
-        "Karimnagar": [18.4392, 79.1288],
-        "Khammam": [17.2473, 80.1514],
-        "Komaram Bheem Asifabad": [19.3647, 79.2798],
-        "Mahabubabad": [17.6033, 80.0021],
-        "Mahabubnagar": [16.7375, 77.9803],
-        "Mancherial": [18.8741, 79.4637],
-        "Medak": [18.0453, 78.2608],
-        "Medchal-Malkajgiri": [17.5409, 78.4891],
-        "Mulugu": [18.1972, 80.1846],
-        "Nagarkurnool": [16.4822, 78.3245],
-        "Nalgonda": [17.0583, 79.2671],
-        "Narayanpet": [16.7452, 77.4954],
-        "Nirmal": [19.0965, 78.3441],
-        "Nizamabad": [18.6730, 78.1000],
-        "Peddapalli": [18.6150, 79.3742],
-        "Rajanna Sircilla": [18.3866, 78.8318],
-        "Rangareddy": [17.3026, 78.3641],
-        "Sangareddy": [17.6291, 78.0938],
-        "Siddipet": [18.1019, 78.8521],
-        "Suryapet": [17.1449, 79.6339],
-        "Vikarabad": [17.3384, 77.9045],
-        "Wanaparthy": [16.3679, 77.8121],
-        "Warangal": [17.9784, 79.5910],
-        "Yadadri Bhuvanagiri": [17.5083, 78.8824],
-        "Cyberabad Commissionerate": [17.4949, 78.3995],
-        "Rachakonda Commissionerate": [17.3000, 78.6000],
-        "Secunderabad RP": [17.4399, 78.4983],
-    }
-    
+    import pandas as pd
+
     # Extract data from PDF
     print("📊 Extracting crime data from PDF...")
     district_data = []
@@ -136,862 +1401,1685 @@ def process_crime_data(pdf_path):
         ]
         district_data = sample_districts
     else:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num in range(29, 36):  # Extracts pages 29 to 35
-                page = pdf.pages[page_num]
-                tables = page.extract_table()
-                if tables:
-                    print(f"✅ Extracting Table from Page {page_num+1}")
-                    for row in tables:
-                        district_data.append(row)
+        # Pages 29 to 35 by default (SAFECITY_PDF_PAGES), spread across a process pool
+        district_data, _ = extract_pdf_tables(pdf_path)
     
-    # Convert extracted data into DataFrame
-    df = pd.DataFrame(district_data)
+    with timed_stage("dataframe_cleanup"):
+        # Convert extracted data into DataFrame
+        df = pd.DataFrame(district_data)
     
-    # Select only relevant columns: District Name (Col 1) & Total Crimes (Col 9)
-    df = df.iloc[:, [1, 9]]  # Keep only the relevant columns
-    df.columns = ["District", "Total Crimes"]  # Rename columns
+        # Select only relevant columns: District Name (Col 1) & Total Crimes (Col 9)
+        df = df.iloc[:, [1, 9]]  # Keep only the relevant columns
+        df.columns = ["District", "Total Crimes"]  # Rename columns
     
-    # Remove header rows and empty values
-    df = df.iloc[2:]  # Remove first 2 rows (headers)
-    df = df.dropna()  # Drop empty rows
+        # Remove header rows and empty values
+        df = df.iloc[2:]  # Remove first 2 rows (headers)
+        df = df.dropna()  # Drop empty rows
     
-    # Convert crime numbers to integers
-    df["Total Crimes"] = pd.to_numeric(df["Total Crimes"], errors="coerce")
-    df = df.dropna()  # Drop rows where conversion failed
+        # Convert crime numbers to integers
+        df["Total Crimes"] = pd.to_numeric(df["Total Crimes"], errors="coerce")
+        df = df.dropna()  # Drop rows where conversion failed
     
-    # Clean district names (strip whitespace)
-    df["District"] = df["District"].str.strip()
+        # Clean district names (strip whitespace)
+        df["District"] = df["District"].str.strip()
     
-    # Remove the "TOTAL" row
-    df = df[~df["District"].str.upper().isin(["TOTAL"])]
+        # Remove the "TOTAL" row
+        df = df[~df["District"].str.upper().isin(["TOTAL"])]
     
-    # Remove duplicates
-    df = df.drop_duplicates(subset=["District"])
+        # Use the MANUAL_COORDS spelling for known districts ("Jayashankar Bhupalpally" ->
+        # "Jayashankar Bhupalpalli", "Medchal Malkajgiri" -> "Medchal-Malkajgiri") so they aren't geocoded
+        df["District"] = [MANUAL_NAME_INDEX.canonical(name) or name for name in df["District"]]
     
-    # List to store district crime data
-    districts_with_coords = []
+        # Remove duplicates
+        df = df.drop_duplicates(subset=["District"])
     
-    # Process districts
-    for index, row in df.iterrows():
-        district = row["District"]
-        crime_count = int(row["Total Crimes"])
-        
-        # First check manual coordinates
-        if district in manual_coords:
-            coords = manual_coords[district]
-            print(f"📍 Using manual coordinates for {district}: {coords}")
-        else:
-            # Try geocoding
-            coords = get_coordinates(district)
-            time.sleep(0.5)  # Respect rate limits
-        
-        if coords:
-            lat, lon = coords
-            districts_with_coords.append({
-                "district": district,
-                "crimeCount": crime_count,
-                "latitude": lat,
-                "longitude": lon
-            })
-        else:
-            print(f"⚠️ Warning: Could not geocode {district}")
+    # Join against the manual coordinates table in one vectorized merge
+    with timed_stage("coordinate_merge"):
+        df = df.merge(manual_coords_frame(), on="District", how="left")
+    unmatched = df["latitude"].isna()
+    manual_count = int((~unmatched).sum())
     
-    return districts_with_coords
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/api/crime-data')
-def crime_data():
-    # Path to your PDF file - change this to the actual path or set to None to use sample data
-    pdf_path = None #r"C:\Users\kp\Downloads\Telangana_CrimeRates.pdf"
+    # Geocode only the names the table doesn't know, in one concurrent, rate-limited batch
+    geocoded_count = 0
+    if unmatched.any():
+        geocoded = batch_geocoder.geocode_many(df.loc[unmatched, "District"].tolist())
+        found = {name: coords for name, coords in geocoded.items() if coords}
+        names = df.loc[unmatched, "District"]
+        df.loc[unmatched, "latitude"] = names.map({name: c[0] for name, c in found.items()})
+        df.loc[unmatched, "longitude"] = names.map({name: c[1] for name, c in found.items()})
+        geocoded_count = int(names.isin(list(found)).sum())
     
-    # Process crime data
-    districts = process_crime_data(pdf_path)
+    # Drop whatever still has no coordinates, with one summary line instead of one per row
+    missing = df["latitude"].isna() | df["longitude"].isna()
+    if missing.any():
+        print(f"⚠️ Warning: Could not geocode {int(missing.sum())} districts: {', '.join(df.loc[missing, 'District'])}")
+    df = df[~missing]
+    print(f"📍 {manual_count} districts from manual coordinates, {geocoded_count} geocoded")
     
-    # Return JSON response
-    return jsonify(districts)
+    # Columnar -> records conversion for the API payload
+    with timed_stage("to_records"):
+        df = df.rename(columns={"District": "district", "Total Crimes": "crimeCount"})
+        df["crimeCount"] = df["crimeCount"].astype("int64")
+        return df[["district", "crimeCount", "latitude", "longitude"]].to_dict("records")
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
-    return send_from_directory('static', filename)
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
 
-if __name__ == '__main__':
-    # Create templates directory if it doesn't exist
-    os.makedirs('templates', exist_ok=True)
-    
-    # Create HTML template
-    with open('templates/index.html', 'w', encoding='utf-8') as f:
-        f.write('''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Safe City - Telangana</title>
-    
-    <!-- Leaflet CSS and JS -->
-    <link rel="stylesheet" href="https://unpkg.com/leaflet/dist/leaflet.css">
-    <script src="https://unpkg.com/leaflet/dist/leaflet.js"></script>
-    
-    <!-- Font Awesome for icons -->
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
-    
-    <style>
-        :root {
-            --primary-color: #3498db;
-            --secondary-color: #2c3e50;
-            --success-color: #2ecc71;
-            --warning-color: #f39c12;
-            --danger-color: #e74c3c;
-            --light-color: #ecf0f1;
-            --dark-color: #34495e;
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background-color: #f5f7fa;
-            color: var(--dark-color);
-            line-height: 1.6;
-        }
-        
-        .navbar {
-            background-color: var(--secondary-color);
-            color: white;
-            padding: 1rem 2rem;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
+# scipy is optional - its cKDTree makes queries on very large point sets faster,
+# without it SpatialIndex falls back to a vectorized NumPy scan
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+def to_unit_vectors(latitudes, longitudes):
+    """Latitude/longitude in degrees -> (n, 3) array of points on the unit sphere"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord):
+    """Straight-line distance between unit-sphere points -> great-circle distance in km"""
+    return 2.0 * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0)) * EARTH_RADIUS_KM
+
+def km_to_chord(km):
+    return 2.0 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+class SpatialIndex:
+    """k-nearest and radius search by great-circle distance
+
+    Points are stored as 3D unit vectors, where straight-line (chord) distance is
+    monotonic in great-circle distance, so a KD-tree over them answers true
+    haversine nearest-neighbour queries.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.points = to_unit_vectors(latitudes, longitudes)
+        self.tree = cKDTree(self.points) if cKDTree is not None and len(self.points) else None
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, lat, lng, k=5, radius_km=None):
+        """Return (indices, distances_km) of the k nearest points, nearest first, optionally within radius_km"""
+        n = len(self.points)
+        k = min(int(k), n)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        target = to_unit_vectors([lat], [lng])[0]
+        max_chord = km_to_chord(radius_km) if radius_km is not None else np.inf
+
+        if self.tree is not None:
+            chords, indices = self.tree.query(target, k=k, distance_upper_bound=max_chord * (1 + 1e-12))
+            chords = np.atleast_1d(chords)
+            indices = np.atleast_1d(indices)
+            found = np.isfinite(chords)
+            return indices[found], chord_to_km(chords[found])
+
+        # |a - b|^2 = 2 - 2 a.b for unit vectors
+        chords = np.sqrt(np.maximum(2.0 - 2.0 * (self.points @ target), 0.0))
+        nearest = np.argpartition(chords, k - 1)[:k] if k < n else np.arange(n)
+        nearest = nearest[np.argsort(chords[nearest], kind="stable")]
+        nearest = nearest[chords[nearest] <= max_chord * (1 + 1e-12)]
+        return nearest, chord_to_km(chords[nearest])
+
+
+def haversine_km_matrix(point_lats, point_lons, target_lats, target_lons):
+    """Haversine distance in km from every point (rows) to every target (columns), in one vectorized pass"""
+    lat1 = np.radians(np.asarray(point_lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(point_lons, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(target_lats, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(target_lons, dtype=np.float64))[None, :]
+    h = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def nearest_k_batch(point_lats, point_lons, target_lats, target_lons, k, max_cells=4_000_000):
+    """Indices and distances (km) of the k nearest targets for every point, nearest first
+
+    The point x target distance matrix is computed in row chunks of at most
+    max_cells entries, so large batches against large datasets stay bounded in memory.
+    """
+    point_lats = np.asarray(point_lats, dtype=np.float64)
+    point_lons = np.asarray(point_lons, dtype=np.float64)
+    n_points, n_targets = len(point_lats), len(target_lats)
+    k = min(int(k), n_targets)
+    indices = np.empty((n_points, k), dtype=np.intp)
+    distances = np.empty((n_points, k), dtype=np.float64)
+    if k == 0 or n_points == 0:
+        return indices, distances
+
+    rows_per_chunk = max(1, max_cells // n_targets)
+    for start in range(0, n_points, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_points)
+        matrix = haversine_km_matrix(point_lats[start:stop], point_lons[start:stop], target_lats, target_lons)
+        if k < n_targets:
+            nearest = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(n_targets), matrix.shape).copy()
+        nearest_distances = np.take_along_axis(matrix, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1, kind="stable")
+        indices[start:stop] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:stop] = np.take_along_axis(nearest_distances, order, axis=1)
+    return indices, distances
+
+# District boundaries for point-in-polygon lookups (/api/district-at, and /api/safety-tips without
+# a district name). Point SAFECITY_BOUNDARIES at a GeoJSON file of district polygons (Polygon or
+# MultiPolygon features); each feature's name is read from the first of SAFECITY_BOUNDARY_NAME_FIELDS
+# it has. Without the file every lookup falls back to the nearest district centroid.
+BOUNDARIES_PATH = os.environ.get("SAFECITY_BOUNDARIES") or None
+BOUNDARY_NAME_FIELDS = tuple(
+    field.strip()
+    for field in os.environ.get("SAFECITY_BOUNDARY_NAME_FIELDS", "district,District,DISTRICT,dtname,NAME_2,name").split(",")
+    if field.strip())
+# Cells per side of the grid laid over the boundaries
+BOUNDARY_GRID_SIZE = int(os.environ.get("SAFECITY_BOUNDARY_GRID", "128"))
+# Grid cell states besides a feature index
+CELL_OUTSIDE = -1
+CELL_BORDER = -2
+
+
+class DistrictBoundaries:
+    """District polygons in a uniform grid, answering "which district is this point in?"
+
+    A grid cell that no polygon edge passes through lies wholly inside one district (or
+    outside all of them), so it is resolved once while building and a query landing in it
+    is a single array read. Only border cells keep a list of candidate polygons, which are
+    checked with a bounding-box test and then by ray casting over their precomputed edges.
+    """
+
+    def __init__(self, features, grid_size=BOUNDARY_GRID_SIZE):
+        # features: (name, polygons) pairs, each polygon a list of rings (exterior, then holes)
+        # of [lng, lat] positions as in GeoJSON
+        self.names = []
+        self._parts = []
+        for name, polygons in features:
+            feature = len(self.names)
+            self.names.append(name)
+            for rings in polygons:
+                edges = self._edges(rings)
+                if len(edges):
+                    xs, ys = edges[:, [0, 2]], edges[:, [1, 3]]
+                    self._parts.append((feature, (xs.min(), ys.min(), xs.max(), ys.max()), edges))
+
+        self.grid_size = grid_size
+        self._cells = np.full((grid_size, grid_size), CELL_OUTSIDE, dtype=np.int32)
+        self._candidates = {}
+        if not self._parts:
+            self.west = self.south = 0.0
+            self.cell_width = self.cell_height = 1.0
+            return
+        bboxes = np.array([bbox for _, bbox, _ in self._parts])
+        self.west, self.south = bboxes[:, 0].min(), bboxes[:, 1].min()
+        self.cell_width = max((bboxes[:, 2].max() - self.west) / grid_size, 1e-9)
+        self.cell_height = max((bboxes[:, 3].max() - self.south) / grid_size, 1e-9)
+
+        # Every cell an edge's bounding box touches is a border cell
+        border = np.zeros((grid_size, grid_size), dtype=bool)
+        for _, _, edges in self._parts:
+            cols = self._column(edges[:, [0, 2]])
+            rows = self._row(edges[:, [1, 3]])
+            col_lo, col_hi = cols.min(axis=1), cols.max(axis=1)
+            row_lo, row_hi = rows.min(axis=1), rows.max(axis=1)
+            # Most edges are short and stay in one cell
+            single = (col_lo == col_hi) & (row_lo == row_hi)
+            border[row_lo[single], col_lo[single]] = True
+            for r0, r1, c0, c1 in zip(row_lo[~single], row_hi[~single], col_lo[~single], col_hi[~single]):
+                border[r0:r1 + 1, c0:c1 + 1] = True
+        self._cells[border] = CELL_BORDER
+
+        centre_cols = self.west + (np.arange(grid_size) + 0.5) * self.cell_width
+        centre_rows = self.south + (np.arange(grid_size) + 0.5) * self.cell_height
+        for part, (feature, (west, south, east, north), edges) in enumerate(self._parts):
+            c0, c1 = self._column(np.array([west, east]))
+            r0, r1 = self._row(np.array([south, north]))
+            window = self._cells[r0:r1 + 1, c0:c1 + 1]
+            # Border cells inside the polygon's bounding box get it as a candidate...
+            for row, col in zip(*np.nonzero(window == CELL_BORDER)):
+                self._candidates.setdefault((int(r0 + row), int(c0 + col)), []).append(part)
+            # ...and the other cells take its feature if their centre is inside it
+            rows, cols = np.nonzero(window == CELL_OUTSIDE)
+            if len(rows):
+                inside = self._inside(edges, centre_cols[c0 + cols], centre_rows[r0 + rows])
+                window[rows[inside], cols[inside]] = feature
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _edges(rings):
+        # (n, 4) array of x1, y1, x2, y2 for every edge of every ring
+        segments = []
+        for ring in rings:
+            points = np.asarray(ring, dtype=np.float64)
+            if points.ndim == 2 and len(points) >= 3:
+                points = points[:, :2]
+                segments.append(np.column_stack((points, np.roll(points, -1, axis=0))))
+        return np.concatenate(segments) if segments else np.empty((0, 4))
+
+    @staticmethod
+    def _inside(edges, xs, ys, max_cells=4_000_000):
+        """Even-odd ray casting: which of the points (xs, ys) lie inside the rings behind `edges`"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        x1, y1, x2, y2 = edges.T
+        inside = np.empty(len(xs), dtype=bool)
+        step = max(1, max_cells // len(edges))
+        for start in range(0, len(xs), step):
+            px = xs[start:start + step, None]
+            py = ys[start:start + step, None]
+            # Edges straddling the point's latitude, crossed by a ray running east from it
+            straddles = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[start:start + step] = np.count_nonzero(straddles & (px < crossing_x), axis=1) % 2 == 1
+        return inside
+
+    def _column(self, lng):
+        return np.clip(((lng - self.west) / self.cell_width).astype(np.int64), 0, self.grid_size - 1)
+
+    def _row(self, lat):
+        return np.clip(((lat - self.south) / self.cell_height).astype(np.int64), 0, self.grid_size - 1)
+
+    def locate(self, lat, lng):
+        """Index into self.names of the district containing the point, or None"""
+        col = (lng - self.west) / self.cell_width
+        row = (lat - self.south) / self.cell_height
+        if not (0 <= col <= self.grid_size and 0 <= row <= self.grid_size):
+            return None
+        row, col = min(int(row), self.grid_size - 1), min(int(col), self.grid_size - 1)
+        cell = int(self._cells[row, col])
+        if cell != CELL_BORDER:
+            return None if cell == CELL_OUTSIDE else cell
+        for part in self._candidates.get((row, col), ()):
+            feature, (west, south, east, north), edges = self._parts[part]
+            if west <= lng <= east and south <= lat <= north and self._inside(edges, [lng], [lat])[0]:
+                return feature
+        return None
+
+    def stats(self):
+        return {
+            "districts": len(self.names),
+            "polygons": len(self._parts),
+            "edges": sum(len(edges) for _, _, edges in self._parts),
+            "borderCells": len(self._candidates),
         }
-        
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            font-size: 1.5rem;
-            font-weight: bold;
-        }
-        
-        .navbar-brand i {
-            color: var(--primary-color);
-        }
-        
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 1.5rem;
-        }
-        
-        .header {
-            text-align: center;
-            margin-bottom: 2rem;
-        }
-        
-        .header h1 {
-            margin-bottom: 0.5rem;
-            color: var(--secondary-color);
-        }
-        
-        .header p {
-            color: #7f8c8d;
-            max-width: 700px;
-            margin: 0 auto;
-        }
-        
-        .card {
-            background-color: white;
-            border-radius: 10px;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05);
-            overflow: hidden;
-            margin-bottom: 2rem;
-        }
-        
-        .card-header {
-            background-color: var(--light-color);
-            padding: 1rem 1.5rem;
-            border-bottom: 1px solid #ddd;
-            font-weight: bold;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .card-body {
-            padding: 1.5rem;
-        }
-        
-        #map {
-            height: 500px;
-            width: 100%;
-            border-radius: 10px;
-        }
-        
-        .btn {
-            padding: 0.75rem 1.5rem;
-            border: none;
-            border-radius: 5px;
-            cursor: pointer;
-            font-weight: bold;
-            transition: all 0.3s ease;
-            font-size: 1rem;
-        }
-        
-        .btn-primary {
-            background-color: var(--primary-color);
-            color: white;
-        }
-        
-        .btn-primary:hover {
-            background-color: #2980b9;
-        }
-        
-        .btn-secondary {
-            background-color: var(--secondary-color);
-            color: white;
-        }
-        
-        .btn-secondary:hover {
-            background-color: #1a2530;
-        }
-        
-        .controls {
-            display: flex;
-            gap: 1rem;
-            margin-bottom: 1rem;
-            flex-wrap: wrap;
-        }
-        
-        #status {
-            padding: 0.75rem;
-            border-radius: 5px;
-            margin-bottom: 1rem;
-            background-color: #f8f9fa;
-            display: none;
-        }
-        
-        #status.visible {
-            display: block;
-        }
-        
-        .status-info {
-            background-color: var(--primary-color);
-            color: white;
-        }
-        
-        .status-success {
-            background-color: var(--success-color);
-            color: white;
-        }
-        
-        .status-warning {
-            background-color: var(--warning-color);
-            color: white;
-        }
-        
-        .status-error {
-            background-color: var(--danger-color);
-            color: white;
-        }
-        
-        .legend {
-            background: white;
-            padding: 10px;
-            border-radius: 5px;
-            box-shadow: 0 2px 5px rgba(0, 0, 0, 0.1);
-            margin-top: 1rem;
-        }
-        
-        .legend-item {
-            display: flex;
-            align-items: center;
-            margin-bottom: 5px;
-        }
-        
-        .legend-color {
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            margin-right: 10px;
-        }
-        
-        .color-high {
-            background-color: var(--danger-color);
-        }
-        
-        .color-moderate {
-            background-color: var(--warning-color);
-        }
-        
-        .color-low {
-            background-color: var(--success-color);
-        }
-        
-        .info-cards {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 1.5rem;
-            margin-top: 2rem;
-        }
-        
-        .info-card {
-            background-color: white;
-            border-radius: 10px;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05);
-            padding: 1.5rem;
-            display: flex;
-            flex-direction: column;
-            gap: 1rem;
-        }
-        
-        .info-card-header {
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-        
-        .info-card-header i {
-            font-size: 1.5rem;
-            color: var(--primary-color);
-        }
-        
-        .info-card h3 {
-            margin: 0;
-            color: var(--dark-color);
-        }
-        
-        .crime-stats {
-            display: flex;
-            gap: 1rem;
-            margin-top: 1rem;
-        }
-        
-        .stat-card {
-            flex: 1;
-            background-color: white;
-            border-radius: 10px;
-            padding: 1rem;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05);
-            text-align: center;
-        }
-        
-        .stat-card h3 {
-            color: var(--dark-color);
-            margin-bottom: 0.5rem;
-        }
-        
-        .stat-card .number {
-            font-size: 2rem;
-            font-weight: bold;
-            color: var(--primary-color);
-        }
-        
-        .stat-card.danger .number {
-            color: var(--danger-color);
-        }
-        
-        .stat-card.warning .number {
-            color: var(--warning-color);
-        }
-        
-        .stat-card.success .number {
-            color: var(--success-color);
-        }
-        
-        .marker-pin {
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            background-color: red;
-            opacity: 0.7;
-            border: 2px solid darkred;
-        }
-        
-        .marker-label {
-            font-size: 12px;
-            font-weight: bold;
-            color: #333;
-            text-align: center;
-            margin-top: 5px;
-        }
-        
-        .loading-overlay {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(255, 255, 255, 0.8);
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            z-index: 9999;
-        }
-        
-        .spinner {
-            width: 50px;
-            height: 50px;
-            border: 5px solid rgba(0, 0, 0, 0.1);
-            border-top-color: var(--primary-color);
-            border-radius: 50%;
-            animation: spin 1s ease-in-out infinite;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-        
-        footer {
-            background-color: var(--secondary-color);
-            color: white;
-            text-align: center;
-            padding: 2rem 0;
-            margin-top: 3rem;
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 1rem;
-            }
-            
-            #map {
-                height: 400px;
-            }
-            
-            .crime-stats {
-                flex-direction: column;
-            }
-            
-            .navbar {
-                padding: 1rem;
-            }
+
+
+def read_boundaries(path, name_fields=BOUNDARY_NAME_FIELDS):
+    """(name, polygons) pairs from a GeoJSON file of district boundaries"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    features = data.get("features", []) if data.get("type") == "FeatureCollection" else [data]
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        name = next((properties[field] for field in name_fields if properties.get(field)), None)
+        if name is None:
+            continue
+        if geometry.get("type") == "Polygon":
+            yield str(name).strip(), [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            yield str(name).strip(), geometry["coordinates"]
+
+def load_boundaries(path):
+    """DistrictBoundaries for the GeoJSON file at `path` - empty if there is no file"""
+    started = time.perf_counter()
+    if not path or not os.path.exists(path):
+        if path:
+            print(f"⚠️ Boundary file {path} not found, districts are located by nearest centroid")
+        return DistrictBoundaries([])
+    boundaries = DistrictBoundaries(read_boundaries(path))
+    print(f"🗺️ Boundaries: {len(boundaries)} districts in {time.perf_counter() - started:.2f}s")
+    return boundaries
+
+_boundaries = None
+_boundaries_lock = threading.Lock()
+
+def get_boundaries():
+    """The process-wide DistrictBoundaries, loaded on first use"""
+    global _boundaries
+    if _boundaries is None:
+        with _boundaries_lock:
+            if _boundaries is None:
+                _boundaries = load_boundaries(BOUNDARIES_PATH)
+    return _boundaries
+
+def locate_district(dataset, lat, lng):
+    """(district record, method) for a coordinate - the district whose boundary contains it
+    ("polygon"), otherwise the one with the nearest centroid ("nearest"); (None, None) if there are none"""
+    boundaries = get_boundaries()
+    feature = boundaries.locate(lat, lng)
+    if feature is not None:
+        district = dataset.find(boundaries.names[feature])
+        if district:
+            return district, "polygon"
+    indices, _ = dataset.spatial_index.query(lat, lng, k=1)
+    if len(indices):
+        return dataset.districts[int(indices[0])], "nearest"
+    return None, None
+
+# One table of risk thresholds for the whole app - the map, the legend, the stat cards and the
+# safety tips all use the tier computed on the server. A district is "high" above the high
+# threshold and "moderate" from the moderate threshold up. SAFECITY_RISK_THRESHOLDS="high,moderate"
+# overrides the numbers; SAFECITY_RISK_MODE=quantile derives them from the data instead.
+DEFAULT_RISK_THRESHOLDS = {"high": 10000, "moderate": 5000}
+
+def parse_risk_thresholds(spec):
+    """{"high": .., "moderate": ..} from "high,moderate"; the defaults, with a warning, if spec isn't two
+    whole numbers with moderate <= high"""
+    if not spec:
+        return dict(DEFAULT_RISK_THRESHOLDS)
+    try:
+        high, moderate = (int(value) for value in spec.split(","))
+        if moderate > high:
+            raise ValueError("the moderate threshold is above the high one")
+    except ValueError as e:
+        print(f"⚠️ Ignoring SAFECITY_RISK_THRESHOLDS={spec!r} ({e}) - expected \"high,moderate\", "
+              f"using {DEFAULT_RISK_THRESHOLDS['high']},{DEFAULT_RISK_THRESHOLDS['moderate']}")
+        return dict(DEFAULT_RISK_THRESHOLDS)
+    return {"high": high, "moderate": moderate}
+
+RISK_THRESHOLDS = parse_risk_thresholds(os.environ.get("SAFECITY_RISK_THRESHOLDS"))
+RISK_MODE = os.environ.get("SAFECITY_RISK_MODE", "thresholds")
+# Quantile mode: the top third of districts are high risk, the middle third moderate
+RISK_QUANTILES = {"high": 2 / 3, "moderate": 1 / 3}
+RISK_LEVELS = ("high", "moderate", "low")
+
+def compute_risk_thresholds(crime_counts, mode=None):
+    """Resolve the threshold table for one dataset - fixed numbers, or quantile bins of the counts"""
+    mode = mode or RISK_MODE
+    if mode == "quantile" and len(crime_counts):
+        counts = np.asarray(crime_counts, dtype=np.float64)
+        return {level: int(np.quantile(counts, q)) for level, q in RISK_QUANTILES.items()}
+    if mode not in ("thresholds", "quantile"):
+        raise ValueError(f"Unknown SAFECITY_RISK_MODE {mode!r}")
+    return dict(RISK_THRESHOLDS)
+
+def risk_level(crime_count, thresholds=None):
+    """'high', 'moderate' or 'low' for a district's total crime count"""
+    thresholds = thresholds or RISK_THRESHOLDS
+    if crime_count > thresholds["high"]:
+        return "high"
+    if crime_count >= thresholds["moderate"]:
+        return "moderate"
+    return "low"
+
+# Safety tips per risk level, served by /api/safety-tips
+SAFETY_TIPS = {
+    "high": [
+        "Avoid traveling alone, especially at night",
+        "Keep valuables secure and out of sight",
+        "Stay in well-lit and populated areas",
+        "Share your live location with family members",
+        "Keep emergency contacts easily accessible"
+    ],
+    "moderate": [
+        "Be aware of your surroundings",
+        "Avoid displaying expensive items in public",
+        "Travel in groups when possible",
+        "Keep your phone charged for emergencies",
+        "Know the nearest police stations"
+    ],
+    "low": [
+        "Basic precautions are still recommended",
+        "Keep emergency contact numbers handy",
+        "Be cautious in unfamiliar areas",
+        "Lock vehicles and homes securely",
+        "Report any suspicious activities"
+    ],
+}
+
+
+# Server-side clustering for the GeoJSON endpoint. At zoom levels up to CLUSTER_MAX_ZOOM points are
+# grouped into a grid of CLUSTER_CELLS_PER_TILE x CLUSTER_CELLS_PER_TILE cells per 256px map tile
+# (~64px cells); above it every point is returned individually.
+CLUSTER_MAX_ZOOM = 12
+CLUSTER_CELLS_PER_TILE = 4
+RISK_RANKS = {"low": 0, "moderate": 1, "high": 2}
+
+def to_mercator(latitudes, longitudes):
+    """Latitude/longitude -> Web Mercator x/y in [0, 1), the same space as map tiles"""
+    lat = np.clip(np.asarray(latitudes, dtype=np.float64), -85.05112878, 85.05112878)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    x = (lon + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+class ClusterIndex:
+    """Hierarchical grid of pre-aggregated clusters, one level per zoom
+
+    Built once per dataset version. Each level stores, per occupied grid cell,
+    the member count, total crimes, highest risk level, mean position and the
+    position of one member (used when the cell holds a single point).
+    """
+
+    def __init__(self, records, max_zoom=CLUSTER_MAX_ZOOM, cells_per_tile=CLUSTER_CELLS_PER_TILE):
+        self.records = records
+        self.max_zoom = max_zoom
+        self.lats = np.array([r["latitude"] for r in records], dtype=np.float64)
+        self.lons = np.array([r["longitude"] for r in records], dtype=np.float64)
+        crimes = np.array([r["crimeCount"] for r in records], dtype=np.float64)
+        ranks = np.array([RISK_RANKS[r["riskLevel"]] for r in records], dtype=np.int8)
+        x, y = to_mercator(self.lats, self.lons)
+
+        self.levels = []
+        for zoom in range(max_zoom + 1):
+            cells = (2 ** zoom) * cells_per_tile
+            keys = np.floor(x * cells).astype(np.int64) * cells + np.floor(y * cells).astype(np.int64)
+            unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            count = np.bincount(inverse, minlength=len(unique_keys))
+            max_rank = np.zeros(len(unique_keys), dtype=np.int8)
+            np.maximum.at(max_rank, inverse, ranks)
+            self.levels.append({
+                "count": count,
+                "crimes": np.bincount(inverse, weights=crimes, minlength=len(unique_keys)).astype(np.int64),
+                "rank": max_rank,
+                "lat": np.bincount(inverse, weights=self.lats, minlength=len(unique_keys)) / count,
+                "lon": np.bincount(inverse, weights=self.lons, minlength=len(unique_keys)) / count,
+                "member": first,
+            })
+
+    def features(self, bbox, zoom):
+        """GeoJSON features inside bbox = (west, south, east, north) at an integer zoom
+
+        A bbox with west > east crosses the antimeridian: it covers west..180 and -180..east.
+        """
+        west, south, east, north = bbox
+        def inside_bbox(lats, lons):
+            if west <= east:
+                in_lons = (lons >= west) & (lons <= east)
+            else:
+                in_lons = (lons >= west) | (lons <= east)
+            return np.flatnonzero(in_lons & (lats >= south) & (lats <= north))
+
+        if zoom > self.max_zoom:
+            inside = inside_bbox(self.lats, self.lons)
+            return [self._point_feature(i) for i in inside.tolist()]
+
+        level = self.levels[max(0, zoom)]
+        inside = inside_bbox(level["lat"], level["lon"])
+        risk_names = {rank: name for name, rank in RISK_RANKS.items()}
+        features = []
+        for i in inside.tolist():
+            count = int(level["count"][i])
+            if count == 1:
+                features.append(self._point_feature(int(level["member"][i])))
+                continue
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(level["lon"][i]), float(level["lat"][i])]},
+                "properties": {
+                    "cluster": True,
+                    "pointCount": count,
+                    "crimeCount": int(level["crimes"][i]),
+                    "riskLevel": risk_names[int(level["rank"][i])],
+                },
+            })
+        return features
+
+    def _point_feature(self, i):
+        record = self.records[i]
+        return {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [record["longitude"], record["latitude"]]},
+            "properties": dict(record, cluster=False),
         }
-    </style>
-</head>
-<body>
-    <!-- Loading overlay -->
-    <div class="loading-overlay" id="loadingOverlay">
-        <div class="spinner"></div>
-    </div>
+
+
+# Heatmap tiles: a kernel-density surface of crime counts with a HEAT_BANDWIDTH_KM Gaussian kernel,
+# rendered as 256px PNG map tiles and cached in memory and on disk per dataset version
+HEAT_TILE_SIZE = 256
+HEAT_BANDWIDTH_KM = float(os.environ.get("SAFECITY_HEAT_BANDWIDTH_KM", "20"))
+HEAT_MAX_ZOOM = 16
+HEAT_MAX_BINS = 512
+# Narrowest kernel drawn, in pixels - below this, points fall between pixel centres and vanish
+HEAT_MIN_SIGMA_PX = 1.0
+# Part of every tile's cache key and ETag - bump it when rendering changes so cached tiles are redrawn
+HEAT_RENDER_VERSION = 2
+HEAT_TILE_CACHE_DIR = os.environ.get("SAFECITY_TILE_CACHE", "tile_cache")
+HEAT_TILE_CACHE_ITEMS = 1024
+EARTH_CIRCUMFERENCE_KM = 2 * math.pi * 6378.137
+# Colour ramp from transparent through green and yellow to red: (position, r, g, b, alpha)
+HEAT_COLOR_STOPS = np.array([
+    [0.00, 46, 204, 113, 0],
+    [0.15, 46, 204, 113, 110],
+    [0.45, 241, 196, 15, 170],
+    [0.75, 243, 156, 18, 200],
+    [1.00, 231, 76, 60, 230],
+], dtype=np.float64)
+
+def gaussian_density(px, py, weights, sigma, width, height, pad):
+    """Weighted Gaussian kernel density of points (in pixel coordinates) at the pixel centres of a raster
+
+    Points are first binned into at most HEAT_MAX_BINS bins per axis over the raster
+    plus `pad` pixels on each side, then smoothed with two Gaussian matrix products,
+    so the cost doesn't grow with the number of points.
+    """
+    sigma = max(float(sigma), 1e-6)
+    def axis(size):
+        span = size + 2 * pad
+        edges = np.linspace(-pad, size + pad, int(min(max(math.ceil(span), 1), HEAT_MAX_BINS)) + 1)
+        centres = (edges[:-1] + edges[1:]) / 2
+        pixels = np.arange(size) + 0.5
+        kernel = np.exp(-((pixels[:, None] - centres[None, :]) ** 2) / (2 * sigma * sigma))
+        return edges, kernel
+    edges_x, kernel_x = axis(width)
+    edges_y, kernel_y = axis(height)
+    binned, _, _ = np.histogram2d(py, px, bins=[edges_y, edges_x], weights=weights)
+    return kernel_y @ binned @ kernel_x.T
+
+def encode_png(rgba):
+    """Encode an (h, w, 4) uint8 array as a PNG - zlib only, no imaging library needed"""
+    height, width = rgba.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)  # filter byte 0 (None) on every row
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+def colorize_density(density, reference):
+    """Map density / reference onto HEAT_COLOR_STOPS as RGBA"""
+    value = np.sqrt(np.clip(density / reference, 0.0, 1.0)) if reference > 0 else np.zeros_like(density)
+    rgba = np.empty(density.shape + (4,), dtype=np.uint8)
+    for channel in range(4):
+        rgba[..., channel] = np.interp(value, HEAT_COLOR_STOPS[:, 0], HEAT_COLOR_STOPS[:, channel + 1]).astype(np.uint8)
+    return rgba
+
+
+class HeatmapRenderer:
+    """Renders heatmap tiles for one dataset version
+
+    Every tile is scaled against the same reference density (the peak of the surface,
+    computed once), so colours match across tiles and zoom levels.
+    """
+
+    def __init__(self, records, bandwidth_km=HEAT_BANDWIDTH_KM):
+        self.bandwidth_km = bandwidth_km
+        lats = np.array([r["latitude"] for r in records], dtype=np.float64)
+        lons = np.array([r["longitude"] for r in records], dtype=np.float64)
+        self.weights = np.array([r["crimeCount"] for r in records], dtype=np.float64)
+        self.x, self.y = to_mercator(lats, lons)
+        self.mean_lat = float(lats.mean()) if len(lats) else 0.0
+        self.reference = self._reference_density()
+        self.empty_tile = encode_png(np.zeros((HEAT_TILE_SIZE, HEAT_TILE_SIZE, 4), dtype=np.uint8))
+
+    def sigma_pixels(self, zoom, lat):
+        # Kernel width in pixels at this zoom - Mercator stretches distances by 1/cos(lat)
+        pixels_per_km = HEAT_TILE_SIZE * 2 ** zoom / (EARTH_CIRCUMFERENCE_KM * max(math.cos(math.radians(lat)), 0.01))
+        return self.bandwidth_km * pixels_per_km
+
+    def _reference_density(self):
+        if not len(self.x):
+            return 0.0
+        # Sample the whole surface at the zoom where the kernel is ~2px wide, capped at 1024px
+        zoom = math.log2(2.0 / self.sigma_pixels(0, self.mean_lat))
+        scale = HEAT_TILE_SIZE * 2 ** zoom
+        pad = 3 * 2.0
+        left, top = self.x.min() * scale - pad, self.y.min() * scale - pad
+        width = int(min(math.ceil(self.x.max() * scale - left + pad), 1024)) or 1
+        height = int(min(math.ceil(self.y.max() * scale - top + pad), 1024)) or 1
+        shrink = max((self.x.max() * scale - left + pad) / width, (self.y.max() * scale - top + pad) / height, 1.0)
+        density = gaussian_density((self.x * scale - left) / shrink, (self.y * scale - top) / shrink,
+                                   self.weights, 2.0 / shrink, width, height, pad / shrink)
+        return float(density.max())
+
+    def render(self, z, x, y):
+        """PNG bytes for tile z/x/y"""
+        scale = HEAT_TILE_SIZE * 2 ** z
+        tile_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / 2 ** z))))
+        true_sigma = self.sigma_pixels(z, tile_lat)
+        sigma = max(true_sigma, HEAT_MIN_SIGMA_PX)
+        pad = 3 * sigma
+        px = self.x * scale - x * HEAT_TILE_SIZE
+        py = self.y * scale - y * HEAT_TILE_SIZE
+        near = (px >= -pad) & (px < HEAT_TILE_SIZE + pad) & (py >= -pad) & (py < HEAT_TILE_SIZE + pad)
+        if not near.any():
+            return self.empty_tile
+        density = gaussian_density(px[near], py[near], self.weights[near], sigma,
+                                   HEAT_TILE_SIZE, HEAT_TILE_SIZE, pad)
+        if sigma > true_sigma:
+            # A widened kernel spreads the same weight over more pixels - scale it back down
+            density *= (true_sigma / sigma) ** 2
+        return encode_png(colorize_density(density, self.reference))
+
+
+class TileCache:
+    """Bounded in-memory LRU of rendered tiles, backed by a per-version directory on disk"""
+
+    def __init__(self, directory=HEAT_TILE_CACHE_DIR, max_items=HEAT_TILE_CACHE_ITEMS, keep_versions=2):
+        self.directory = directory
+        self.max_items = max_items
+        self.keep_versions = keep_versions
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions_seen = set()
+
+    def _path(self, version, z, x, y):
+        return os.path.join(self.directory, version, str(z), str(x), f"{y}.png")
+
+    def get(self, version, z, x, y):
+        key = (version, z, x, y)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        if data is not None:
+            CACHE_LOOKUPS.inc("heat_tiles", "hit")
+            return data
+        path = self._path(version, z, x, y)
+        if self.directory and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            self._remember(key, data)
+            with self._lock:
+                self.disk_hits += 1
+            CACHE_LOOKUPS.inc("heat_tiles", "disk_hit")
+            return data
+        with self._lock:
+            self.misses += 1
+        CACHE_LOOKUPS.inc("heat_tiles", "miss")
+        return None
+
+    def put(self, version, z, x, y, data):
+        self._remember((version, z, x, y), data)
+        if not self.directory:
+            return
+        if version not in self._versions_seen:
+            self._versions_seen.add(version)
+            self._prune_versions(version)
+        path = self._path(version, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _prune_versions(self, current):
+        # Keep the current version and the most recent others, drop older tile directories
+        if not os.path.isdir(self.directory):
+            return
+        others = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name != current]
+        others = sorted((p for p in others if os.path.isdir(p)), key=os.path.getmtime, reverse=True)
+        for stale in others[self.keep_versions - 1:]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "diskHits": self.disk_hits, "misses": self.misses,
+                    "items": len(self._memory), "directory": self.directory}
+
+
+tile_cache = TileCache()
+
+
+class FrozenRecord(dict):
+    """A district record that can be shared between requests but not modified"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("dataset records are read-only, copy them with dict(record) first")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+class PrecompressedPayload:
+    """A response body encoded once - identity, gzip and (if available) brotli - with a content-hash ETag"""
+
+    def __init__(self, body, mimetype="application/json"):
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+    def etag_for(self, encoding):
+        # Each encoding is a different representation, so it gets its own strong ETag
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+    def choose_encoding(self, accept_encodings):
+        """Best pre-encoded variant the client accepts"""
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return "identity"
+
+
+def json_bytes(obj):
+    """Compact, key-sorted JSON - the same bytes for the same data in every worker"""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class DatasetSnapshot:
+    """One immutable build of the district dataset"""
+
+    def __init__(self, districts, source_key):
+        # Risk tiers are classified once per dataset version and embedded in each record
+        self.risk_thresholds = compute_risk_thresholds([d["crimeCount"] for d in districts])
+        self.districts = tuple(
+            FrozenRecord(d, id=district_id(d["district"]),
+                         riskLevel=risk_level(d["crimeCount"], self.risk_thresholds))
+            for d in districts
+        )
+        self.risk_counts = {level: 0 for level in RISK_LEVELS}
+        for d in self.districts:
+            self.risk_counts[d["riskLevel"]] += 1
+        self.source_key = source_key
+        # Any spelling of a district name -> its position in self.districts
+        self.name_index = DistrictNameIndex([d["district"] for d in self.districts])
+        # Built once per dataset version and shared by every proximity query
+        self.spatial_index = SpatialIndex([d["latitude"] for d in self.districts],
+                                          [d["longitude"] for d in self.districts])
+        self.built_at = time.time()
+        # Last-Modified follows the source file, so every worker reports the same time
+        mtime_ns = source_key[1] if source_key else None
+        self.last_modified = int(mtime_ns / 1e9) if mtime_ns else int(self.built_at)
+        # Content version of the records, stable across rebuilds of identical data
+        encoded = json.dumps(self.districts, sort_keys=True).encode("utf-8")
+        self.version = hashlib.sha256(encoded).hexdigest()[:16]
+        self._payloads = {}
+        self._derived = {}
+        self._payload_lock = threading.Lock()
+
+    def derived(self, name, build):
+        """A structure built from this snapshot with build(), once per dataset version"""
+        value = self._derived.get(name)
+        if value is None:
+            with self._payload_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = build()
+                    self._derived[name] = value
+        return value
+
+    def cluster_index(self):
+        return self.derived("clusters", lambda: ClusterIndex(self.districts))
+
+    def heatmap(self):
+        return self.derived("heatmap", lambda: HeatmapRenderer(self.districts))
+
+    def find(self, name):
+        """The district record for any spelling of its name, or None"""
+        position = self.name_index.lookup(name)
+        return None if position is None else self.districts[position]
+
+    def payload(self, name, build, mimetype="application/json"):
+        """PrecompressedPayload for `name`, built with build() once per dataset version"""
+        payload = self._payloads.get(name)
+        if payload is None:
+            with self._payload_lock:
+                payload = self._payloads.get(name)
+                if payload is None:
+                    with timed_stage("json_encode"):
+                        body = build()
+                        body = body if isinstance(body, bytes) else json_bytes(body)
+                    with timed_stage("compress"):
+                        payload = PrecompressedPayload(body, mimetype)
+                    self._payloads[name] = payload
+        return payload
+
+
+def payload_response(payload, last_modified=None, cache_control="public, no-cache"):
+    """Serve a PrecompressedPayload with ETag/Last-Modified, 304s and Accept-Encoding negotiation"""
+    encoding = payload.choose_encoding(request.accept_encodings)
+    etag = payload.etag_for(encoding)
     
-    <!-- Navigation Bar -->
-    <nav class="navbar">
-        <div class="navbar-brand">
-            <i class="fas fa-shield-alt"></i>
-            <span>Safe City - Telangana</span>
-        </div>
-        <div>
-            <button id="aboutBtn" class="btn btn-secondary">About</button>
-        </div>
-    </nav>
+    # If-None-Match wins over If-Modified-Since; any of our variants' ETags is a match
+    not_modified = False
+    if request.if_none_match:
+        not_modified = any(request.if_none_match.contains_weak(payload.etag_for(e)) for e in payload.bodies)
+    elif request.if_modified_since and last_modified is not None:
+        not_modified = int(request.if_modified_since.timestamp()) >= int(last_modified)
     
-    <div class="container">
-        <div class="header">
-            <h1>Telangana Crime Map</h1>
-            <p>Explore district-wise crime data in Telangana to stay informed and make safer decisions.</p>
-        </div>
-        
-        <div id="status" class="status-info"></div>
-        
-        <div class="card">
-            <div class="card-header">
-                <span>Crime Map by District</span>
-                <div>
-                    <select id="dataView">
-                        <option value="districts">District View</option>
-                        <option value="heatmap">Heatmap View</option>
-                    </select>
-                </div>
-            </div>
-            <div class="card-body">
-                <div class="controls">
-                    <button id="resetBtn" class="btn btn-secondary">
-                        <i class="fas fa-undo"></i> Reset Map
-                    </button>
-                    <button id="locateBtn" class="btn btn-primary">
-                        <i class="fas fa-map-marker-alt"></i> Show My Location
-                    </button>
-                </div>
-                
-                <div id="map"></div>
-                
-                <div class="legend">
-                    <h3>Crime Level Indicators</h3>
-                    <div class="legend-item">
-                        <div class="legend-color color-high"></div>
-                        <span>High Crime Rate (>800 cases)</span>
-                    </div>
-                    <div class="legend-item">
-                        <div class="legend-color color-moderate"></div>
-                        <span>Moderate Crime Rate (300-800 cases)</span>
-                    </div>
-                    <div class="legend-item">
-                        <div class="legend-color color-low"></div>
-                        <span>Low Crime Rate (<300 cases)</span>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <div class="crime-stats">
-            <div class="stat-card danger">
-                <h3>High Risk Districts</h3>
-                <div class="number" id="highRiskCount">0</div>
-                <p>Districts with >10,000 cases</p>
-            </div>
-            <div class="stat-card warning">
-                <h3>Moderate Risk Districts</h3>
-                <div class="number" id="moderateRiskCount">0</div>
-                <p>Districts with 5,000-10,000 cases</p>
-            </div>
-            <div class="stat-card success">
-                <h3>Low Risk Districts</h3>
-                <div class="number" id="lowRiskCount">0</div>
-                <p>Districts with <5,000 cases</p>
-            </div>
-        </div>
-        
-        <div class="info-cards">
-            <div class="info-card">
-                <div class="info-card-header">
-                    <i class="fas fa-exclamation-triangle"></i>
-                    <h3>Data Sources</h3>
-                </div>
-                <p>This map visualizes crime data extracted from the Telangana State Crime Report. The data shows total crime cases reported across different districts.</p>
-                <p>The red markers represent district centers, with labels showing district name and total number of cases.</p>
-            </div>
-            
-            <div class="info-card">
-                <div class="info-card-header">
-                    <i class="fas fa-lightbulb"></i>
-                    <h3>Safety Tips</h3>
-                </div>
-                <ul>
-                    <li>Be aware of your surroundings, especially in high-risk areas</li>
-                    <li>Keep valuables secure and out of sight</li>
-                    <li>Travel in groups when possible in less familiar areas</li>
-                    <li>Share your location with trusted contacts when traveling</li>
-                </ul>
-            </div>
-            
-            <div class="info-card">
-                <div class="info-card-header">
-                    <i class="fas fa-info-circle"></i>
-                    <h3>About This Tool</h3>
-                </div>
-                <p>This tool combines data extraction from PDF reports with interactive mapping to help citizens make informed decisions about safety.</p>
-                <p>The map highlights crime hotspots across Telangana districts based on official crime statistics.</p>
-            </div>
-        </div>
-    </div>
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(payload.bodies[encoding], mimetype=payload.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(last_modified, tz=timezone.utc)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Builds the district dataset once per process and rebuilds only when the source file changes
+
+    The source is the crime statement PDF, or a precompiled snapshot (see write_snapshot).
+    The cache is keyed on the file's path, mtime and content hash. Every request does a
+    cheap os.stat(); the file is only re-hashed when its mtime or size moves, and the
+    dataset is only rebuilt when the hash actually differs. If a rebuild fails (the file
+    vanished or is unreadable), the last good dataset keeps being served.
+    """
+
+    def __init__(self, source_path, builder=None):
+        self.source_path = source_path
+        self.builder = builder or process_crime_data
+        self.hits = 0
+        self.misses = 0
+        self.failed_rebuilds = 0
+        self._lock = threading.Lock()
+        self._stat = None
+        self._snapshot = None
+
+    def _source_stat(self):
+        # Returns None when we're running on sample data
+        if self.source_path is None or not os.path.exists(self.source_path):
+            return None
+        st = os.stat(self.source_path)
+        return (self.source_path, st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        """Return the current DatasetSnapshot, rebuilding it only if the source changed"""
+        stat = self._source_stat()
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and stat == self._stat:
+                self.hits += 1
+                CACHE_LOOKUPS.inc("dataset", "hit")
+                return snapshot
+
+            if stat is None:
+                key = (None, None, "sample")
+            else:
+                key = (stat[0], stat[1], file_sha256(self.source_path))
+
+            # The file was touched but its contents are the same - keep the snapshot
+            if snapshot is not None and key[0] == snapshot.source_key[0] and key[2] == snapshot.source_key[2]:
+                self._stat = stat
+                self.hits += 1
+                CACHE_LOOKUPS.inc("dataset", "hit")
+                return snapshot
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc("dataset", "miss")
+            try:
+                with timed_stage("dataset_build"):
+                    rebuilt = DatasetSnapshot(self.builder(stat[0] if stat else None), key)
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                # Keep the last good dataset, and don't retry until the source changes again
+                self.failed_rebuilds += 1
+                self._stat = stat
+                print(f"⚠️ Still serving dataset {snapshot.version}, rebuild failed: {str(e)[:80]}")
+                return snapshot
+            self._snapshot = rebuilt
+            self._stat = stat
+            return self._snapshot
+
+    def publish(self, records, source_key):
+        """Serve `records`, built outside get(), until the source file changes"""
+        with self._lock:
+            self._snapshot = DatasetSnapshot(records, source_key)
+            self._stat = self._source_stat()
+
+    def invalidate(self):
+        """Drop the current snapshot so the next get() rebuilds it"""
+        with self._lock:
+            self._snapshot = None
+            self._stat = None
+
+    def stats(self):
+        snapshot = self._snapshot
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / total, 4) if total else 0.0,
+            "failedRebuilds": self.failed_rebuilds,
+            "version": snapshot.version if snapshot else None,
+            "builtAt": snapshot.built_at if snapshot else None,
+            "districtCount": len(snapshot.districts) if snapshot else 0,
+            "riskThresholds": snapshot.risk_thresholds if snapshot else None,
+            "riskCounts": snapshot.risk_counts if snapshot else None,
+            "source": self.source_path,
+        }
+
+
+# Precompiled columnar snapshot written by `python SafeCityDraft1.py ingest`.
+# When it exists the server loads it instead of parsing the PDF.
+SNAPSHOT_PATH = os.environ.get("SAFECITY_SNAPSHOT", os.path.join("data", "districts.npz"))
+SNAPSHOT_FORMAT_VERSION = 1
+
+def write_snapshot(districts, path, source=None):
+    """Write district records to a compact .npz with one typed array per column"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    columns = {
+        "format_version": np.array(SNAPSHOT_FORMAT_VERSION, dtype=np.int32),
+        "district": np.array([d["district"] for d in districts], dtype=np.str_),
+        "crime_count": np.array([d["crimeCount"] for d in districts], dtype=np.int32),
+        "latitude": np.array([d["latitude"] for d in districts], dtype=np.float64),
+        "longitude": np.array([d["longitude"] for d in districts], dtype=np.float64),
+        "source": np.array(source or "", dtype=np.str_),
+        "source_sha256": np.array(file_sha256(source) if source and os.path.exists(source) else "", dtype=np.str_),
+        "built_at": np.array(time.time(), dtype=np.float64),
+    }
+    # Write next to the target and rename, so a running server never sees a half-written file
+    tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp_path, path)
+    return path
+
+@timed_stage("load_snapshot")
+def load_snapshot(path):
+    """Load district records from a snapshot written by write_snapshot - no pdfplumber or pandas involved"""
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["format_version"])
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {version} in {path}")
+        names = data["district"].tolist()
+        counts = data["crime_count"].tolist()
+        lats = data["latitude"].tolist()
+        lons = data["longitude"].tolist()
+    return [
+        {"district": name, "crimeCount": count, "latitude": lat, "longitude": lon}
+        for name, count, lat, lon in zip(names, counts, lats, lons)
+    ]
+
+# What np.load and the column reads raise for a missing, truncated or foreign snapshot file
+SNAPSHOT_READ_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile)
+
+def snapshot_source_sha256(path):
+    """Hash of the PDF a snapshot was built from ("" for sample data), or None without a readable
+    snapshot in the current format"""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != SNAPSHOT_FORMAT_VERSION:
+                return None
+            return str(data["source_sha256"])
+    except SNAPSHOT_READ_ERRORS:
+        return None
+
+
+class DatasetUnavailable(Exception):
+    """There is no district snapshot to serve yet"""
+
+
+def _load_snapshot(path):
+    # Cache builder for the request path - it only ever loads the snapshot, never parses the PDF
+    if path is None:
+        raise DatasetUnavailable(f"No district snapshot at {SNAPSHOT_PATH} yet - run `python SafeCityDraft1.py ingest`")
+    try:
+        return load_snapshot(path)
+    except SNAPSHOT_READ_ERRORS as e:
+        raise DatasetUnavailable(f"District snapshot {path} is unreadable ({str(e)[:80]}) - "
+                                 f"run `python SafeCityDraft1.py ingest`") from e
+
+def ingest_main(argv):
+    """`python SafeCityDraft1.py ingest` - run the PDF pipeline once and write the snapshot"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="SafeCityDraft1.py ingest",
+                                     description="Build the district snapshot served by the app")
+    parser.add_argument("--pdf", default=PDF_PATH, help="crime statement PDF (default: SAFECITY_PDF_PATH, or sample data)")
+    parser.add_argument("--out", default=SNAPSHOT_PATH, help="snapshot path (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    districts = process_crime_data(args.pdf)
+    write_snapshot(districts, args.out, source=args.pdf)
+    print(f"💾 Wrote {len(districts)} districts to {args.out} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+# Shared by every endpoint so the dataset is built once per process. Requests only ever load the
+# precompiled snapshot (and reload it when `ingest` replaces it); the PDF pipeline runs in the
+# ingest command or in warm_up(), never while serving.
+dataset_cache = DatasetCache(SNAPSHOT_PATH or None, _load_snapshot)
+if SNAPSHOT_PATH and os.path.exists(SNAPSHOT_PATH):
+    # Loads in milliseconds, so do it at startup. A corrupt or outdated snapshot must not stop the
+    # import - warm_up() (ensure_snapshot) rebuilds it before anything is served.
+    try:
+        dataset_cache.get()
+        print(f"📦 Loaded district snapshot from {SNAPSHOT_PATH}")
+    except DatasetUnavailable as e:
+        print(f"⚠️ {e}")
+
+def get_dataset():
+    """Current immutable dataset snapshot shared by all endpoints - raises DatasetUnavailable before the first ingest"""
+    return dataset_cache.get()
+
+def ensure_snapshot():
+    """Run the PDF pipeline (or sample data) if the snapshot is missing or was built from another PDF
+
+    Called from warm_up(), so a fresh deploy ingests once in the gunicorn master instead of in a request.
+    """
+    pdf_sha = file_sha256(PDF_PATH) if PDF_PATH and os.path.exists(PDF_PATH) else None
+    current = snapshot_source_sha256(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+    if current is not None and (pdf_sha is None or current == pdf_sha):
+        return
+    districts = process_crime_data(PDF_PATH)
+    try:
+        if not SNAPSHOT_PATH:
+            raise OSError("SAFECITY_SNAPSHOT is empty")
+        write_snapshot(districts, SNAPSHOT_PATH, source=PDF_PATH)
+        print(f"💾 Wrote {len(districts)} districts to {SNAPSHOT_PATH}")
+    except OSError as e:
+        print(f"⚠️ Could not write the snapshot ({e}), serving the dataset from memory")
+        dataset_cache.publish(districts, (PDF_PATH, None, pdf_sha or "sample"))
+
+@app.errorhandler(DatasetUnavailable)
+def dataset_unavailable(e):
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = "30"
+    return response, 503
+
+# Multi-year time series: crime counts per district per period, built by
+# `python SafeCityDraft1.py ingest-timeseries --csv counts.csv` from a district,period,count CSV
+TIMESERIES_PATH = os.environ.get("SAFECITY_TIMESERIES", os.path.join("data", "timeseries.npz"))
+# How many store periods make up one bucket of each granularity
+GRANULARITY_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+def parse_period(text, end=False):
+    """Month index (year * 12 + month - 1) of "2021-07"; a bare "2021" means January, or December if end"""
+    text = str(text).strip()
+    match = re.fullmatch(r"(\d{4})(?:-(\d{1,2}))?", text)
+    if not match:
+        raise ValueError(f"Invalid period {text!r}, expected YYYY or YYYY-MM")
+    year = int(match.group(1))
+    if match.group(2) is None:
+        return year * 12 + (11 if end else 0)
+    month = int(match.group(2))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month in {text!r}")
+    return year * 12 + month - 1
+
+def format_period(month_index, granularity):
+    year, month = divmod(int(month_index), 12)
+    if granularity == "year":
+        return str(year)
+    if granularity == "quarter":
+        return f"{year}-Q{month // 3 + 1}"
+    return f"{year}-{month + 1:02d}"
+
+
+class TimeSeriesStore:
+    """Crime counts as a contiguous int32 district x period array with int64 prefix sums
+
+    The store's own step is a month or a year, whichever the source data uses.
+    Any [from, to] range for every district is prefix[:, to + 1] - prefix[:, from],
+    so a range query is O(1) per district no matter how many periods it spans.
+    """
+
+    def __init__(self, districts, start, step, counts):
+        self.districts = list(districts)
+        self.start = int(start)            # month index of the first period
+        self.step = int(step)              # months per stored period: 1 or 12
+        self.counts = np.ascontiguousarray(counts, dtype=np.int32)
+        self.prefix = np.zeros((self.counts.shape[0], self.counts.shape[1] + 1), dtype=np.int64)
+        np.cumsum(self.counts, axis=1, out=self.prefix[:, 1:])
+        self.name_index = DistrictNameIndex(self.districts)
+
+    @property
+    def granularity(self):
+        return "year" if self.step == 12 else "month"
+
+    @property
+    def end(self):
+        # Month index just past the last stored period
+        return self.start + self.counts.shape[1] * self.step
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (district, period, count) rows - periods all YYYY or all YYYY-MM"""
+        rows = [(MANUAL_NAME_INDEX.canonical(d) or d.strip(), str(p).strip(), int(c)) for d, p, c in rows]
+        if not rows:
+            raise ValueError("No time-series rows")
+        step = 12 if all(re.fullmatch(r"\d{4}", p) for _, p, _ in rows) else 1
+        months = [parse_period(p) for _, p, _ in rows]
+        start = min(months)
+        width = (max(months) - start) // step + 1
+        districts = list(dict.fromkeys(d for d, _, _ in rows))
+        positions = {d: i for i, d in enumerate(districts)}
+        counts = np.zeros((len(districts), width), dtype=np.int64)
+        # Duplicate rows for the same district and period are summed
+        np.add.at(counts,
+                  (np.array([positions[d] for d, _, _ in rows]), (np.array(months) - start) // step),
+                  np.array([c for _, _, c in rows], dtype=np.int64))
+        return cls(districts, start, step, counts)
+
+    @classmethod
+    def from_csv(cls, path):
+        import csv
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = [(row["district"], row["period"], row["count"]) for row in reader]
+        return cls.from_rows(rows)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, districts=np.array(self.districts, dtype=np.str_),
+                     start=np.array(self.start), step=np.array(self.step), counts=self.counts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["districts"].tolist(), int(data["start"]), int(data["step"]), data["counts"])
+
+    def query(self, first, last, granularity=None):
+        """Sums per district per bucket between month indexes first..last inclusive
+
+        Returns (bucket labels, (districts x buckets) int64 array).
+        """
+        granularity = granularity or self.granularity
+        if granularity == "total":
+            bucket_months = None
+        elif granularity in GRANULARITY_MONTHS:
+            bucket_months = GRANULARITY_MONTHS[granularity]
+            if bucket_months < self.step or bucket_months % self.step:
+                raise ValueError(f"Data is stored per {self.granularity}, can't answer per {granularity}")
+        else:
+            raise ValueError(f"granularity must be one of: total, {', '.join(GRANULARITY_MONTHS)}")
+
+        # Clamp to the stored range and convert month indexes to period offsets
+        first = max(first, self.start)
+        last = min(last, self.end - 1)
+        if last < first:
+            return [], np.zeros((len(self.districts), 0), dtype=np.int64)
+        lo = (first - self.start) // self.step
+        hi = (last - self.start) // self.step + 1
+
+        if bucket_months is None:
+            labels = [f"{format_period(self.start + lo * self.step, self.granularity)}"
+                      f"..{format_period(self.start + (hi - 1) * self.step, self.granularity)}"]
+            bounds = np.array([lo, hi])
+        else:
+            # Buckets aligned to calendar months/quarters/years, clipped to [lo, hi)
+            first_bucket = (self.start + lo * self.step) // bucket_months * bucket_months
+            starts = np.arange(first_bucket, self.start + hi * self.step, bucket_months)
+            labels = [format_period(month, granularity) for month in starts.tolist()]
+            bounds = np.clip((np.append(starts, starts[-1] + bucket_months) - self.start) // self.step, lo, hi)
+        sums = self.prefix[:, bounds[1:]] - self.prefix[:, bounds[:-1]]
+        return labels, sums
+
+
+_timeseries_lock = threading.Lock()
+_timeseries = {"stat": None, "store": None}
+
+def get_timeseries():
+    """The TimeSeriesStore at TIMESERIES_PATH, reloaded when the file changes - None if there isn't one"""
+    if not TIMESERIES_PATH or not os.path.exists(TIMESERIES_PATH):
+        return None
+    st = os.stat(TIMESERIES_PATH)
+    stat = (st.st_mtime_ns, st.st_size)
+    with _timeseries_lock:
+        if _timeseries["stat"] != stat:
+            _timeseries["store"] = TimeSeriesStore.load(TIMESERIES_PATH)
+            _timeseries["stat"] = stat
+        return _timeseries["store"]
+
+def ingest_timeseries_main(argv):
+    """`python SafeCityDraft1.py ingest-timeseries --csv counts.csv` - build the time-series store"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="SafeCityDraft1.py ingest-timeseries",
+                                     description="Build the time-series store from a district,period,count CSV")
+    parser.add_argument("--csv", required=True, help="CSV with district, period (YYYY or YYYY-MM) and count columns")
+    parser.add_argument("--out", default=TIMESERIES_PATH, help="store path (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = TimeSeriesStore.from_csv(args.csv)
+    store.save(args.out)
+    print(f"💾 Wrote {len(store.districts)} districts x {store.counts.shape[1]} {store.granularity}s to {args.out}")
+    return 0
+
+def crime_data_range():
+    # /api/crime-data?from=&to=&granularity= - answered from the time-series prefix sums
+    store = get_timeseries()
+    if store is None:
+        return jsonify({"error": "No time-series data loaded"}), 404
+    try:
+        first = parse_period(request.args['from']) if request.args.get('from') else store.start
+        last = parse_period(request.args['to'], end=True) if request.args.get('to') else store.end - 1
+        granularity = request.args.get('granularity') or store.granularity
+        labels, sums = store.query(first, last, granularity)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    <footer>
-        <p>&copy; 2025 Safe City | Privacy Policy | Terms of Service</p>
-    </footer>
+    # Join coordinates from the current district dataset where we know the district
+    dataset = get_dataset()
+    districts = []
+    for name, series in zip(store.districts, sums.tolist()):
+        record = dataset.find(name)
+        districts.append({
+            "district": name,
+            "id": district_id(name),
+            "latitude": record['latitude'] if record else None,
+            "longitude": record['longitude'] if record else None,
+            "total": sum(series),
+            "series": series,
+        })
+    return jsonify({"granularity": granularity, "periods": labels, "districts": districts})
+
+# Inline the current dataset into the index page (one request to first paint);
+# SAFECITY_INLINE_DATA=0 serves the plain page, which fetches /api/crime-data itself
+INDEX_INLINE_DATA = os.environ.get("SAFECITY_INLINE_DATA", "1") != "0"
+
+def crime_data_payload(dataset):
+    """The precompressed /api/crime-data body for a dataset version"""
+    return dataset.payload("crime-data", lambda: list(dataset.districts))
+
+def warm_up():
+    """Ingest if needed, then build the dataset and the structures behind the hot endpoints, so the first
+    request is served warm
+
+    gunicorn.conf.py calls this in the master process before it forks the workers, which then
+    share everything built here copy-on-write instead of each building their own.
+    """
+    started = time.perf_counter()
+    ensure_snapshot()
+    dataset = get_dataset()
+    crime_data_payload(dataset)
+    dataset.cluster_index()
+    get_timeseries()
+    get_gazetteer()
+    get_boundaries()
+    asset_pipeline.build()
+    print(f"🔥 Warmed up dataset {dataset.version} ({len(dataset.districts)} districts) in {time.perf_counter() - started:.2f}s")
+    return dataset
+
+def inline_json(obj):
+    """JSON that is safe inside a <script> element - "<" is escaped so the data can't close the tag"""
+    return json_bytes(obj).decode("utf-8").replace("<", "\\u003c")
+
+@app.route('/')
+def index():
+    # The legend and stat cards show the same thresholds the server classifies with
+    dataset = get_dataset()
+    if not INDEX_INLINE_DATA:
+        return render_template('index.html', risk_thresholds=dataset.risk_thresholds)
     
-    <script>
-        // Initialize map centered on Telangana
-        let map = L.map('map').setView([17.5, 78.5], 7);
-        L.tileLayer('https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png', {
-            attribution: '&copy; <a href="https://www.carto.com/">CartoDB</a> contributors',
-            subdomains: 'abcd',
-            maxZoom: 19
-        }).addTo(map);
-        
-        // Variables to track markers and data
-        let districtMarkers = L.layerGroup().addTo(map);
-        let statusElement = document.getElementById('status');
-        let loadingOverlay = document.getElementById('loadingOverlay');
-        let districtData = [];
-        
-        // Show loading overlay
-        function showLoading() {
-            loadingOverlay.style.display = 'flex';
-        }
-        
-        // Hide loading overlay
-        function hideLoading() {
-            loadingOverlay.style.display = 'none';
-        }
-        
-        // Initialize event listeners
-        document.getElementById('resetBtn').addEventListener('click', resetMap);
-        document.getElementById('aboutBtn').addEventListener('click', showAbout);
-        document.getElementById('dataView').addEventListener('change', function() {
-            renderMap(districtData);
-        });
-        document.getElementById('locateBtn').addEventListener('click', getUserLocation);
-        
-        // Function to get and display user location
-        function getUserLocation() {
-            if (navigator.geolocation) {
-                updateStatus('Fetching your location...', 'status-info');
-                
-                navigator.geolocation.getCurrentPosition(
-                    function(position) {
-                        // Success callback
-                        const userLat = position.coords.latitude;
-                        const userLng = position.coords.longitude;
-                        
-                        // Add a special marker for user location
-                        const userIcon = L.divIcon({
-                            className: 'user-location-marker',
-                            html: `
-                                <div style="background-color: #3498db; width: 20px; height: 20px; border-radius: 50%; border: 2px solid white; box-shadow: 0 0 10px rgba(0,0,0,0.5);"></div>
-                                <div style="font-weight: bold; text-align: center; margin-top: 5px;">Your Location'</div>
-                            `,
-                            iconSize: [40, 40],
-                            iconAnchor: [20, 20]
-                        });
-                        
-                        const userMarker = L.marker([userLat, userLng], {
-                            icon: userIcon
-                        }).addTo(map);
-                        
-                        userMarker.bindPopup('<strong>Your Location</strong>').openPopup();
-                        
-                        // Center the map on user's location with a closer zoom
-                        map.setView([userLat, userLng], 10);
-                        
-                        updateStatus('Your location detected!', 'status-success');
-                        setTimeout(() => {
-                            statusElement.classList.remove('visible');
-                        }, 3000);
-                    },
-                    function(error) {
-                        // Error callback
-                        let errorMessage;
-                        switch(error.code) {
-                            case error.PERMISSION_DENIED:
-                                errorMessage = "Location access denied. Please enable location services.";
-                                break;
-                            case error.POSITION_UNAVAILABLE:
-                                errorMessage = "Location information unavailable.";
-                                break;
-                            case error.TIMEOUT:
-                                errorMessage = "Location request timed out.";
-                                break;
-                            default:
-                                errorMessage = "An unknown error occurred while getting location.";
-                        }
-                        updateStatus(errorMessage, 'status-warning');
-                    }
-                );
-            } else {
-                updateStatus('Geolocation is not supported by your browser.', 'status-error');
-            }
-        }
-        
-        // Fetch crime data from API
-        async function fetchCrimeData() {
-            showLoading();
-            updateStatus('Fetching crime data...', 'status-info');
-            
-            try {
-                const response = await fetch('/api/crime-data');
-                const data = await response.json();
-                hideLoading();
-                updateStatus('Crime data loaded successfully!', 'status-success');
-                
-                // Save data and render map
-                districtData = data;
-                renderMap(data);
-                
-                // Hide status after delay
-                setTimeout(() => {
-                    statusElement.classList.remove('visible');
-                }, 3000);
-                
-            } catch (error) {
-                hideLoading();
-                updateStatus('Error loading crime data. Please try again later.', 'status-error');
-                console.error('Error fetching crime data:', error);
-            }
-        }
-        
-        // Render crime data on map
-        function renderMap(data) {
-            // Clear previous markers
-            districtMarkers.clearLayers();
-            
-            // Get view preference
-            const viewMode = document.getElementById('dataView').value;
-            
-            // Variables to count risk levels
-            let highRisk = 0, moderateRisk = 0, lowRisk = 0;
-            
-            // Process each district
-            data.forEach(district => {
-                // Determine risk level based on crime count
-                // Determine risk level based on crime count
-            let riskLevel, color, radius;
-            if (district.crimeCount > 10000) {
-                riskLevel = 'high';
-                color = '#e74c3c'; // danger color
-                radius = 6000;
-                highRisk++;
-            } else if (district.crimeCount >= 5000) {
-                riskLevel = 'moderate';
-                color = '#f39c12'; // warning color
-                radius = 5000;
-                moderateRisk++;
-            } else {
-                riskLevel = 'low';
-                color = '#2ecc71'; // success color
-                radius = 4000;
-                lowRisk++;
-            }
-                
-                if (viewMode === 'heatmap') {
-                    // Create circle for heatmap view
-                    let circle = L.circle([district.latitude, district.longitude], {
-                        color: color,
-                        fillColor: color,
-                        fillOpacity: 0.5,
-                        radius: radius
-                    }).bindPopup(`
-                        <strong>${district.district}</strong><br>
-                        Total Crime Cases: ${district.crimeCount}<br>
-                        Risk Level: ${riskLevel.toUpperCase()}
-                    `);
-                    
-                    districtMarkers.addLayer(circle);
-                } else {
-                    // Create custom HTML icon for district view
-                    let icon = L.divIcon({
-                        className: 'custom-marker',
-                        html: `
-                            <div class="marker-pin" style="background-color: ${color}"></div>
-                            <div class="marker-label">${district.district}<br>${district.crimeCount}</div>
-                        `,
-                        iconSize: [40, 40],
-                        iconAnchor: [20, 20]
-                    });
-                    
-                    let marker = L.marker([district.latitude, district.longitude], {
-                        icon: icon
-                    }).bindPopup(`
-                        <strong>${district.district}</strong><br>
-                        Total Crime Cases: ${district.crimeCount}<br>
-                        Risk Level: ${riskLevel.toUpperCase()}
-                    `);
-                    
-                    districtMarkers.addLayer(marker);
-                }
-            });
-            
-            // Update statistics
-            document.getElementById('highRiskCount').textContent = highRisk;
-            document.getElementById('moderateRiskCount').textContent = moderateRisk;
-            document.getElementById('lowRiskCount').textContent = lowRisk;
-        }
-        
-        // Reset map
-        function resetMap() {
-            map.setView([17.5, 78.5], 7);
-            updateStatus('Map has been reset.', 'status-success');
-            setTimeout(() => {
-                statusElement.classList.remove('visible');
-            }, 3000);
-        }
-        
-        // Update status message
-        function updateStatus(message, className) {
-            statusElement.textContent = message;
-            statusElement.className = className;
-            statusElement.classList.add('visible');
-        }
-        
-        // Show about message
-        function showAbout() {
-            alert('Safe City - Telangana is a crime mapping application that visualizes district-level crime data extracted from the Telangana State Crime Report. This tool helps citizens stay informed about crime patterns across different districts.');
-        }
-        
-        // Load data on page load
-        window.onload = function() {
-            setTimeout(() => {
-                map.invalidateSize();
-                fetchCrimeData();
-            }, 100);
-        }
-    </script>
-</body>
-</html>''')
-        # Enhanced version of the get_coordinates function to be more robust
-def get_coordinates_by_address(address, state="Telangana", country="India"):
-    """Get coordinates for an address string using Nominatim OpenStreetMap API"""
-    print(f"🔍 Geocoding address: {address}...", end="", flush=True)
+    # Page with the dataset inlined, rendered and compressed once per dataset version and asset
+    # build - the page links the fingerprinted assets, so a rebuild must re-render it. The ETag is
+    # a hash of the page, so it changes with either.
+    assets_version = asset_pipeline.current_version()
+    payload = dataset.payload(f"index:{assets_version}", lambda: render_template(
+        'index.html',
+        risk_thresholds=dataset.risk_thresholds,
+        initial_data=inline_json(list(dataset.districts)),
+        dataset_version=dataset.version,
+    ).encode("utf-8"), mimetype="text/html")
+    return payload_response(payload, max(dataset.last_modified, asset_pipeline.last_modified))
+
+@app.route('/api/crime-data')
+def crime_data():
+    # Range queries over the multi-year time series
+    if any(request.args.get(name) for name in ('from', 'to', 'granularity')):
+        return crime_data_range()
     
-    base_url = "https://nominatim.openstreetmap.org/search"
+    # Cached dataset, only rebuilt when the snapshot or the PDF at PDF_PATH changes
+    dataset = get_dataset()
     
-    # Append state and country for better results
-    query = f"{address}, {state}, {country}"
+    # JSON encoded and compressed once per dataset version; repeat visitors get a 304
+    payload = crime_data_payload(dataset)
+    response = payload_response(payload, dataset.last_modified)
+    # Lets the page version its heatmap tile URLs
+    response.headers["X-Dataset-Version"] = dataset.version
+    return response
+
+# GeoJSON of the visible part of the map: clusters at low zoom, individual points when zoomed in
+@app.route('/api/crime-data.geojson')
+def crime_data_geojson():
+    try:
+        bbox = request.args.get('bbox', '-180,-90,180,90')
+        west, south, east, north = (float(value) for value in bbox.split(','))
+        # west > east is a view across the antimeridian; longitudes must already be wrapped to -180..180
+        if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+            raise ValueError("bbox must be west,south,east,north with longitudes in -180..180")
+        zoom = int(request.args.get('zoom', CLUSTER_MAX_ZOOM + 1))
+        if not 0 <= zoom <= 30:
+            raise ValueError("zoom must be between 0 and 30")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    params = {
-        "q": query,
-        "format": "json",
-        "limit": 1,
-    }
+    dataset = get_dataset()
+    features = dataset.cluster_index().features((west, south, east, north), zoom)
+    response = jsonify({
+        "type": "FeatureCollection",
+        "version": dataset.version,
+        "features": features,
+    })
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+# Heatmap raster tiles for the "Heatmap View" - the browser just draws the images
+@app.route('/tiles/heat/<int:z>/<int:x>/<int:y>.png')
+def heatmap_tile(z, x, y):
+    if not (0 <= z <= HEAT_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "Tile out of range"}), 404
     
-    # Add a user-agent to comply with Nominatim usage policy
-    headers = {
-        "User-Agent": "TelanganaDistrict_CrimeMap/1.0"
-    }
+    dataset = get_dataset()
+    version = f"{dataset.version}-r{HEAT_RENDER_VERSION}"
+    data = tile_cache.get(version, z, x, y)
+    if data is None:
+        with timed_stage("heat_tile_render"):
+            data = dataset.heatmap().render(z, x, y)
+        tile_cache.put(version, z, x, y, data)
+    
+    response = app.response_class(data, mimetype='image/png')
+    response.set_etag(f"{version}-{z}-{x}-{y}")
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response.make_conditional(request)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    return jsonify({
+        "dataset": dataset_cache.stats(),
+        "geocode": geocode_cache.stats(),
+        "batchGeocoder": batch_geocoder.stats(),
+        "addressGeocoder": address_geocoder.stats(),
+        "nominatim": nominatim_client.stats(),
+        "gazetteer": dict(get_gazetteer().stats(), source=GAZETTEER_PATH),
+        "boundaries": dict(get_boundaries().stats(), source=BOUNDARIES_PATH),
+        "heatTiles": tile_cache.stats(),
+        "reports": report_log.stats(),
+        "stream": event_hub.stats(),
+    })
+
+# Per-route latency for /metrics - the route pattern, not the raw path, keeps label sets small
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method, response.status_code)
+    metrics.start_flusher()
+    return response
+
+@metrics.gauges
+def cache_gauges():
+    """Cache hit ratios and breaker state of this process, read from the same stats as /api/cache-stats
+    (the lookup counts behind the ratios are the safecity_cache_lookups_total counter)"""
+    dataset = dataset_cache.stats()
+    geocode = geocode_cache.stats()
+    tiles = tile_cache.stats()
+    tile_total = tiles["hits"] + tiles["diskHits"] + tiles["misses"]
+    return [
+        ("safecity_cache_hit_ratio", "Hit ratio of each cache since the process started", {
+            (("cache", "dataset"),): dataset["hitRatio"],
+            (("cache", "geocode"),): geocode["hitRatio"],
+            (("cache", "heat_tiles"),): round((tiles["hits"] + tiles["diskHits"]) / tile_total, 4) if tile_total else 0.0,
+        }),
+        ("safecity_geocoder_breaker_open", "1 while the Nominatim circuit breaker is open", {
+            (): 1 if nominatim_client.breaker.state == "open" else 0,
+        }),
+        ("safecity_dataset_districts", "Districts in the current dataset version", {
+            (("version", dataset["version"] or ""),): dataset["districtCount"],
+        }),
+    ]
+
+# Prometheus scrape endpoint - counters and histograms cover every worker when SAFECITY_METRICS_DIR is set
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Stylesheet and script for the page, kept in assets/ and published under content-hashed names
+ASSET_SOURCE_DIR = "assets"
+ASSET_BUILD_DIR = os.path.join("static", "build")
+# Fingerprinted URLs never change content, so browsers can keep them for a year without revalidating
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AssetPipeline:
+    """Publishes assets/app.css as app.<hash>.css (and so on), with gzip and brotli variants built once
+
+    The hashed files and their .gz/.br siblings are written to static/build/ so a CDN or nginx can
+    serve them directly; the app serves the same precompressed bodies from memory.
+    """
+
+    def __init__(self, source_dir=ASSET_SOURCE_DIR, build_dir=ASSET_BUILD_DIR):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.manifest = {}      # app.css -> app.<hash>.css
+        self.payloads = {}      # app.<hash>.css -> PrecompressedPayload
+        self.version = None     # hash of the manifest - changes whenever any asset does
+        self.last_modified = 0  # when the newest fingerprinted file was first written
+        self._lock = threading.Lock()
+        self._built = False
+
+    def build(self):
+        """Hash, compress and write every asset - returns the manifest"""
+        import mimetypes
+
+        manifest = {}
+        payloads = {}
+        os.makedirs(self.build_dir, exist_ok=True)
+        for name in sorted(os.listdir(self.source_dir)):
+            with open(os.path.join(self.source_dir, name), "rb") as f:
+                body = f.read()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+            mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            payload = PrecompressedPayload(body, mimetype)
+            for encoding, suffix in (("identity", ""), ("gzip", ".gz"), ("br", ".br")):
+                path = os.path.join(self.build_dir, hashed + suffix)
+                # Same name means same content, so an existing file never needs rewriting
+                if encoding in payload.bodies and not os.path.exists(path):
+                    tmp_path = f"{path}.tmp-{os.getpid()}"
+                    with open(tmp_path, "wb") as f:
+                        f.write(payload.bodies[encoding])
+                    os.replace(tmp_path, path)
+            manifest[name] = hashed
+            payloads[hashed] = payload
+        self.manifest, self.payloads = manifest, payloads
+        self.version = hashlib.sha256(json_bytes(manifest)).hexdigest()[:12]
+        # A fingerprinted file is written once and never rewritten, so its mtime is when that
+        # content first appeared - the same in every worker and across restarts
+        self.last_modified = int(max((os.stat(os.path.join(self.build_dir, hashed)).st_mtime
+                                      for hashed in manifest.values()), default=0))
+        self._built = True
+        return manifest
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def url(self, name):
+        """URL of the current fingerprinted copy of an asset, for templates"""
+        self._ensure_built()
+        return url_for('fingerprinted_asset', filename=self.manifest[name])
+
+    def payload(self, filename):
+        self._ensure_built()
+        return self.payloads.get(filename)
+
+    def current_version(self):
+        """Manifest version, for caching anything that embeds asset URLs"""
+        self._ensure_built()
+        return self.version
+
+
+asset_pipeline = AssetPipeline()
+app.jinja_env.globals["asset_url"] = asset_pipeline.url
+
+@app.route('/static/build/<filename>')
+def fingerprinted_asset(filename):
+    payload = asset_pipeline.payload(filename)
+    if payload is None:
+        return jsonify({"error": "Asset not found"}), 404
+    return payload_response(payload, cache_control=ASSET_CACHE_CONTROL)
+
+@app.route('/static/<path:filename>')
+def serve_static(filename):
+    return send_from_directory('static', filename)
+
+@timed_stage("geocode_address")
+def get_coordinates_by_address(address, state="Telangana", country="India", deadline=None):
+    """Get coordinates for an address string using Nominatim OpenStreetMap API
+
+    [lat, lon], or None if Nominatim doesn't know the address. Places in the local gazetteer are
+    answered directly; anything else is looked up on the address geocoder's own thread pool within
+    `deadline` (default: SAFECITY_GEOCODE_WAIT seconds from now). Raises UpstreamUnavailable if
+    the geocoding service failed, is down or ran out of time.
+    """
+    coords = gazetteer_coordinates(address, state, country)
+    if coords:
+        return coords
     
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=5)
-        data = response.json()
-        
-        # If we got results, return the first one's coordinates
-        if data and len(data) > 0:
-            lat = float(data[0]["lat"])
-            lon = float(data[0]["lon"])
-            print(f" ✅ Found: [{lat}, {lon}]")
-            return [lat, lon]
-        else:
-            print(f" ❌ Not found")
-            return None
-    except Exception as e:
-        print(f" ❌ Error: {str(e)[:50]}...")
-        return None
+        coords = address_geocoder.geocode(address, state, country, deadline=deadline)
+    except FutureTimeoutError:
+        print(f"⏳ Geocoding ran out of time: {address}")
+        raise UpstreamUnavailable("Geocoding is taking longer than usual")
+    except UpstreamUnavailable as e:
+        print(f"⏳ Geocoding unavailable for {address}: {e}")
+        raise
+    except UPSTREAM_ERRORS as e:
+        print(f"❌ Error geocoding address {address}: {str(e)[:50]}...")
+        raise UpstreamUnavailable("Geocoding service error") from e
+    
+    if coords:
+        print(f"📍 Geocoded address: {address} -> {coords}")
+    else:
+        print(f"❌ Address not found: {address}")
+    return coords
+
+# Upper bound on the k parameter of proximity queries
+MAX_NEARBY_K = 100
 
 # Add a route to get nearest districts based on user location
 @app.route('/api/nearby-districts')
 def nearby_districts():
     try:
-        # Get user coordinates from request parameters
-        user_lat = float(request.args.get('lat'))
-        user_lng = float(request.args.get('lng'))
-        
-        # Process crime data to get all district data
-        pdf_path = r"C:\Users\kp\Downloads\TELANGANA STATE CRIME STATEMENT.pdf"
-        all_districts = process_crime_data(pdf_path)
-        
-        # Calculate distance to each district
-        for district in all_districts:
-            district_lat = district['latitude']
-            district_lng = district['longitude']
-            
-            # Simple distance calculation (Euclidean, not perfect but sufficient for basic proximity)
-            # For more accuracy, Haversine formula would be better
-            distance = ((user_lat - district_lat) ** 2 + (user_lng - district_lng) ** 2) ** 0.5
-            district['distance'] = distance
-        
-        # Sort by distance
-        nearby = sorted(all_districts, key=lambda x: x['distance'])
-        
-        # Return the 5 closest districts
-        return jsonify(nearby[:5])
+        # Get user coordinates from request parameters (the range check also rejects nan)
+        user_lat, user_lng = _parse_batch_point({'lat': request.args.get('lat'), 'lng': request.args.get('lng')})
+        
+        # How many districts to return, and optionally only those within radius_km
+        k = int(request.args.get('k', 5))
+        if not 1 <= k <= MAX_NEARBY_K:
+            raise ValueError(f"k must be between 1 and {MAX_NEARBY_K}")
+        radius_km = request.args.get('radius_km')
+        radius_km = float(radius_km) if radius_km is not None else None
+        if radius_km is not None and not (math.isfinite(radius_km) and radius_km >= 0):
+            raise ValueError("radius_km must be a finite, non-negative number")
+        
+        # Great-circle k-nearest search on the snapshot's prebuilt spatial index
+        dataset = get_dataset()
+        indices, distances = dataset.spatial_index.query(user_lat, user_lng, k=k, radius_km=radius_km)
+        
+        # Records are shared and read-only, so copy them before adding the distance (in km)
+        nearby = [
+            dict(dataset.districts[i], distance=round(float(distance), 3))
+            for i, distance in zip(indices.tolist(), distances.tolist())
+        ]
+        return jsonify(nearby)
+    except DatasetUnavailable:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# Upper bound on the number of points in one batch proximity request
+MAX_BATCH_POINTS = 5000
+
+def _parse_batch_point(point):
+    # Accept both {"lat": .., "lng": ..} objects and [lat, lng] pairs
+    if isinstance(point, dict):
+        lat, lng = point.get('lat'), point.get('lng', point.get('lon'))
+    else:
+        lat, lng = point
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"Invalid coordinates: [{lat}, {lng}]")
+    return lat, lng
+
+# Batch variant for mobile/fleet clients: nearest districts for many GPS points in one call
+@app.route('/api/nearby-districts/batch', methods=['POST'])
+def nearby_districts_batch():
+    try:
+        body = request.get_json(force=True, silent=True) or {}
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object with a 'points' array")
+        points = body.get('points')
+        if not isinstance(points, list) or not points:
+            raise ValueError("'points' must be a non-empty array of {lat, lng} objects or [lat, lng] pairs")
+        if len(points) > MAX_BATCH_POINTS:
+            raise ValueError(f"At most {MAX_BATCH_POINTS} points per request")
+        k = int(body.get('k', 3))
+        if not 1 <= k <= MAX_NEARBY_K:
+            raise ValueError(f"k must be between 1 and {MAX_NEARBY_K}")
+        coords = np.array([_parse_batch_point(point) for point in points], dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Every point x district haversine distance in one vectorized pass
+    dataset = get_dataset()
+    districts = dataset.districts
+    district_lats = np.array([d['latitude'] for d in districts], dtype=np.float64)
+    district_lons = np.array([d['longitude'] for d in districts], dtype=np.float64)
+    indices, distances = nearest_k_batch(coords[:, 0], coords[:, 1], district_lats, district_lons, k)
+    
+    results = []
+    for (lat, lng), row_indices, row_distances in zip(coords.tolist(), indices.tolist(), distances.tolist()):
+        nearest = [
+            dict(districts[i], distance=round(distance, 3))
+            for i, distance in zip(row_indices, row_distances)
+        ]
+        results.append({
+            "lat": lat,
+            "lng": lng,
+            "nearest": nearest,
+            # A point takes the risk level of the district it is closest to
+            "riskLevel": nearest[0]['riskLevel'] if nearest else None,
+        })
+    return jsonify({"version": dataset.version, "results": results})
+
+# Reverse lookup: the district a coordinate lies in, by its boundary polygon when
+# SAFECITY_BOUNDARIES is set, otherwise by the nearest district centroid
+@app.route('/api/district-at')
+def district_at():
+    try:
+        lat, lng = _parse_batch_point({'lat': request.args.get('lat'), 'lng': request.args.get('lng')})
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    dataset = get_dataset()
+    district, method = locate_district(dataset, lat, lng)
+    if district is None:
+        return jsonify({"error": "District not found"}), 404
+    return jsonify({"lat": lat, "lng": lng, "district": district, "method": method, "version": dataset.version})
+
 # Add a route to geocode an address
 @app.route('/api/geocode')
 def geocode_address():
@@ -1000,7 +3088,14 @@ def geocode_address():
         if not address:
             return jsonify({"error": "Address parameter is required"}), 400
             
-        coordinates = get_coordinates_by_address(address)
+        # Wait at most SAFECITY_GEOCODE_WAIT seconds; a slower Nominatim call keeps its own timeout
+        # and finishes in the background, so the retry is answered from the cache
+        try:
+            coordinates = get_coordinates_by_address(address, deadline=Deadline(GEOCODE_WAIT_SECONDS))
+        except UpstreamUnavailable as e:
+            response = jsonify({"success": False, "error": f"{e}, please retry shortly"})
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response, 503
         if coordinates:
             return jsonify({
                 "success": True,
@@ -1012,6 +3107,24 @@ def geocode_address():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Upper bound on the number of autocomplete suggestions per request
+MAX_SUGGESTIONS = 25
+
+# Autocomplete from the local gazetteer - no upstream call, so it is safe to hit on every keystroke
+@app.route('/api/geocode/suggest')
+def geocode_suggest():
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', 10))
+        if not 1 <= limit <= MAX_SUGGESTIONS:
+            raise ValueError(f"limit must be between 1 and {MAX_SUGGESTIONS}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    response = jsonify({"query": query, "suggestions": get_gazetteer().suggest(query, limit)})
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
 # Add a route to provide safety recommendations based on location
 @app.route('/api/safety-tips')
 def safety_recommendations():
@@ -1021,60 +3134,489 @@ def safety_recommendations():
         user_lng = float(request.args.get('lng'))
         district_name = request.args.get('district')
         
-        # Process crime data to get risk level
-        pdf_path = None  # r"C:\Users\kp\Downloads\TELANGANA STATE CRIME STATEMENT.pdf"
-        all_districts = process_crime_data(pdf_path)
-        
-        # Find the district by name
-        district_data = next((d for d in all_districts if d['district'].lower() == district_name.lower()), None)
+        # Find the district by name in the shared snapshot - constant time, and alias-aware -
+        # or, when no name is given, the district the coordinates fall in
+        dataset = get_dataset()
+        if district_name:
+            district_data = dataset.find(district_name)
+        else:
+            district_data, _ = locate_district(dataset, user_lat, user_lng)
         
         if district_data:
-            crime_count = district_data['crimeCount']
-            
-            # Determine risk level
-            if crime_count > 1000:
-                risk_level = "high"
-                tips = [
-                    "Avoid traveling alone, especially at night",
-                    "Keep valuables secure and out of sight",
-                    "Stay in well-lit and populated areas",
-                    "Share your live location with family members",
-                    "Keep emergency contacts easily accessible"
-                ]
-            elif crime_count >= 5000:
-                risk_level = "moderate"
-                tips = [
-                    "Be aware of your surroundings",
-                    "Avoid displaying expensive items in public",
-                    "Travel in groups when possible",
-                    "Keep your phone charged for emergencies",
-                    "Know the nearest police stations"
-                ]
-            else:
-                risk_level = "low"
-                tips = [
-                    "Basic precautions are still recommended",
-                    "Keep emergency contact numbers handy",
-                    "Be cautious in unfamiliar areas",
-                    "Lock vehicles and homes securely",
-                    "Report any suspicious activities"
-                ]
-            
-            return jsonify({
-                "district": district_name,
-                "riskLevel": risk_level,
-                "crimeCount": crime_count,
-                "safetyTips": tips
+            # Tips are serialised once per district per dataset version - this is a dictionary hit
+            payload = dataset.payload(f"safety-tips:{district_data['id']}", lambda: {
+                "district": district_data['district'],
+                "riskLevel": district_data['riskLevel'],
+                "crimeCount": district_data['crimeCount'],
+                "safetyTips": SAFETY_TIPS[district_data['riskLevel']]
             })
+            return payload_response(payload, dataset.last_modified)
         else:
             return jsonify({"error": "District not found"}), 404
+    except DatasetUnavailable:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Community reports: an append-only SQLite log (WAL mode) with group commit, plus in-memory
+# counters per district and per grid cell that are updated as reports are written
+REPORTS_DB_PATH = os.environ.get("SAFECITY_REPORTS_DB", "reports.sqlite3")
+REPORT_CATEGORIES = ("theft", "harassment", "assault", "accident", "suspicious", "other")
+REPORT_CELL_DEGREES = 0.01          # ~1.1 km grid cells
+REPORT_BATCH_SIZE = 500             # reports per commit (one fsync)
+REPORT_FLUSH_INTERVAL = 0.005       # seconds a batch waits for more reports
+REPORT_MAX_DESCRIPTION = 500
+
+def report_cell(lat, lng):
+    """Grid cell key for a coordinate"""
+    return f"{math.floor(lat / REPORT_CELL_DEGREES)}:{math.floor(lng / REPORT_CELL_DEGREES)}"
+
+
+class ReportAggregates:
+    """Running report counts - totals, per category, per district and per grid cell"""
+
+    def __init__(self):
+        self.total = 0
+        self.last_id = 0
+        self.by_category = {}
+        self.by_district = {}
+        self.by_cell = {}
+        self.lock = threading.Lock()
+
+    def apply(self, rows):
+        """Fold (id, lat, lng, category, district_id) rows into the counters - each id only once"""
+        with self.lock:
+            for report_id, lat, lng, category, district in rows:
+                if report_id <= self.last_id:
+                    continue
+                self.last_id = report_id
+                self.total += 1
+                self.by_category[category] = self.by_category.get(category, 0) + 1
+                if district:
+                    self.by_district[district] = self.by_district.get(district, 0) + 1
+                cell = report_cell(lat, lng)
+                self.by_cell[cell] = self.by_cell.get(cell, 0) + 1
+
+    def to_dict(self, bbox=None, include_cells=True):
+        with self.lock:
+            cells = []
+            for cell, count in (self.by_cell.items() if include_cells else ()):
+                row, col = (int(part) for part in cell.split(":"))
+                south, west = row * REPORT_CELL_DEGREES, col * REPORT_CELL_DEGREES
+                if bbox and not (bbox[0] <= west + REPORT_CELL_DEGREES / 2 <= bbox[2]
+                                 and bbox[1] <= south + REPORT_CELL_DEGREES / 2 <= bbox[3]):
+                    continue
+                cells.append({
+                    "cell": cell,
+                    "latitude": round(south + REPORT_CELL_DEGREES / 2, 6),
+                    "longitude": round(west + REPORT_CELL_DEGREES / 2, 6),
+                    "count": count,
+                })
+            return {
+                "total": self.total,
+                "lastId": self.last_id,
+                "byCategory": dict(self.by_category),
+                "byDistrict": dict(self.by_district),
+                "cells": cells,
+            }
+
+
+class ReportLog:
+    """Append-only report log with group commit
+
+    append() hands the report to a single writer thread and waits until it is
+    durable. The writer takes everything queued (up to REPORT_BATCH_SIZE), inserts
+    it in one transaction and commits once, so a burst of reports costs one fsync
+    instead of one each. Aggregates are updated from the committed rows; reports
+    written by other worker processes are picked up with catch_up(), which only
+    reads rows newer than the last one seen.
+    """
+
+    def __init__(self, path, batch_size=REPORT_BATCH_SIZE, flush_interval=REPORT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.aggregates = ReportAggregates()
+        self.batches = 0
+        self.listeners = []
+        self._queue = None
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL in WAL mode = one fsync of the log per commit, i.e. per batch
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " created_at REAL NOT NULL,"
+            " lat REAL NOT NULL, lng REAL NOT NULL,"
+            " category TEXT NOT NULL,"
+            " district_id TEXT,"
+            " description TEXT)"
+        )
+        conn.commit()
+        return conn
+
+    def _ensure_started(self):
+        # The writer thread and connections are created lazily, and again in forked workers
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._reader = self._connect()
+            self.aggregates = ReportAggregates()
+            self._pid = os.getpid()
+            threading.Thread(target=self._writer, args=(self._queue,), name="report-writer", daemon=True).start()
+        self.catch_up()
+
+    def _writer(self, pending):
+        conn = self._connect()
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            # Skip reports whose callers gave up waiting while they were queued
+            batch = [(report, future) for report, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                rows = []
+                with conn:
+                    for report, future in batch:
+                        cursor = conn.execute(
+                            "INSERT INTO reports (created_at, lat, lng, category, district_id, description)"
+                            " VALUES (?, ?, ?, ?, ?, ?)",
+                            (report["createdAt"], report["latitude"], report["longitude"],
+                             report["category"], report["districtId"], report["description"]),
+                        )
+                        rows.append((cursor.lastrowid, report["latitude"], report["longitude"],
+                                     report["category"], report["districtId"]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.catch_up()
+            for (_, future), row in zip(batch, rows):
+                future.set_result(row[0])
+            for listener in list(self.listeners):
+                listener(rows)
+
+    def append(self, report, timeout=5.0):
+        """Write one report durably and return its id
+
+        Raises FutureTimeoutError if the writer hasn't committed it within `timeout` seconds. A
+        report still waiting in the queue is then dropped, so the caller can safely retry; one
+        the writer had already started to commit may still be stored.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((report, future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def catch_up(self):
+        """Apply rows committed since the last one we've seen, by this or any other process"""
+        self._ensure_started()
+        with self._reader_lock:
+            rows = self._reader.execute(
+                "SELECT id, lat, lng, category, district_id FROM reports WHERE id > ? ORDER BY id",
+                (self.aggregates.last_id,),
+            ).fetchall()
+        if rows:
+            self.aggregates.apply(rows)
+        return self.aggregates
+
+    def stats(self):
+        return {"path": self.path, "batches": self.batches, "total": self.aggregates.total}
+
+
+report_log = ReportLog(REPORTS_DB_PATH)
+
+def _parse_report(body):
+    # Validate a submitted report and fill in its district
+    if not isinstance(body, dict):
+        raise ValueError("A report must be a JSON object with lat, lng and category")
+    lat, lng = _parse_batch_point(body)
+    category = str(body.get('category', 'other')).strip().lower()
+    if category not in REPORT_CATEGORIES:
+        raise ValueError(f"category must be one of: {', '.join(REPORT_CATEGORIES)}")
+    description = str(body.get('description') or '').strip()
+    if len(description) > REPORT_MAX_DESCRIPTION:
+        raise ValueError(f"description must be at most {REPORT_MAX_DESCRIPTION} characters")
+    
+    # Named district if the client sent a known one, otherwise the district the report is in
+    dataset = get_dataset()
+    district = dataset.find(body.get('district')) if body.get('district') else None
+    if district is None:
+        district, _ = locate_district(dataset, lat, lng)
+    return {
+        "createdAt": time.time(),
+        "latitude": lat,
+        "longitude": lng,
+        "category": category,
+        "districtId": district['id'] if district else None,
+        "description": description,
+    }
+
+# Crowdsourced reports - written to the append-only log, visible to readers straight away
+@app.route('/api/reports', methods=['POST'])
+def submit_report():
+    try:
+        report = _parse_report(request.get_json(force=True, silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        report_id = report_log.append(report)
+    except FutureTimeoutError:
+        response = jsonify({"error": "Reports are being saved slowly, please retry shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    return jsonify({"id": report_id, "districtId": report["districtId"]}), 201
+
+# Running report counts by district, category and grid cell (optionally only cells inside bbox,
+# or no cells at all with cells=0)
+@app.route('/api/reports/aggregates')
+def report_aggregates():
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = tuple(float(value) for value in request.args['bbox'].split(','))
+            if len(bbox) != 4:
+                raise ValueError
+        except ValueError:
+            return jsonify({"error": "bbox must be west,south,east,north"}), 400
+    include_cells = request.args.get('cells', '1') != '0'
+    return jsonify(report_log.catch_up().to_dict(bbox, include_cells=include_cells))
+
+# Live updates over Server-Sent Events. One hub per process watches the dataset version and the
+# report aggregates and fans versioned deltas out to every connected client.
+STREAM_BUFFER_SIZE = 64            # events buffered per client before it must resync
+STREAM_POLL_INTERVAL = 2.0         # seconds between checks for a new dataset / other workers' reports
+STREAM_HEARTBEAT_INTERVAL = 15.0   # seconds of silence before a keep-alive comment
+# Every open stream holds a worker thread, so each process serves at most this many at once (by
+# default half of its gunicorn threads) and turns the rest away with a 503 - those pages poll
+# instead. Streams are closed after STREAM_MAX_SECONDS; the browser reconnects (or starts polling
+# if every slot is taken), so slots rotate between open pages.
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get("SAFECITY_STREAM_MAX_SUBSCRIBERS",
+                                            max(1, int(os.environ.get("SAFECITY_THREADS", "8")) // 2)))
+STREAM_MAX_SECONDS = float(os.environ.get("SAFECITY_STREAM_MAX_SECONDS", "300"))
+STREAM_POLL_FALLBACK_SECONDS = 30
+
+
+class StreamSubscriber:
+    """One connected client: a bounded event buffer - when it overflows the client is told to resync"""
+
+    def __init__(self, buffer_size=STREAM_BUFFER_SIZE):
+        self.events = deque(maxlen=buffer_size)
+        self.overflowed = False
+        self.condition = threading.Condition()
+
+    def push(self, event):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.overflowed = True
+            self.events.append(event)
+            self.condition.notify()
+
+    def drain(self, timeout):
+        """Wait up to timeout for events and return them - [] means it's time for a heartbeat"""
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            if self.overflowed:
+                # Deltas were dropped, so the client can't apply the rest - have it refetch instead
+                self.overflowed = False
+                events = [{"id": events[-1]["id"] if events else 0, "event": "resync",
+                           "data": {"version": get_dataset().version}}]
+            return events
+
+
+class EventHub:
+    """In-process fan-out of dataset and report deltas to SSE subscribers"""
+
+    def __init__(self, poll_interval=STREAM_POLL_INTERVAL, max_subscribers=STREAM_MAX_SUBSCRIBERS):
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.subscribers = set()
+        self.sequence = 0
+        self.published = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._dataset = None
+        self._report_counts = None
+
+    def subscribe(self):
+        """A new StreamSubscriber, or None if this process already serves max_subscribers streams"""
+        subscriber = StreamSubscriber()
+        with self._lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            self.subscribers.add(subscriber)
+            if self._pid != os.getpid():
+                # Watcher thread per process, started with the first subscriber
+                self._pid = os.getpid()
+                self._dataset = get_dataset()
+                self._report_counts = self._snapshot_reports()
+                threading.Thread(target=self._watch, name="event-hub", daemon=True).start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def wake(self, *args):
+        """Check for changes now instead of at the next poll"""
+        self._wake.set()
+
+    def publish(self, event, data):
+        with self._lock:
+            self.sequence += 1
+            message = {"id": self.sequence, "event": event, "data": data}
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.push(message)
+        self.published += 1
+
+    def _watch(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self.subscribers:
+                continue
+            try:
+                self._check_dataset()
+                self._check_reports()
+            except Exception as e:
+                print(f"⚠️ Event hub check failed: {str(e)[:80]}")
+
+    def _check_dataset(self):
+        dataset = get_dataset()
+        previous = self._dataset
+        if previous is None or dataset.version == previous.version:
+            self._dataset = dataset
+            return
+        old = {d["id"]: d for d in previous.districts}
+        new_ids = {d["id"] for d in dataset.districts}
+        self.publish("dataset", {
+            "version": dataset.version,
+            "previousVersion": previous.version,
+            "changed": [d for d in dataset.districts if old.get(d["id"]) != d],
+            "removed": [district for district in old if district not in new_ids],
+        })
+        self._dataset = dataset
+
+    @staticmethod
+    def _snapshot_reports():
+        aggregates = report_log.catch_up()
+        with aggregates.lock:
+            return aggregates.last_id, dict(aggregates.by_district), dict(aggregates.by_cell)
+
+    def _check_reports(self):
+        last_id, by_district, by_cell = self._snapshot_reports()
+        previous_id, previous_district, previous_cell = self._report_counts
+        if last_id == previous_id:
+            return
+        self.publish("reports", {
+            "lastId": last_id,
+            "byDistrict": {k: v for k, v in by_district.items() if previous_district.get(k) != v},
+            "cells": {k: v for k, v in by_cell.items() if previous_cell.get(k) != v},
+        })
+        self._report_counts = (last_id, by_district, by_cell)
+
+    def stats(self):
+        return {"subscribers": len(self.subscribers), "maxSubscribers": self.max_subscribers,
+                "rejected": self.rejected, "published": self.published, "sequence": self.sequence}
+
+
+event_hub = EventHub()
+# Reports written by this process are pushed immediately rather than at the next poll
+report_log.listeners.append(event_hub.wake)
+
+def format_sse(message):
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+# Server-Sent Events stream of dataset and report deltas
+@app.route('/api/stream')
+def stream_updates():
+    version = get_dataset().version
+    subscriber = event_hub.subscribe()
+    if subscriber is None:
+        # No thread to spare for another open connection - the page polls instead
+        response = jsonify({"error": "Too many open update streams, poll instead",
+                            "pollInterval": STREAM_POLL_FALLBACK_SECONDS})
+        response.headers["Retry-After"] = str(STREAM_POLL_FALLBACK_SECONDS)
+        return response, 503
+    
+    def events():
+        try:
+            # Tell the client which version it is in sync with, the report counts to start from,
+            # and how soon to reconnect
+            yield "retry: 3000\n\n"
+            aggregates = report_log.catch_up().to_dict(include_cells=False)
+            yield format_sse({"id": event_hub.sequence, "event": "hello",
+                              "data": {"version": version,
+                                       "reportsLastId": aggregates["lastId"],
+                                       "reportsByDistrict": aggregates["byDistrict"]}})
+            closes_at = time.monotonic() + STREAM_MAX_SECONDS
+            while True:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    # Give the slot back; the browser reconnects after the retry delay
+                    return
+                messages = subscriber.drain(min(STREAM_HEARTBEAT_INTERVAL, remaining))
+                if not messages:
+                    yield ": heartbeat\n\n"
+                for message in messages:
+                    yield format_sse(message)
+        finally:
+            event_hub.unsubscribe(subscriber)
+    
+    response = Response(events(), mimetype='text/event-stream')
+    # Also frees the slot if the client goes away before the stream even starts
+    response.call_on_close(lambda: event_hub.unsubscribe(subscriber))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
 # When running the app, make it more production-ready
 if __name__ == '__main__':
-    # Create templates directory if it doesn't exist
-    os.makedirs('templates', exist_ok=True)
+    import sys
+    
+    # Offline ingestion: python SafeCityDraft1.py ingest [--pdf PATH] [--out PATH]
+    # and python SafeCityDraft1.py ingest-timeseries --csv PATH [--out PATH]
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        sys.exit(ingest_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest-timeseries':
+        sys.exit(ingest_timeseries_main(sys.argv[2:]))
+    # python SafeCityDraft1.py build-assets - write the fingerprinted assets ahead of a deploy
+    if len(sys.argv) > 1 and sys.argv[1] == 'build-assets':
+        for name, hashed in asset_pipeline.build().items():
+            print(f"📦 {name} -> {ASSET_BUILD_DIR}/{hashed} (+ .gz/.br)")
+        sys.exit(0)
     
     # Add better error logging
     import logging
@@ -1088,7 +3630,8 @@ if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     
     print("🚀 Starting Safe City - Telangana application...")
-    print("📊 Crime data will be loaded on first request")
+    # Ingest (if the snapshot is missing or stale) and warm the caches before taking requests
+    warm_up()
     print(f"📱 Access the application at http://0.0.0.0:{port}")
     
     # Run on all interfaces (0.0.0.0) and use the PORT env variable
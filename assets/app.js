@@ -0,0 +1,414 @@
+// Initialize map centered on Telangana
+let map = L.map('map').setView([17.5, 78.5], 7);
+L.tileLayer('https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png', {
+    attribution: '&copy; <a href="https://www.carto.com/">CartoDB</a> contributors',
+    subdomains: 'abcd',
+    maxZoom: 19
+}).addTo(map);
+
+// Variables to track markers and data
+let districtMarkers = L.layerGroup().addTo(map);
+let heatLayer = null;
+let datasetVersion = '';
+let updateStream = null;
+let pollTimer = null;
+let pollsSinceStreamAttempt = 0;
+let reportCounts = {};
+let statusElement = document.getElementById('status');
+let loadingOverlay = document.getElementById('loadingOverlay');
+let districtData = [];
+
+// Show loading overlay
+function showLoading() {
+    loadingOverlay.style.display = 'flex';
+}
+
+// Hide loading overlay
+function hideLoading() {
+    loadingOverlay.style.display = 'none';
+}
+
+// Initialize event listeners
+document.getElementById('resetBtn').addEventListener('click', resetMap);
+document.getElementById('aboutBtn').addEventListener('click', showAbout);
+document.getElementById('dataView').addEventListener('change', function() {
+    renderMap(districtData);
+});
+document.getElementById('locateBtn').addEventListener('click', getUserLocation);
+
+// Function to get and display user location
+function getUserLocation() {
+    if (navigator.geolocation) {
+        updateStatus('Fetching your location...', 'status-info');
+
+        navigator.geolocation.getCurrentPosition(
+            function(position) {
+                // Success callback
+                const userLat = position.coords.latitude;
+                const userLng = position.coords.longitude;
+
+                // Add a special marker for user location
+                const userIcon = L.divIcon({
+                    className: 'user-location-marker',
+                    html: `
+                        <div style="background-color: #3498db; width: 20px; height: 20px; border-radius: 50%; border: 2px solid white; box-shadow: 0 0 10px rgba(0,0,0,0.5);"></div>
+                        <div style="font-weight: bold; text-align: center; margin-top: 5px;">Your Location'</div>
+                    `,
+                    iconSize: [40, 40],
+                    iconAnchor: [20, 20]
+                });
+
+                const userMarker = L.marker([userLat, userLng], {
+                    icon: userIcon
+                }).addTo(map);
+
+                userMarker.bindPopup('<strong>Your Location</strong>').openPopup();
+
+                // Center the map on user's location with a closer zoom
+                map.setView([userLat, userLng], 10);
+
+                updateStatus('Your location detected!', 'status-success');
+                setTimeout(() => {
+                    statusElement.classList.remove('visible');
+                }, 3000);
+            },
+            function(error) {
+                // Error callback
+                let errorMessage;
+                switch(error.code) {
+                    case error.PERMISSION_DENIED:
+                        errorMessage = "Location access denied. Please enable location services.";
+                        break;
+                    case error.POSITION_UNAVAILABLE:
+                        errorMessage = "Location information unavailable.";
+                        break;
+                    case error.TIMEOUT:
+                        errorMessage = "Location request timed out.";
+                        break;
+                    default:
+                        errorMessage = "An unknown error occurred while getting location.";
+                }
+                updateStatus(errorMessage, 'status-warning');
+            }
+        );
+    } else {
+        updateStatus('Geolocation is not supported by your browser.', 'status-error');
+    }
+}
+
+// Fetch crime data from API
+async function fetchCrimeData() {
+    showLoading();
+    updateStatus('Fetching crime data...', 'status-info');
+
+    try {
+        const response = await fetch('/api/crime-data');
+        const data = await response.json();
+        datasetVersion = response.headers.get('X-Dataset-Version') || '';
+        hideLoading();
+        updateStatus('Crime data loaded successfully!', 'status-success');
+
+        // Save data and render map
+        districtData = data;
+        renderMap(data);
+
+        // Keep the map current from the server's update stream instead of polling
+        subscribeToUpdates();
+
+        // Hide status after delay
+        setTimeout(() => {
+            statusElement.classList.remove('visible');
+        }, 3000);
+
+    } catch (error) {
+        hideLoading();
+        updateStatus('Error loading crime data. Please try again later.', 'status-error');
+        console.error('Error fetching crime data:', error);
+    }
+}
+
+// How often the map refreshes itself when it can't get an update stream, and after how many
+// polls it tries the stream again
+const POLL_INTERVAL_MS = 30000;
+const STREAM_RETRY_POLLS = 10;
+
+// Subscribe to live dataset and report deltas over Server-Sent Events
+function subscribeToUpdates() {
+    if (updateStream) {
+        return;
+    }
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    updateStream = new EventSource('/api/stream');
+
+    updateStream.addEventListener('hello', function(e) {
+        const hello = JSON.parse(e.data);
+        stopPolling();
+        // Missed updates while disconnected - reload everything once
+        if (hello.version !== datasetVersion) {
+            refetchCrimeData();
+        }
+        // Current report counts, kept up to date by 'reports' events from here on
+        reportCounts = hello.reportsByDistrict;
+        renderMap(districtData);
+    });
+
+    // When the server has no stream slot free it answers 503, and the browser gives up on the
+    // EventSource for good - keep the map fresh by polling and try the stream again later
+    updateStream.onerror = function() {
+        if (updateStream.readyState === EventSource.CLOSED) {
+            updateStream = null;
+            startPolling();
+        }
+    };
+
+    updateStream.addEventListener('dataset', function(e) {
+        const delta = JSON.parse(e.data);
+        if (delta.previousVersion !== datasetVersion) {
+            refetchCrimeData();
+            return;
+        }
+        const changed = {};
+        delta.changed.forEach(d => { changed[d.id] = d; });
+        districtData = districtData
+            .filter(d => !delta.removed.includes(d.id) && !changed[d.id])
+            .concat(delta.changed);
+        datasetVersion = delta.version;
+        renderMap(districtData);
+    });
+
+    updateStream.addEventListener('reports', function(e) {
+        Object.assign(reportCounts, JSON.parse(e.data).byDistrict);
+        renderMap(districtData);
+    });
+
+    updateStream.addEventListener('resync', refetchCrimeData);
+}
+
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(pollForUpdates, POLL_INTERVAL_MS);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+// Fallback for pages without an update stream
+async function pollForUpdates() {
+    try {
+        // Revalidated against the ETag, so an unchanged dataset costs a 304
+        const response = await fetch('/api/crime-data');
+        const version = response.headers.get('X-Dataset-Version') || '';
+        if (version !== datasetVersion) {
+            districtData = await response.json();
+            datasetVersion = version;
+        }
+        const aggregates = await (await fetch('/api/reports/aggregates?cells=0')).json();
+        reportCounts = aggregates.byDistrict;
+        renderMap(districtData);
+    } catch (error) {
+        console.error('Error polling for updates:', error);
+    }
+    if (window.EventSource && ++pollsSinceStreamAttempt >= STREAM_RETRY_POLLS) {
+        pollsSinceStreamAttempt = 0;
+        subscribeToUpdates();
+    }
+}
+
+// Reload the full dataset without the loading overlay
+async function refetchCrimeData() {
+    try {
+        const response = await fetch('/api/crime-data');
+        districtData = await response.json();
+        datasetVersion = response.headers.get('X-Dataset-Version') || '';
+        renderMap(districtData);
+    } catch (error) {
+        console.error('Error refreshing crime data:', error);
+    }
+}
+
+// Risk level colours shared by district markers and clusters
+const RISK_COLORS = {high: '#e74c3c', moderate: '#f39c12', low: '#2ecc71'};
+
+// The visible map area (padded, so short pans don't need a reload) as west,south,east,north with
+// longitudes wrapped to -180..180 - west > east when the view crosses the antimeridian
+function visibleBbox() {
+    const bounds = map.getBounds().pad(0.25);
+    if (bounds.getEast() - bounds.getWest() >= 360) {
+        return [-180, Math.max(bounds.getSouth(), -90), 180, Math.min(bounds.getNorth(), 90)];
+    }
+    const wrap = lng => L.Util.wrapNum(lng, [-180, 180], true);
+    return [
+        wrap(bounds.getWest()),
+        Math.max(bounds.getSouth(), -90),
+        wrap(bounds.getEast()),
+        Math.min(bounds.getNorth(), 90)
+    ].map(value => +value.toFixed(4));
+}
+
+// Marker for one district from /api/crime-data.geojson
+function districtMarker(district) {
+    const icon = L.divIcon({
+        className: 'custom-marker',
+        html: `
+            <div class="marker-pin" style="background-color: ${RISK_COLORS[district.riskLevel]}"></div>
+            <div class="marker-label">${district.district}<br>${district.crimeCount}</div>
+        `,
+        iconSize: [40, 40],
+        iconAnchor: [20, 20]
+    });
+    return L.marker([district.latitude, district.longitude], {
+        icon: icon
+    }).bindPopup(`
+        <strong>${district.district}</strong><br>
+        Total Crime Cases: ${district.crimeCount}<br>
+        Risk Level: ${district.riskLevel.toUpperCase()}<br>
+        Community Reports: ${reportCounts[district.id] || 0}
+    `);
+}
+
+// One marker for a server-side cluster of nearby districts; clicking it zooms in
+function clusterMarker(latlng, cluster) {
+    const icon = L.divIcon({
+        className: 'cluster-marker',
+        html: `
+            <div class="cluster-pin" style="background-color: ${RISK_COLORS[cluster.riskLevel]}">${cluster.pointCount}</div>
+            <div class="marker-label">${cluster.crimeCount}</div>
+        `,
+        iconSize: [40, 40],
+        iconAnchor: [20, 20]
+    });
+    return L.marker(latlng, {icon: icon}).on('click', function() {
+        map.setView(latlng, map.getZoom() + 2);
+    });
+}
+
+// Districts view: only what is on screen, clustered by the server below its maximum cluster zoom
+let featuresRequest = null;
+async function loadVisibleDistricts() {
+    if (featuresRequest) {
+        featuresRequest.abort();
+    }
+    featuresRequest = new AbortController();
+    const params = new URLSearchParams({
+        bbox: visibleBbox().join(','),
+        zoom: Math.round(map.getZoom()),
+        v: datasetVersion
+    });
+    try {
+        const response = await fetch(`/api/crime-data.geojson?${params}`, {signal: featuresRequest.signal});
+        const collection = await response.json();
+        featuresRequest = null;
+        if (document.getElementById('dataView').value !== 'districts') {
+            return;
+        }
+        districtMarkers.clearLayers();
+        collection.features.forEach(feature => {
+            const [lng, lat] = feature.geometry.coordinates;
+            const properties = feature.properties;
+            districtMarkers.addLayer(properties.cluster
+                ? clusterMarker([lat, lng], properties)
+                : districtMarker(properties));
+        });
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error loading visible districts:', error);
+        }
+    }
+}
+
+map.on('moveend', function() {
+    if (document.getElementById('dataView').value === 'districts') {
+        loadVisibleDistricts();
+    }
+});
+
+// Render crime data on map
+function renderMap(data) {
+    // Get view preference
+    const viewMode = document.getElementById('dataView').value;
+
+    // Heatmap view is a server-rendered density surface, versioned with the dataset
+    if (heatLayer) {
+        map.removeLayer(heatLayer);
+        heatLayer = null;
+    }
+    if (viewMode === 'heatmap') {
+        heatLayer = L.tileLayer(`/tiles/heat/{z}/{x}/{y}.png?v=${datasetVersion}`, {
+            opacity: 0.8,
+            maxZoom: 16
+        }).addTo(map);
+    }
+
+    // Markers for the visible area only - one request per view, however big the dataset is.
+    // The old markers stay up until the new ones arrive.
+    if (viewMode === 'districts') {
+        loadVisibleDistricts();
+    } else {
+        districtMarkers.clearLayers();
+    }
+
+    // Variables to count risk levels
+    let highRisk = 0, moderateRisk = 0, lowRisk = 0;
+
+    // Risk level is classified once on the server for each dataset version
+    data.forEach(district => {
+        if (district.riskLevel === 'high') {
+            highRisk++;
+        } else if (district.riskLevel === 'moderate') {
+            moderateRisk++;
+        } else {
+            lowRisk++;
+        }
+    });
+
+    // Update statistics
+    document.getElementById('highRiskCount').textContent = highRisk;
+    document.getElementById('moderateRiskCount').textContent = moderateRisk;
+    document.getElementById('lowRiskCount').textContent = lowRisk;
+}
+
+// Reset map
+function resetMap() {
+    map.setView([17.5, 78.5], 7);
+    updateStatus('Map has been reset.', 'status-success');
+    setTimeout(() => {
+        statusElement.classList.remove('visible');
+    }, 3000);
+}
+
+// Update status message
+function updateStatus(message, className) {
+    statusElement.textContent = message;
+    statusElement.className = className;
+    statusElement.classList.add('visible');
+}
+
+// Show about message
+function showAbout() {
+    alert('Safe City - Telangana is a crime mapping application that visualizes district-level crime data extracted from the Telangana State Crime Report. This tool helps citizens stay informed about crime patterns across different districts.');
+}
+
+// Load data on page load - straight from the page when the server inlined it
+window.onload = function() {
+    const initialData = document.getElementById('initialData');
+    if (initialData) {
+        map.invalidateSize();
+        districtData = JSON.parse(initialData.textContent);
+        datasetVersion = initialData.dataset.version;
+        renderMap(districtData);
+        subscribeToUpdates();
+        return;
+    }
+    setTimeout(() => {
+        map.invalidateSize();
+        fetchCrimeData();
+    }, 100);
+}
@@ -0,0 +1,312 @@
+"""Endpoint benchmarks for the Safe City API.
+
+Exercises /api/crime-data, /api/nearby-districts, /api/geocode and /api/safety-tips
+against reproducible synthetic datasets (35, 1k, 10k and 100k locations by default),
+with geocoding answered by the local Nominatim stub at a configurable latency.
+
+    python bench_endpoints.py                              # Flask test client, all sizes
+    python bench_endpoints.py --mode gunicorn --workers 4  # real gunicorn process over HTTP
+    python bench_endpoints.py --sizes 35,10000 --save before
+    python bench_endpoints.py --sizes 35,10000 --compare before
+
+Results are printed per dataset size and endpoint (throughput, p50/p95/p99 in ms).
+--save NAME stores them as JSON in bench_baselines/NAME.json, and --compare NAME
+prints the change against a stored baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_nominatim import LAT_RANGE, LON_RANGE, start_stub_server
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(REPO_DIR, "bench_baselines")
+DEFAULT_SIZES = "35,1000,10000,100000"
+ENDPOINTS = ("crime_data", "nearby_districts", "geocode_address", "safety_recommendations")
+# A change bigger than this fraction is flagged when comparing against a baseline
+REGRESSION_THRESHOLD = 0.10
+
+
+def synthetic_districts(size, seed=0):
+    """Reproducible district records - the real 35 districts first, then synthetic places"""
+    from SafeCityDraft1 import MANUAL_COORDS
+
+    rng = random.Random(seed)
+    records = []
+    for name, (lat, lon) in list(MANUAL_COORDS.items())[:size]:
+        records.append({"district": name, "crimeCount": int(rng.lognormvariate(8.3, 0.8)),
+                        "latitude": lat, "longitude": lon})
+    for i in range(len(records), size):
+        records.append({
+            "district": f"Synthetic Place {i:06d}",
+            "crimeCount": int(rng.lognormvariate(5.0, 1.2)),
+            "latitude": round(rng.uniform(*LAT_RANGE), 6),
+            "longitude": round(rng.uniform(*LON_RANGE), 6),
+        })
+    return records
+
+
+def build_requests(records, count, seed=0):
+    """The same request mix for every run: (endpoint, path) pairs per endpoint"""
+    rng = random.Random(seed)
+    names = [r["district"] for r in records]
+    plan = {}
+    plan["crime_data"] = ["/api/crime-data"] * count
+    plan["nearby_districts"] = [
+        f"/api/nearby-districts?lat={rng.uniform(*LAT_RANGE):.5f}&lng={rng.uniform(*LON_RANGE):.5f}&k=5"
+        for _ in range(count)
+    ]
+    # Half the addresses repeat, so both the upstream and the cached path are measured
+    plan["geocode_address"] = [
+        f"/api/geocode?address=Bench+Street+{rng.randrange(count // 2 or 1) if rng.random() < 0.5 else count + i}"
+        for i in range(count)
+    ]
+    plan["safety_recommendations"] = [
+        f"/api/safety-tips?lat=17.4&lng=78.5&district={rng.choice(names).replace(' ', '+')}"
+        for _ in range(count)
+    ]
+    return plan
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarise(latencies, errors, wall_time):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_paths(send, paths, concurrency):
+    """Send every path with `concurrency` threads - returns the summary for this endpoint"""
+    latencies = []
+    errors = 0
+
+    def one(path):
+        started = time.perf_counter()
+        try:
+            ok = send(path)
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        results = [one(path) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, paths))
+    wall_time = time.perf_counter() - started
+    for latency, ok in results:
+        latencies.append(latency)
+        errors += 0 if ok else 1
+    return summarise(latencies, errors, wall_time)
+
+
+def bench_test_client(snapshot_path, plan, workdir, stub_url, concurrency, warmup):
+    """Run the plan in-process through Flask's test client"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import SafeCityDraft1 as app_module
+
+        app_module.NOMINATIM_URL = stub_url
+        app_module.geocode_cache = app_module.GeocodeCache(os.path.join(workdir, "geocode.sqlite3"))
+        app_module.dataset_cache = app_module.DatasetCache(snapshot_path, app_module._load_snapshot)
+        app_module.get_dataset()
+    client = app_module.app.test_client()
+
+    def send(path):
+        response = client.get(path)
+        return response.status_code < 500 and response.status_code != 400
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for endpoint in ENDPOINTS:
+            for path in plan[endpoint][:warmup]:
+                send(path)
+            results[endpoint] = run_paths(send, plan[endpoint], concurrency)
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_gunicorn(snapshot_path, plan, workdir, stub_url, concurrency, warmup, workers):
+    """Run the plan over HTTP against a real gunicorn process"""
+    import requests
+
+    port = free_port()
+    env = dict(os.environ,
+               SAFECITY_SNAPSHOT=snapshot_path,
+               SAFECITY_NOMINATIM_URL=stub_url,
+               SAFECITY_GEOCODE_CACHE=os.path.join(workdir, "geocode.sqlite3"),
+               SAFECITY_REPORTS_DB=os.path.join(workdir, "reports.sqlite3"),
+               SAFECITY_TILE_CACHE=os.path.join(workdir, "tiles"))
+    # The repo's gunicorn.conf.py (preload, warm-up, gthread workers), with the bind and worker count overridden
+    command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_DIR, "gunicorn.conf.py"),
+               "--chdir", REPO_DIR, "-w", str(workers),
+               "-b", f"127.0.0.1:{port}", "--log-level", "warning", "SafeCityDraft1:app"]
+    server = subprocess.Popen(command, env=env, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        # Wait for the workers to come up
+        deadline = time.monotonic() + 120
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited: {server.stderr.read().decode()[-500:]}")
+            try:
+                requests.get(f"{base_url}/api/cache-stats", timeout=1)
+                break
+            except requests.RequestException:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start in time")
+                time.sleep(0.2)
+
+        sessions = {}
+
+        def send(path):
+            # One keep-alive session per client thread
+            session = sessions.setdefault(threading.get_ident(), requests.Session())
+            response = session.get(base_url + path, timeout=30)
+            return response.status_code < 500 and response.status_code != 400
+
+        results = {}
+        for endpoint in ENDPOINTS:
+            for path in plan[endpoint][:warmup]:
+                send(path)
+            results[endpoint] = run_paths(send, plan[endpoint], concurrency)
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_results(results):
+    header = f"{'size':>7}  {'endpoint':<24} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for size, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            print(f"{size:>7}  {endpoint:<24} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.3f} "
+                  f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['errors']:>6}")
+
+
+def compare_results(results, baseline, current_settings):
+    """Print p50/p99/throughput changes against a baseline and return the number of regressions"""
+    regressions = 0
+    print(f"\nCompared with baseline '{baseline['name']}' ({baseline['created']}):")
+    if baseline["settings"] != current_settings:
+        print("⚠️ The baseline was run with different settings - numbers may not be comparable")
+    for size, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            old = baseline["results"].get(size, {}).get(endpoint)
+            if not old:
+                continue
+            changes = []
+            for key, higher_is_worse in (("p50_ms", True), ("p99_ms", True), ("throughput", False)):
+                if not old[key]:
+                    continue
+                change = (stats[key] - old[key]) / old[key]
+                worse = change > REGRESSION_THRESHOLD if higher_is_worse else change < -REGRESSION_THRESHOLD
+                regressions += worse
+                changes.append(f"{key} {change:+.1%}{' ⚠️' if worse else ''}")
+            print(f"{size:>7}  {endpoint:<24} {'  '.join(changes)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Safe City API endpoints")
+    parser.add_argument("--mode", choices=("client", "gunicorn"), default="client",
+                        help="Flask test client in-process, or a real gunicorn process over HTTP")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated dataset sizes (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint per size")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (--mode gunicorn)")
+    parser.add_argument("--geocoder-latency", type=float, default=0.05, help="stub Nominatim latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="NAME", help="store results as bench_baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare with bench_baselines/NAME.json")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from SafeCityDraft1 import write_snapshot
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    stub = start_stub_server(latency=args.geocoder_latency)
+    workdir = tempfile.mkdtemp(prefix="safecity-bench-")
+    results = {}
+    try:
+        for size in sizes:
+            records = synthetic_districts(size, seed=args.seed)
+            snapshot_path = os.path.join(workdir, f"districts-{size}.npz")
+            write_snapshot(records, snapshot_path)
+            plan = build_requests(records, args.requests, seed=args.seed)
+            run_dir = tempfile.mkdtemp(dir=workdir)
+            print(f"⏱️ {size} locations, {args.requests} requests per endpoint ({args.mode})...", flush=True)
+            if args.mode == "gunicorn":
+                results[str(size)] = bench_gunicorn(snapshot_path, plan, run_dir, stub.search_url,
+                                                    args.concurrency, args.warmup, args.workers)
+            else:
+                results[str(size)] = bench_test_client(snapshot_path, plan, run_dir, stub.search_url,
+                                                       args.concurrency, args.warmup)
+    finally:
+        stub.shutdown()
+        stub.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_results(results)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": args.mode,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("save", "compare")},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+    regressions = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json"), encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f), report["settings"])
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(report, name=args.save), f, indent=2)
+        print(f"\n💾 Saved baseline to {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
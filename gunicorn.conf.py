@@ -0,0 +1,54 @@
+"""gunicorn settings for Safe City - picked up automatically by `gunicorn SafeCityDraft1:app`
+
+The app is imported once in the master (preload_app) and warmed up there before the workers
+are forked, so every worker starts with the dataset, payloads and indexes already built and
+shares them copy-on-write.
+"""
+import gc
+import os
+import shutil
+
+# Every worker publishes its counters and histograms here, so /metrics sums the whole server.
+# Set before the app is imported, which reads it once.
+os.environ.setdefault("SAFECITY_METRICS_DIR", os.path.join("data", "metrics"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Threaded workers, so open /api/stream connections don't each tie up a whole process
+worker_class = "gthread"
+threads = int(os.environ.get("SAFECITY_THREADS", "8"))
+preload_app = True
+# Recycle workers now and then; with the preloaded app a replacement starts warm
+max_requests = 10000
+max_requests_jitter = 1000
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one's totals
+    shutil.rmtree(os.environ["SAFECITY_METRICS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    from SafeCityDraft1 import metrics, warm_up
+
+    warm_up()
+    # The workers start with empty metrics, so the warm-up timings are published from here
+    metrics.flush()
+    # Move everything built so far out of the garbage collector's sight, so the workers'
+    # collections don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker as it shuts down: publish the samples since the last flush
+    from SafeCityDraft1 import metrics
+
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker is gone: move its samples into the archive file
+    from SafeCityDraft1 import metrics
+
+    metrics.fold_process(worker.pid)
@@ -0,0 +1,170 @@
+"""Local stand-in for the Nominatim /search API, for testing geocoding offline.
+
+Run it as a server:
+
+    python stub_nominatim.py --port 8089 --latency 0.2
+    SAFECITY_NOMINATIM_URL=http://127.0.0.1:8089/search SAFECITY_GEOCODE_RATE=50 python SafeCityDraft1.py
+
+or measure batch geocoding throughput against it:
+
+    python stub_nominatim.py --bench 200 --latency 0.2 --rate 50 --workers 16
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Rough bounding box of Telangana, so stub coordinates land somewhere plausible
+LAT_RANGE = (15.8, 19.9)
+LON_RANGE = (77.2, 81.3)
+
+
+def fake_coordinates(query):
+    """Deterministic coordinates for a query string"""
+    digest = hashlib.sha256(query.strip().casefold().encode("utf-8")).digest()
+    fx = int.from_bytes(digest[:4], "big") / 2 ** 32
+    fy = int.from_bytes(digest[4:8], "big") / 2 ** 32
+    lat = LAT_RANGE[0] + fx * (LAT_RANGE[1] - LAT_RANGE[0])
+    lon = LON_RANGE[0] + fy * (LON_RANGE[1] - LON_RANGE[0])
+    return round(lat, 6), round(lon, 6)
+
+
+class StubNominatimHandler(BaseHTTPRequestHandler):
+    """Answers /search like Nominatim (format=json, limit=1) and /stats with request counters"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        if url.path == "/stats":
+            return self._send_json(200, server.stats())
+
+        if url.path != "/search":
+            return self._send_json(404, {"error": "not found"})
+
+        with server.lock:
+            server.requests += 1
+        query = parse_qs(url.query).get("q", [""])[0]
+        if server.latency:
+            time.sleep(server.latency)
+
+        # Simulated upstream failures, to exercise retries
+        if server.error_rate and random.random() < server.error_rate:
+            with server.lock:
+                server.errors += 1
+            return self._send_json(503, {"error": "stub upstream error"})
+
+        # Queries starting with "unknown" and a configurable fraction of the rest are misses
+        miss = query.casefold().startswith("unknown") or (
+            server.miss_rate and random.random() < server.miss_rate)
+        if miss:
+            return self._send_json(200, [])
+
+        lat, lon = fake_coordinates(query)
+        return self._send_json(200, [{"lat": str(lat), "lon": str(lon), "display_name": query}])
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (its deadline ran out) - nothing to do
+            pass
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+
+class StubNominatimServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, miss_rate=0.0):
+        super().__init__(address, StubNominatimHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.miss_rate = miss_rate
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    @property
+    def search_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors, "latency": self.latency}
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, miss_rate=0.0):
+    """Start the stub on a background thread - port=0 picks a free port. Returns the server."""
+    server = StubNominatimServer((host, port), latency=latency, error_rate=error_rate, miss_rate=miss_rate)
+    thread = threading.Thread(target=server.serve_forever, name="stub-nominatim", daemon=True)
+    thread.start()
+    return server
+
+
+def run_geocode_benchmark(count, latency, rate, workers, error_rate=0.0):
+    """Geocode `count` synthetic place names through BatchGeocoder against the stub"""
+    from SafeCityDraft1 import BatchGeocoder, GeocodeCache
+
+    server = start_stub_server(latency=latency, error_rate=error_rate)
+    cache_dir = tempfile.mkdtemp(prefix="stub-geocode-")
+    try:
+        cache = GeocodeCache(os.path.join(cache_dir, "geocode.sqlite3"))
+        geocoder = BatchGeocoder(rate=rate, burst=workers, workers=workers, cache=cache,
+                                 url=server.search_url, backoff=0.05)
+        # Every name appears twice to exercise de-duplication
+        names = [f"Mandal {i}" for i in range(count)] * 2
+
+        started = time.perf_counter()
+        cold = geocoder.geocode_many(names)
+        cold_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        geocoder.geocode_many(names)
+        warm_time = time.perf_counter() - started
+
+        found = sum(1 for coords in cold.values() if coords)
+        print(f"📈 {count} unique places, {found} found")
+        print(f"   cold: {cold_time:.2f}s ({count / cold_time:.1f} places/s), stub saw {server.stats()['requests']} requests")
+        print(f"   warm: {warm_time:.3f}s (served from the geocode cache)")
+        print(f"   serial baseline with time.sleep(0.5): ~{count * (latency + 0.5):.1f}s")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Nominatim server for offline geocoding tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that return 503")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="fraction of requests that find nothing")
+    parser.add_argument("--bench", type=int, metavar="N", help="run a batch geocoding benchmark of N places and exit")
+    parser.add_argument("--rate", type=float, default=50.0, help="token bucket rate for --bench")
+    parser.add_argument("--workers", type=int, default=16, help="geocoding threads for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_geocode_benchmark(args.bench, args.latency, args.rate, args.workers, args.error_rate)
+    else:
+        server = StubNominatimServer((args.host, args.port), latency=args.latency,
+                                     error_rate=args.error_rate, miss_rate=args.miss_rate)
+        print(f"🧪 Stub Nominatim listening on {server.search_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SafeCityDraft1 reads its paths when it is imported, so every cache and store is pointed at a
+# scratch directory first; the sample dataset is used and nothing talks to the real Nominatim
+SCRATCH = tempfile.mkdtemp(prefix="safecity-tests-")
+for name, filename in (("SAFECITY_SNAPSHOT", "districts.npz"),
+                       ("SAFECITY_GEOCODE_CACHE", "geocode_cache.sqlite3"),
+                       ("SAFECITY_REPORTS_DB", "reports.sqlite3"),
+                       ("SAFECITY_TILE_CACHE", "tile_cache"),
+                       ("SAFECITY_TIMESERIES", "timeseries.npz")):
+    os.environ[name] = os.path.join(SCRATCH, filename)
+os.environ["SAFECITY_NOMINATIM_URL"] = "http://127.0.0.1:9/search"
+for name in ("SAFECITY_PDF_PATH", "SAFECITY_METRICS_DIR", "SAFECITY_BOUNDARIES", "SAFECITY_GAZETTEER"):
+    os.environ.pop(name, None)
+
+# The app serves assets/ and templates/ relative to the working directory
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import SafeCityDraft1  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def safecity():
+    SafeCityDraft1.warm_up()
+    yield SafeCityDraft1
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture
+def client(safecity):
+    return safecity.app.test_client()
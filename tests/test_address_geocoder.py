@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+import SafeCityDraft1
+from SafeCityDraft1 import AddressGeocoder, Deadline, FutureTimeoutError, GeocodeCache, NominatimClient
+from stub_nominatim import fake_coordinates, start_stub_server
+
+ADDRESS = "Plot 12, Road No. 36, Jubilee Hills"
+
+
+@pytest.fixture
+def stub():
+    server = start_stub_server(latency=0.2)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def geocoder(stub, tmp_path):
+    cache = GeocodeCache(str(tmp_path / "geocode_cache.sqlite3"))
+    return AddressGeocoder(workers=2, cache=cache, client=NominatimClient(url=stub.search_url))
+
+
+def expected(address):
+    return list(fake_coordinates(f"{address}, Telangana, India"))
+
+
+def test_concurrent_identical_lookups_share_one_request(geocoder, stub):
+    barrier = threading.Barrier(8)
+    results = []
+
+    def run():
+        barrier.wait()
+        results.append(geocoder.geocode(ADDRESS, deadline=Deadline(5)))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == [expected(ADDRESS)] * 8
+    assert stub.stats()["requests"] == 1
+    stats = geocoder.stats()
+    assert (stats["upstreamCalls"], stats["coalesced"], stats["inFlight"]) == (1, 7, 0)
+
+    # Spelled differently, still the same cache entry
+    assert geocoder.geocode(f"  {ADDRESS.upper()}  ") == expected(ADDRESS)
+    assert stub.stats()["requests"] == 1
+
+
+def test_upstream_calls_are_bounded_by_the_pool(geocoder, stub):
+    addresses = [f"House {i}, Banjara Hills" for i in range(6)]
+    started = time.monotonic()
+    futures = [geocoder.lookup(address) for address in addresses]
+    results = [future.result(10) for future in futures]
+    elapsed = time.monotonic() - started
+    assert results == [expected(address) for address in addresses]
+    assert stub.stats()["requests"] == 6
+    # Two workers, so at most two calls are in flight: three rounds of 0.2s each
+    assert elapsed >= 3 * 0.2 * 0.9
+
+
+def test_a_caller_that_gives_up_leaves_the_answer_in_the_cache(geocoder, stub):
+    with pytest.raises(FutureTimeoutError):
+        geocoder.geocode(ADDRESS, deadline=Deadline(0.05))
+    assert geocoder.stats()["timeouts"] == 1
+
+    # The upstream call finishes in the background and the retry is answered from the cache
+    time.sleep(0.4)
+    assert geocoder.geocode(ADDRESS, deadline=Deadline(0.05)) == expected(ADDRESS)
+    assert stub.stats()["requests"] == 1
+
+
+def test_misses_are_cached(geocoder, stub):
+    assert geocoder.geocode("Unknown Lane, Nowhere") is None
+    assert geocoder.geocode("Unknown Lane, Nowhere") is None
+    assert stub.stats()["requests"] == 1
+
+
+def test_route_geocodes_through_the_stub(client, safecity, geocoder, stub, monkeypatch):
+    monkeypatch.setattr(SafeCityDraft1, "address_geocoder", geocoder)
+    response = client.get('/api/geocode', query_string={"address": ADDRESS})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [body["latitude"], body["longitude"]] == expected(ADDRESS)
+
+    response = client.get('/api/geocode', query_string={"address": "Unknown Lane, Nowhere"})
+    assert response.status_code == 404
+
+
+def test_route_answers_503_when_the_stub_is_too_slow(client, safecity, geocoder, stub, monkeypatch):
+    monkeypatch.setattr(SafeCityDraft1, "address_geocoder", geocoder)
+    monkeypatch.setattr(SafeCityDraft1, "GEOCODE_WAIT_SECONDS", 0.05)
+    response = client.get('/api/geocode', query_string={"address": ADDRESS})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
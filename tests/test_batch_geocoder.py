@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+import SafeCityDraft1
+from SafeCityDraft1 import BatchGeocoder, GeocodeCache, NominatimClient, SingleFlight, TokenBucket
+from stub_nominatim import fake_coordinates, start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server = start_stub_server(latency=0.2)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def geocoder(stub, tmp_path, monkeypatch):
+    # A client of its own, so breaker state from other tests can't get in the way
+    monkeypatch.setattr(SafeCityDraft1, "nominatim_client", NominatimClient())
+    cache = GeocodeCache(str(tmp_path / "geocode_cache.sqlite3"))
+    return BatchGeocoder(rate=100, burst=16, workers=16, cache=cache, url=stub.search_url, backoff=0.01)
+
+
+def run_together(count, fn):
+    """Call fn from `count` threads released at the same moment - returns their results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # The burst of 5 is free, the other 10 come at 50 per second
+    assert time.monotonic() - started >= 10 / 50 * 0.9
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    assert run_together(8, lambda: flight.do("key", slow)) == ["result"] * 8
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_shares_the_error():
+    flight = SingleFlight()
+    errors = []
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("upstream")
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    run_together(4, call)
+    assert len(errors) == 4
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_identical_lookups_send_one_request(geocoder, stub):
+    results = run_together(10, lambda: geocoder.geocode("Mandal 1"))
+    assert stub.stats()["requests"] == 1
+    assert geocoder.stats()["requestsSent"] == 1
+    assert results == [list(fake_coordinates("Mandal 1, Telangana, India"))] * 10
+
+    # Later lookups are answered from the cache
+    assert geocoder.geocode("Mandal 1") == results[0]
+    assert stub.stats()["requests"] == 1
+
+
+def test_geocode_many_sends_each_name_once(geocoder, stub):
+    names = [f"Mandal {i}" for i in range(6)] * 3
+    results = geocoder.geocode_many(names)
+    assert sorted(results) == sorted(set(names))
+    assert all(results.values())
+    assert stub.stats()["requests"] == 6
+
+
+def test_misses_are_cached(geocoder, stub):
+    assert geocoder.geocode("Unknown Mandal") is None
+    assert geocoder.geocode("Unknown Mandal") is None
+    assert stub.stats()["requests"] == 1
+
+
+def test_requests_respect_the_rate_limit(geocoder, stub):
+    geocoder.limiter = TokenBucket(rate=20, capacity=1)
+    stub.latency = 0
+    started = time.monotonic()
+    geocoder.geocode_many([f"Village {i}" for i in range(11)])
+    elapsed = time.monotonic() - started
+    # 16 workers are free to go at once, but the bucket lets one request through every 50ms
+    assert stub.stats()["requests"] == 11
+    assert elapsed >= 10 / 20 * 0.9
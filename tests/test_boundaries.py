@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pytest
+
+from SafeCityDraft1 import DistrictBoundaries, load_boundaries, read_boundaries
+
+# Two districts sharing a jagged border, one with a hole, and one made of two separate parts
+# ([lng, lat] positions, as in GeoJSON)
+FEATURES = [
+    ("Hyderabad", [[[[78.3, 17.3], [78.5, 17.3], [78.55, 17.4], [78.5, 17.5], [78.3, 17.5]],
+                    [[78.35, 17.35], [78.4, 17.35], [78.4, 17.4], [78.35, 17.4]]]]),
+    ("Rangareddy", [[[[78.5, 17.3], [78.8, 17.3], [78.8, 17.5], [78.5, 17.5], [78.55, 17.4]]]]),
+    ("Warangal", [[[[79.4, 17.9], [79.6, 17.9], [79.6, 18.1], [79.4, 18.1]]],
+                  [[[79.7, 17.9], [79.9, 17.9], [79.8, 18.1]]]]),
+]
+
+
+def brute_force(features, lng, lat):
+    """First feature containing the point, by even-odd ray casting over every edge - no grid"""
+    for feature, (_, polygons) in enumerate(features):
+        for rings in polygons:
+            crossings = 0
+            for ring in rings:
+                for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                    if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                        crossings += 1
+            if crossings % 2:
+                return feature
+    return None
+
+
+def edge_points():
+    """Every vertex and edge midpoint, and points a hair away from them in each direction"""
+    points = []
+    for _, polygons in FEATURES:
+        for rings in polygons:
+            for ring in rings:
+                for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                    points += [(x1, y1), ((x1 + x2) / 2, (y1 + y2) / 2)]
+    offsets = (-1e-6, -1e-9, 0.0, 1e-9, 1e-6)
+    return [(x + dx, y + dy) for x, y in points for dx in offsets for dy in offsets]
+
+
+@pytest.mark.parametrize("grid_size", [4, 16, 128])
+def test_grid_matches_brute_force_near_edges_and_vertices(grid_size):
+    boundaries = DistrictBoundaries(FEATURES, grid_size=grid_size)
+    for lng, lat in edge_points():
+        assert boundaries.locate(lat, lng) == brute_force(FEATURES, lng, lat), (lat, lng)
+
+
+@pytest.mark.parametrize("grid_size", [4, 16, 128])
+def test_grid_matches_brute_force_everywhere(grid_size):
+    boundaries = DistrictBoundaries(FEATURES, grid_size=grid_size)
+    rng = np.random.default_rng(7)
+    for lng, lat in zip(rng.uniform(78.2, 80.0, 3000), rng.uniform(17.2, 18.2, 3000)):
+        assert boundaries.locate(lat, lng) == brute_force(FEATURES, lng, lat), (lat, lng)
+
+
+def test_known_points():
+    boundaries = DistrictBoundaries(FEATURES)
+    assert boundaries.names[boundaries.locate(17.45, 78.45)] == "Hyderabad"
+    assert boundaries.names[boundaries.locate(17.4, 78.7)] == "Rangareddy"
+    # Both parts of a multipolygon belong to the same district
+    assert boundaries.names[boundaries.locate(18.0, 79.5)] == "Warangal"
+    assert boundaries.names[boundaries.locate(17.95, 79.8)] == "Warangal"
+    # The hole, the gap between Warangal's parts and the corners of the grid's box are in no district
+    assert boundaries.locate(17.375, 78.375) is None
+    assert boundaries.locate(18.0, 79.65) is None
+    assert boundaries.locate(18.1, 78.3) is None
+    assert boundaries.locate(17.3, 79.9) is None
+
+
+@pytest.mark.parametrize("lat, lng", [(28.6139, 77.2090), (19.0760, 72.8777), (17.4, -78.5), (-17.4, 78.5)])
+def test_points_outside_the_state_are_in_no_district(lat, lng):
+    assert DistrictBoundaries(FEATURES).locate(lat, lng) is None
+
+
+def test_no_boundaries_locate_nothing():
+    boundaries = DistrictBoundaries([])
+    assert len(boundaries) == 0
+    assert boundaries.locate(17.385, 78.4867) is None
+
+
+@pytest.fixture
+def boundary_file(tmp_path):
+    features = [{"type": "Feature", "properties": {"district": name},
+                 "geometry": {"type": "MultiPolygon" if len(polygons) > 1 else "Polygon",
+                              "coordinates": polygons if len(polygons) > 1 else polygons[0]}}
+                for name, polygons in FEATURES]
+    # Features without a name are skipped
+    features.append({"type": "Feature", "properties": {},
+                     "geometry": {"type": "Polygon", "coordinates": FEATURES[1][1][0]}})
+    path = tmp_path / "boundaries.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return str(path)
+
+
+def test_read_boundaries(boundary_file):
+    assert list(read_boundaries(boundary_file)) == FEATURES
+
+
+def test_district_at_uses_the_boundaries(client, safecity, boundary_file, monkeypatch):
+    monkeypatch.setattr(safecity, "_boundaries", load_boundaries(boundary_file))
+    body = client.get('/api/district-at?lat=17.45&lng=78.45').get_json()
+    assert (body["district"]["district"], body["method"]) == ("Hyderabad", "polygon")
+    body = client.get('/api/district-at?lat=17.4&lng=78.7').get_json()
+    assert (body["district"]["district"], body["method"]) == ("Rangareddy", "polygon")
+    assert body["version"] == safecity.get_dataset().version
+
+    # Points in no polygon - the hole, or outside the state - fall back to the nearest centroid
+    for lat, lng in ((17.375, 78.375), (28.6139, 77.2090)):
+        response = client.get(f'/api/district-at?lat={lat}&lng={lng}')
+        assert response.status_code == 200
+        assert response.get_json()["method"] == "nearest"
+
+
+@pytest.mark.parametrize("query", ["", "lat=17.4", "lat=north&lng=78.5", "lat=91&lng=78.5", "lat=nan&lng=78.5",
+                                   "lat=17.4&lng=inf"])
+def test_district_at_rejects_bad_coordinates(client, query):
+    response = client.get(f'/api/district-at?{query}')
+    assert response.status_code == 400
+    assert "error" in response.get_json()
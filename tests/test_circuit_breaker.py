@@ -0,0 +1,177 @@
+import pytest
+import requests
+
+import SafeCityDraft1
+from SafeCityDraft1 import CircuitBreaker, NominatimClient, UpstreamUnavailable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(SafeCityDraft1.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_ratio=0.5, min_calls=4, window=30.0, cooldown=10.0)
+
+
+def call(breaker, ok):
+    breaker.allow()
+    breaker.record(ok)
+
+
+def open_breaker(breaker):
+    for ok in (True, False, True, False):
+        call(breaker, ok)
+    assert breaker.state == "open"
+
+
+def test_stays_closed_below_min_calls(breaker):
+    for _ in range(3):
+        call(breaker, False)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recentFailures"] == 3
+
+
+def test_stays_closed_below_failure_ratio(breaker):
+    for ok in (True, True, False, True, True, False, True):
+        call(breaker, ok)
+    assert breaker.state == "closed"
+
+
+def test_opens_at_failure_ratio_and_rejects(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(4)
+    with pytest.raises(UpstreamUnavailable) as raised:
+        breaker.allow()
+    assert raised.value.retry_after == 6
+    stats = breaker.stats()
+    assert (stats["state"], stats["opened"], stats["rejected"]) == ("open", 1, 1)
+
+
+def test_failures_outside_the_window_are_forgotten(breaker, clock):
+    for _ in range(3):
+        call(breaker, False)
+    clock.advance(31)
+    for ok in (True, True, True, False):
+        call(breaker, ok)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recentCalls"] == 4
+
+
+def test_one_probe_after_cooldown_then_closes(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(10)
+    assert breaker.allow()
+    # Only the probe goes through while it is in flight
+    with pytest.raises(UpstreamUnavailable):
+        breaker.allow()
+    breaker.record(True)
+
+    assert breaker.state == "closed"
+    assert breaker.stats()["recentCalls"] == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_for_another_cooldown(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(10)
+    breaker.allow()
+    breaker.record(False)
+
+    assert breaker.state == "open"
+    clock.advance(9)
+    with pytest.raises(UpstreamUnavailable):
+        breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_reopens_after_closing(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(10)
+    call(breaker, True)
+    open_breaker(breaker)
+    assert breaker.stats()["opened"] == 2
+
+
+@pytest.fixture
+def client_with(monkeypatch, breaker):
+    def make(fake_search):
+        monkeypatch.setattr(SafeCityDraft1, "nominatim_search", fake_search)
+        return NominatimClient(url="http://127.0.0.1:9/search", breaker=breaker, failure_ttl=60)
+    return make
+
+
+def test_client_upstream_errors_open_the_breaker(client_with, breaker):
+    def failing(query, url=None, timeout=None, session=None):
+        raise requests.ConnectionError("refused")
+
+    nominatim = client_with(failing)
+    for i in range(4):
+        with pytest.raises(requests.ConnectionError):
+            nominatim.search(f"place {i}")
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        nominatim.search("another place")
+    assert nominatim.stats()["calls"] == 4
+
+
+def test_client_remembers_failed_queries(client_with, clock):
+    calls = []
+
+    def failing(query, url=None, timeout=None, session=None):
+        calls.append(query)
+        raise requests.Timeout("slow")
+
+    nominatim = client_with(failing)
+    with pytest.raises(requests.Timeout):
+        nominatim.search("Atlantis")
+    with pytest.raises(UpstreamUnavailable):
+        nominatim.search("Atlantis")
+    # Callers doing their own retries can still ask again
+    with pytest.raises(requests.Timeout):
+        nominatim.search("Atlantis", fail_fast=False)
+    clock.advance(61)
+    with pytest.raises(requests.Timeout):
+        nominatim.search("Atlantis")
+    assert calls == ["Atlantis"] * 3
+    assert nominatim.stats()["recentFailureHits"] == 1
+
+
+def test_probe_that_raises_unexpectedly_still_reports(client_with, breaker, clock):
+    outcomes = [RuntimeError("bug in the parser"), [17.385, 78.4867]]
+
+    def flaky(query, url=None, timeout=None, session=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    nominatim = client_with(flaky)
+    open_breaker(breaker)
+    clock.advance(10)
+    with pytest.raises(RuntimeError):
+        nominatim.search("Hyderabad")
+    # The probe counted as a failure instead of leaving the breaker stuck half-open
+    assert breaker.state == "open"
+    assert not breaker._probing
+
+    clock.advance(10)
+    assert nominatim.search("Hyderabad") == [17.385, 78.4867]
+    assert breaker.state == "closed"
@@ -0,0 +1,69 @@
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def first(client):
+    response = client.get('/api/crime-data', headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    return response
+
+
+def test_full_response_has_validators(first, safecity):
+    assert first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+    assert "Accept-Encoding" in first.headers["Vary"]
+    assert first.headers["X-Dataset-Version"] == safecity.get_dataset().version
+    assert "Content-Encoding" not in first.headers
+    assert json.loads(first.data)
+
+
+def test_matching_etag_gets_304(client, first):
+    response = client.get('/api/crime-data', headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"]
+
+
+def test_etag_of_another_encoding_still_matches(client, first):
+    # A client that cached the gzip variant revalidates without asking for gzip again
+    gzipped = client.get('/api/crime-data', headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] != first.headers["ETag"]
+    assert gzip.decompress(gzipped.data) == first.data
+
+    response = client.get('/api/crime-data', headers={"Accept-Encoding": "identity",
+                                                      "If-None-Match": gzipped.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_stale_etag_gets_full_body(client, first):
+    response = client.get('/api/crime-data', headers={"If-None-Match": '"not-the-current-version"',
+                                                      "Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.data == first.data
+
+
+def test_if_modified_since(client, first):
+    response = client.get('/api/crime-data', headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+    response = client.get('/api/crime-data', headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+def test_if_none_match_wins_over_if_modified_since(client, first):
+    response = client.get('/api/crime-data', headers={"If-None-Match": '"not-the-current-version"',
+                                                      "If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 200
+
+
+def test_brotli_variant(client, first, safecity):
+    if safecity.brotli is None:
+        pytest.skip("brotli is not installed")
+    response = client.get('/api/crime-data', headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert safecity.brotli.decompress(response.data) == first.data
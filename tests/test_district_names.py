@@ -0,0 +1,53 @@
+import pytest
+
+from SafeCityDraft1 import MANUAL_NAME_INDEX, DistrictNameIndex, district_id, normalise_district_name
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("Bhupalpally", "Jayashankar Bhupalpalli"),
+    ("Jayashankar Bhupalpally", "Jayashankar Bhupalpalli"),
+    ("Medchal Malkajgiri", "Medchal-Malkajgiri"),
+    ("MEDCHAL MALKAJGIRI", "Medchal-Malkajgiri"),
+    ("MedchalMalkajgiri", "Medchal-Malkajgiri"),
+    ("Malkajgiri", "Medchal-Malkajgiri"),
+    ("Secunderabad Railway Police", "Secunderabad RP"),
+    ("Secunderabad R.P.", "Secunderabad RP"),
+    ("Secunderabad Rly Police", "Secunderabad RP"),
+    ("Cyberabad", "Cyberabad Commissionerate"),
+    ("Cyberabad Commissionarate", "Cyberabad Commissionerate"),
+    ("  hyderabad ", "Hyderabad"),
+])
+def test_spellings_resolve_to_the_canonical_name(name, canonical):
+    assert MANUAL_NAME_INDEX.canonical(name) == canonical
+
+
+@pytest.mark.parametrize("name", ["Atlantis", "Secunderabad Metro", "Hyderabad Central", "", None])
+def test_unknown_names_do_not_match(name):
+    assert MANUAL_NAME_INDEX.lookup(name) is None
+    assert MANUAL_NAME_INDEX.canonical(name) is None
+
+
+def test_first_registered_district_keeps_a_shared_key():
+    index = DistrictNameIndex(["Warangal Commissionerate", "Warangal"])
+    assert index.canonical("Warangal") == "Warangal Commissionerate"
+    assert index.canonical("Warangal Commissionerate") == "Warangal Commissionerate"
+
+
+def test_aliases_for_missing_districts_are_ignored():
+    index = DistrictNameIndex(["Hyderabad"], aliases={"Hyd": "Hyderabad", "Bhupalpally": "Jayashankar Bhupalpalli"})
+    assert index.canonical("Hyd") == "Hyderabad"
+    assert index.lookup("Bhupalpally") is None
+
+
+def test_normalised_names_and_ids():
+    assert normalise_district_name("Secunderabad R.P.") == "secunderabad railway police"
+    assert district_id("Medchal-Malkajgiri") == "medchal-malkajgiri"
+
+
+def test_dataset_finds_districts_by_any_spelling(safecity):
+    dataset = safecity.get_dataset()
+    for name in ("Bhupalpally", "Medchal Malkajgiri", "Cyberabad", "Secunderabad Railway Police"):
+        found = dataset.find(name)
+        assert found is not None
+        assert found["district"] == MANUAL_NAME_INDEX.canonical(name)
+    assert dataset.find("Atlantis") is None
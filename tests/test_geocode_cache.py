@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+
+import SafeCityDraft1
+from SafeCityDraft1 import GeocodeCache, normalise_geocode_query
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(SafeCityDraft1.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "geocode_cache.sqlite3")
+
+
+def last_access(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_access FROM geocode WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_query_normalisation():
+    key = normalise_geocode_query("Gachibowli, Hyderabad")
+    assert normalise_geocode_query("  gachibowli,   HYDERABAD, Telangana, India ") == key
+    assert normalise_geocode_query("Gachibowli, Hyderabad.") == key
+    assert normalise_geocode_query("Gachibowli, Warangal") != key
+    assert normalise_geocode_query("Gachibowli, Hyderabad", state="Karnataka") != key
+
+
+def test_hit_and_miss(path, clock):
+    cache = GeocodeCache(path)
+    assert cache.lookup("hyderabad|telangana|india") == GeocodeCache.MISSING
+    cache.put("hyderabad|telangana|india", [17.385, 78.4867])
+    assert cache.lookup("hyderabad|telangana|india") == (True, [17.385, 78.4867])
+    stats = cache.stats()
+    assert (stats["hits"], stats["negativeHits"], stats["misses"]) == (1, 0, 1)
+    assert stats["hitRatio"] == 0.5
+
+
+def test_entries_survive_a_new_instance(path, clock):
+    GeocodeCache(path).put("warangal|telangana|india", [17.9689, 79.5941])
+    assert GeocodeCache(path).lookup("warangal|telangana|india") == (True, [17.9689, 79.5941])
+
+
+def test_negative_entries_use_their_own_ttl(path, clock):
+    cache = GeocodeCache(path, ttl=1000, negative_ttl=10)
+    cache.put("atlantis|telangana|india", None)
+    cache.put("hyderabad|telangana|india", [17.385, 78.4867])
+    assert cache.lookup("atlantis|telangana|india") == (True, None)
+    assert cache.stats()["negativeHits"] == 1
+
+    clock.now += 11
+    assert cache.lookup("atlantis|telangana|india") == GeocodeCache.MISSING
+    assert cache.lookup("hyderabad|telangana|india") == (True, [17.385, 78.4867])
+    clock.now += 1000
+    assert cache.lookup("hyderabad|telangana|india") == GeocodeCache.MISSING
+
+
+def test_a_found_place_replaces_a_negative_entry(path, clock):
+    cache = GeocodeCache(path)
+    cache.put("kazipet|telangana|india", None)
+    cache.put("kazipet|telangana|india", [17.9784, 79.5036])
+    assert cache.lookup("kazipet|telangana|india") == (True, [17.9784, 79.5036])
+
+
+def test_hits_write_access_times_in_batches(path, clock, monkeypatch):
+    monkeypatch.setattr(SafeCityDraft1, "GEOCODE_TOUCH_BATCH", 3)
+    cache = GeocodeCache(path)
+    keys = [f"place {i}|telangana|india" for i in range(3)]
+    for key in keys:
+        cache.put(key, [17.0, 78.0])
+    written = clock.now
+
+    clock.now += 100
+    cache.lookup(keys[0])
+    cache.lookup(keys[1])
+    # Reads alone don't write until the batch is full
+    assert last_access(path, keys[0]) == written
+    cache.lookup(keys[2])
+    assert [last_access(path, key) for key in keys] == [written + 100] * 3
+
+
+def test_pending_access_times_are_written_with_the_next_put(path, clock):
+    cache = GeocodeCache(path)
+    cache.put("nizamabad|telangana|india", [18.6725, 78.0941])
+    clock.now += 50
+    cache.lookup("nizamabad|telangana|india")
+    assert last_access(path, "nizamabad|telangana|india") == clock.now - 50
+    cache.put("karimnagar|telangana|india", [18.4386, 79.1288])
+    assert last_access(path, "nizamabad|telangana|india") == clock.now
+
+
+def test_eviction_keeps_recently_read_entries(path, clock):
+    cache = GeocodeCache(path, max_entries=3)
+    for i in range(3):
+        cache.put(f"place {i}", [17.0, 78.0])
+        clock.now += 1
+    # Read the oldest entry - only noted in memory, but eviction must still see it
+    cache.lookup("place 0")
+    clock.now += 1
+    cache.put("place 3", [17.0, 78.0])
+
+    assert cache.lookup("place 0")[0]
+    assert cache.lookup("place 1") == GeocodeCache.MISSING
+    assert cache.lookup("place 3")[0]
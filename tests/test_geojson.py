@@ -0,0 +1,47 @@
+import pytest
+
+from SafeCityDraft1 import ClusterIndex
+
+
+def record(name, lat, lng, crimes=10, risk="low"):
+    return {"district": name, "id": name.lower(), "latitude": lat, "longitude": lng,
+            "crimeCount": crimes, "riskLevel": risk}
+
+
+@pytest.fixture
+def index():
+    return ClusterIndex([record("Fiji", -17.7, 178.0), record("Samoa", -13.8, -172.1, risk="high"),
+                         record("Hyderabad", 17.385, 78.4867)])
+
+
+@pytest.mark.parametrize("zoom", [3, 20])
+def test_bbox_across_the_antimeridian_covers_both_sides(index, zoom):
+    features = index.features((170.0, -30.0, -165.0, 0.0), zoom)
+    assert sorted(f["properties"]["district"] for f in features) == ["Fiji", "Samoa"]
+
+
+def test_bbox_not_crossing_the_antimeridian(index):
+    features = index.features((70.0, 10.0, 90.0, 25.0), 20)
+    assert [f["properties"]["district"] for f in features] == ["Hyderabad"]
+
+
+def test_low_zoom_returns_clusters(safecity):
+    dataset = safecity.get_dataset()
+    features = dataset.cluster_index().features((-180, -90, 180, 90), 0)
+    clusters = [f["properties"] for f in features if f["properties"]["cluster"]]
+    assert clusters
+    points = len(features) - len(clusters)
+    assert sum(c["pointCount"] for c in clusters) + points == len(dataset.districts)
+
+
+def test_endpoint_accepts_an_antimeridian_bbox(client):
+    response = client.get('/api/crime-data.geojson?bbox=170,-30,-170,0&zoom=5')
+    assert response.status_code == 200
+    assert response.get_json()["type"] == "FeatureCollection"
+
+
+@pytest.mark.parametrize("bbox", ["1,2,3", "a,b,c,d", "78,20,79,10", "190,10,200,20", "nan,10,80,20",
+                                  "-inf,10,inf,20"])
+def test_endpoint_rejects_bad_bboxes(client, bbox):
+    response = client.get(f'/api/crime-data.geojson?bbox={bbox}&zoom=7')
+    assert response.status_code == 400
@@ -0,0 +1,126 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from SafeCityDraft1 import HEAT_MAX_ZOOM, HEAT_TILE_SIZE, DatasetSnapshot, HeatmapRenderer, TileCache
+
+# Tile 6/45/28 covers Hyderabad, 6/0/0 is open ocean
+HYDERABAD_TILE = (6, 45, 28)
+EMPTY_TILE = (6, 0, 0)
+
+
+def decode_png(data):
+    """(width, height, rgba array) of a PNG written by encode_png, checking every chunk's CRC"""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks, offset = [], 8
+    while offset < len(data):
+        length, tag = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xFFFFFFFF
+        chunks.append((tag, body))
+        offset += 12 + length
+    assert [tag for tag, _ in chunks] == [b"IHDR", b"IDAT", b"IEND"]
+    width, height, depth, colour_type = struct.unpack(">IIBB", chunks[0][1][:10])
+    assert (depth, colour_type) == (8, 6)
+    raw = np.frombuffer(zlib.decompress(chunks[1][1]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert not raw[:, 0].any()
+    return width, height, raw[:, 1:].reshape(height, width, 4)
+
+
+@pytest.fixture
+def renderer(safecity):
+    return HeatmapRenderer(safecity.get_dataset().districts)
+
+
+def test_tiles_are_valid_pngs(renderer):
+    width, height, rgba = decode_png(renderer.render(*HYDERABAD_TILE))
+    assert (width, height) == (HEAT_TILE_SIZE, HEAT_TILE_SIZE)
+    assert rgba[..., 3].any()
+
+    width, height, rgba = decode_png(renderer.render(*EMPTY_TILE))
+    assert (width, height) == (HEAT_TILE_SIZE, HEAT_TILE_SIZE)
+    assert not rgba.any()
+
+
+def test_tile_cache_memory_and_disk(tmp_path):
+    cache = TileCache(str(tmp_path), max_items=2)
+    assert cache.get("v1", 6, 45, 28) is None
+    cache.put("v1", 6, 45, 28, b"tile")
+    assert cache.get("v1", 6, 45, 28) == b"tile"
+    assert cache.get("v2", 6, 45, 28) is None
+
+    # A new process finds the tile on disk
+    other = TileCache(str(tmp_path))
+    assert other.get("v1", 6, 45, 28) == b"tile"
+    assert other.get("v1", 6, 45, 28) == b"tile"
+    assert (other.stats()["diskHits"], other.stats()["hits"]) == (1, 1)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["diskHits"], stats["misses"]) == (1, 0, 2)
+
+
+def test_tile_cache_is_bounded_and_drops_old_versions(tmp_path):
+    cache = TileCache(str(tmp_path), max_items=2, keep_versions=1)
+    for y in range(3):
+        cache.put("v1", 6, 45, y, b"tile")
+    assert cache.stats()["items"] == 2
+    cache.put("v2", 6, 45, 0, b"new")
+    assert not (tmp_path / "v1").exists()
+    assert TileCache(str(tmp_path)).get("v1", 6, 45, 1) is None
+
+
+def test_route_serves_cached_tiles_for_the_same_version(client, safecity):
+    first = client.get('/tiles/heat/%d/%d/%d.png' % HYDERABAD_TILE)
+    assert first.status_code == 200
+    assert first.mimetype == "image/png"
+    decode_png(first.data)
+
+    hits = safecity.tile_cache.stats()["hits"]
+    second = client.get('/tiles/heat/%d/%d/%d.png' % HYDERABAD_TILE)
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert safecity.tile_cache.stats()["hits"] == hits + 1
+
+    response = client.get('/tiles/heat/%d/%d/%d.png' % HYDERABAD_TILE,
+                          headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_new_dataset_version_renders_new_tiles(client, safecity, monkeypatch):
+    before = client.get('/tiles/heat/%d/%d/%d.png' % HYDERABAD_TILE)
+    dataset = safecity.get_dataset()
+    records = [dict(d) for d in dataset.districts]
+    for record in records:
+        if record["district"] != "Hyderabad":
+            record["crimeCount"] = 1
+    changed = DatasetSnapshot(records, None)
+    assert changed.version != dataset.version
+    monkeypatch.setattr(safecity, "get_dataset", lambda: changed)
+
+    misses = safecity.tile_cache.stats()["misses"]
+    after = client.get('/tiles/heat/%d/%d/%d.png' % HYDERABAD_TILE)
+    assert after.status_code == 200
+    assert safecity.tile_cache.stats()["misses"] == misses + 1
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.data != before.data
+
+
+@pytest.mark.parametrize("z, x, y", [
+    (HEAT_MAX_ZOOM + 1, 0, 0),
+    (0, 1, 0),
+    (0, 0, 1),
+    (6, 64, 28),
+    (6, 45, 64),
+])
+def test_out_of_range_tiles_get_404(client, z, x, y):
+    response = client.get(f'/tiles/heat/{z}/{x}/{y}.png')
+    assert response.status_code == 404
+    assert response.get_json()["error"]
+
+
+@pytest.mark.parametrize("path", ['/tiles/heat/-1/0/0.png', '/tiles/heat/6/-1/28.png', '/tiles/heat/6/a/28.png'])
+def test_malformed_tile_paths_get_404(client, path):
+    assert client.get(path).status_code == 404
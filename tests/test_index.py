@@ -0,0 +1,32 @@
+from email.utils import parsedate_to_datetime
+
+
+def test_last_modified_is_the_same_in_every_worker(client, safecity):
+    response = client.get('/')
+    assert response.status_code == 200
+    last_modified = parsedate_to_datetime(response.headers["Last-Modified"]).timestamp()
+    dataset = safecity.get_dataset()
+    assert last_modified == max(dataset.last_modified, safecity.asset_pipeline.last_modified)
+
+    # Another worker (or the next restart) builds the same assets and reports the same time
+    other = safecity.AssetPipeline()
+    other.build()
+    assert other.version == safecity.asset_pipeline.version
+    assert other.last_modified == safecity.asset_pipeline.last_modified
+
+
+def test_if_modified_since_gets_304(client):
+    first = client.get('/')
+    response = client.get('/', headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+    response = client.get('/', headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_page_links_fingerprinted_assets(client, safecity):
+    page = client.get('/').get_data(as_text=True)
+    for name, hashed in safecity.asset_pipeline.manifest.items():
+        assert f"/static/build/{hashed}" in page
+        response = client.get(f"/static/build/{hashed}")
+        assert response.status_code == 200
+        assert "immutable" in response.headers["Cache-Control"]
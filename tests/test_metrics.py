@@ -0,0 +1,65 @@
+import os
+import re
+
+from SafeCityDraft1 import MetricsRegistry
+
+
+def sample(text, name, **labels):
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_cache_lookups_are_a_counter(client):
+    before = client.get('/metrics').get_data(as_text=True)
+    assert "# TYPE safecity_cache_lookups_total counter" in before
+    assert "safecity_cache_lookups " not in before
+
+    client.get('/api/crime-data')
+    after = client.get('/metrics').get_data(as_text=True)
+    assert (sample(after, "safecity_cache_lookups_total", cache="dataset", result="hit")
+            > sample(before, "safecity_cache_lookups_total", cache="dataset", result="hit"))
+
+
+def test_tile_cache_counts_every_lookup(client, safecity):
+    stats = safecity.tile_cache.stats()
+    before = stats["hits"] + stats["diskHits"] + stats["misses"]
+    for _ in range(3):
+        assert client.get('/tiles/heat/6/45/28.png').status_code == 200
+    stats = safecity.tile_cache.stats()
+    assert stats["hits"] + stats["diskHits"] + stats["misses"] == before + 3
+
+
+def make_registry(directory):
+    registry = MetricsRegistry(str(directory))
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    return registry, requests, latency
+
+
+def test_render_sums_every_process_and_folds_exited_ones(tmp_path):
+    registry, requests, latency = make_registry(tmp_path)
+    requests.inc("/a", amount=2)
+    latency.observe(0.05)
+    # Another worker's published samples
+    other = {"test_requests_total": [[["/a"], 3], [["/b"], 1]],
+             "test_latency_seconds": [[[], [[0, 1, 0], 0.5, 1]]]}
+    registry._write_state(os.path.join(str(tmp_path), "metrics-999999.json"), other)
+
+    text = registry.render()
+    assert sample(text, "test_requests_total", route="/a") == 5
+    assert sample(text, "test_requests_total", route="/b") == 1
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 2' in text
+    assert "test_latency_seconds_count 2" in text
+
+    registry.fold_process(999999)
+    assert not os.path.exists(os.path.join(str(tmp_path), "metrics-999999.json"))
+    assert registry.render() == text
+
+
+def test_without_a_directory_only_this_process_is_reported():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    requests.inc("/a")
+    assert sample(registry.render(), "test_requests_total", route="/a") == 1
@@ -0,0 +1,34 @@
+import pytest
+
+
+def test_nearest_first_within_radius(client):
+    response = client.get('/api/nearby-districts?lat=17.385&lng=78.4867&k=5&radius_km=150')
+    assert response.status_code == 200
+    distances = [d["distance"] for d in response.get_json()]
+    assert distances == sorted(distances)
+    assert 0 < len(distances) <= 5
+    assert all(distance <= 150 for distance in distances)
+
+
+def test_zero_radius_only_matches_exact_points(client):
+    response = client.get('/api/nearby-districts?lat=0&lng=0&radius_km=0')
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+@pytest.mark.parametrize("query", [
+    "lat=17.385&lng=78.4867&radius_km=nan",
+    "lat=17.385&lng=78.4867&radius_km=inf",
+    "lat=17.385&lng=78.4867&radius_km=-inf",
+    "lat=17.385&lng=78.4867&radius_km=-1",
+    "lat=17.385&lng=78.4867&radius_km=far",
+    "lat=nan&lng=78.4867",
+    "lat=17.385&lng=inf",
+    "lat=91&lng=78.4867",
+    "lng=78.4867",
+    "lat=17.385&lng=78.4867&k=0",
+])
+def test_bad_parameters_get_400(client, query):
+    response = client.get(f'/api/nearby-districts?{query}')
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pytest
+
+from SafeCityDraft1 import EARTH_RADIUS_KM, nearest_k_batch
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+
+def brute_force(point_lats, point_lons, target_lats, target_lons, k):
+    results = []
+    for lat, lon in zip(point_lats, point_lons):
+        distances = [haversine_km(lat, lon, t_lat, t_lon) for t_lat, t_lon in zip(target_lats, target_lons)]
+        order = sorted(range(len(distances)), key=lambda i: distances[i])[:k]
+        results.append((order, [distances[i] for i in order]))
+    return results
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(7)
+    # Telangana-sized spread, plus points near the poles and across the antimeridian
+    target_lats = np.concatenate([rng.uniform(15.8, 19.9, 200), [89.5, -89.5, 10.0, 10.0]])
+    target_lons = np.concatenate([rng.uniform(77.2, 81.3, 200), [0.0, 45.0, 179.9, -179.9]])
+    point_lats = np.concatenate([rng.uniform(15.0, 20.5, 50), [89.9, 10.0]])
+    point_lons = np.concatenate([rng.uniform(76.5, 82.0, 50), [120.0, 179.95]])
+    return point_lats, point_lons, target_lats, target_lons
+
+
+@pytest.mark.parametrize("k", [1, 5, 204, 500])
+def test_matches_brute_force_haversine(points, k):
+    point_lats, point_lons, target_lats, target_lons = points
+    indices, distances = nearest_k_batch(point_lats, point_lons, target_lats, target_lons, k)
+    expected = brute_force(point_lats, point_lons, target_lats, target_lons, k)
+
+    assert indices.shape == distances.shape == (len(point_lats), min(k, len(target_lats)))
+    for row, (order, expected_distances) in enumerate(expected):
+        np.testing.assert_allclose(distances[row], expected_distances, rtol=1e-9, atol=1e-9)
+        # Ties aside, the same targets come back in the same order
+        np.testing.assert_allclose(
+            [haversine_km(point_lats[row], point_lons[row], target_lats[i], target_lons[i]) for i in indices[row]],
+            expected_distances, rtol=1e-9, atol=1e-9)
+
+
+def test_chunked_rows_give_the_same_answer(points):
+    point_lats, point_lons, target_lats, target_lons = points
+    whole = nearest_k_batch(point_lats, point_lons, target_lats, target_lons, 3)
+    # max_cells smaller than one row still computes one row per chunk
+    chunked = nearest_k_batch(point_lats, point_lons, target_lats, target_lons, 3, max_cells=10)
+    np.testing.assert_array_equal(whole[0], chunked[0])
+    np.testing.assert_array_equal(whole[1], chunked[1])
+
+
+def test_antimeridian_neighbour_is_nearest():
+    indices, distances = nearest_k_batch([10.0], [179.95], [10.0, 10.0, 10.0], [170.0, -179.9, 179.0], 1)
+    assert indices[0, 0] == 1
+    assert distances[0, 0] == pytest.approx(haversine_km(10.0, 179.95, 10.0, -179.9))
+
+
+def test_empty_inputs():
+    indices, distances = nearest_k_batch([], [], [17.0], [78.0], 3)
+    assert indices.shape == distances.shape == (0, 1)
+    indices, distances = nearest_k_batch([17.0], [78.0], [], [], 3)
+    assert indices.shape == distances.shape == (1, 0)
+
+
+def test_batch_endpoint_matches_brute_force(client, safecity):
+    districts = safecity.get_dataset().districts
+    points = [{"lat": 17.385, "lng": 78.4867}, [18.0, 79.5], {"lat": 16.2, "lon": 80.1}]
+    response = client.post('/api/nearby-districts/batch', json={"points": points, "k": 4})
+    assert response.status_code == 200
+
+    coords = [(17.385, 78.4867), (18.0, 79.5), (16.2, 80.1)]
+    expected = brute_force([lat for lat, _ in coords], [lng for _, lng in coords],
+                           [d['latitude'] for d in districts], [d['longitude'] for d in districts], 4)
+    for result, (order, expected_distances) in zip(response.get_json()["results"], expected):
+        assert [d['distance'] for d in result['nearest']] == [round(d, 3) for d in expected_distances]
+        assert result['riskLevel'] == districts[order[0]]['riskLevel']
+
+
+@pytest.mark.parametrize("body", [[[17.0, 78.0]], "points", {"points": []}, {"points": [[95.0, 78.0]]},
+                                  {"points": [[17.0, 78.0]], "k": 0}])
+def test_batch_endpoint_rejects_bad_input(client, body):
+    response = client.post('/api/nearby-districts/batch', json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,113 @@
+import pytest
+
+from SafeCityDraft1 import REPORT_MAX_DESCRIPTION, _parse_report
+
+HYDERABAD = {"lat": 17.385, "lng": 78.4867}
+
+
+@pytest.mark.parametrize("body", [[], [17.385, 78.4867], [HYDERABAD], "theft", 42, None, True])
+def test_parse_report_rejects_non_objects(safecity, body):
+    with pytest.raises(ValueError):
+        _parse_report(body)
+
+
+@pytest.mark.parametrize("data", ['[]', '[{"lat": 17.385, "lng": 78.4867}]', '"theft"', '42', 'null',
+                                  'not json', ''])
+def test_non_object_bodies_get_400(client, data):
+    response = client.post('/api/reports', data=data, content_type="application/json")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"lng": 78.4867},
+    {"lat": "north", "lng": 78.4867},
+    {"lat": [17.385], "lng": 78.4867},
+    {"lat": 91, "lng": 78.4867},
+    {"lat": 17.385, "lng": -181},
+    dict(HYDERABAD, category="graffiti"),
+    dict(HYDERABAD, category=None),
+    dict(HYDERABAD, description="x" * (REPORT_MAX_DESCRIPTION + 1)),
+])
+def test_invalid_reports_get_400(client, body):
+    response = client.post('/api/reports', json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_parse_report_normalises_fields(safecity):
+    report = _parse_report(dict(HYDERABAD, category="  Theft ", description="  phone snatched  "))
+    assert report["category"] == "theft"
+    assert report["description"] == "phone snatched"
+    assert report["latitude"] == 17.385 and report["longitude"] == 78.4867
+    assert report["districtId"]
+
+    # No category is "other"; a longitude may also be sent as lon
+    report = _parse_report({"lat": 17.385, "lon": 78.4867})
+    assert report["category"] == "other"
+
+
+def test_named_district_wins_over_location(safecity):
+    district = safecity.get_dataset().districts[-1]
+    report = _parse_report(dict(HYDERABAD, district=district['district']))
+    assert report["districtId"] == district['id']
+
+    # Unknown or malformed names fall back to the district the point is in
+    located = _parse_report(HYDERABAD)["districtId"]
+    for name in ("Atlantis", ["Hyderabad"], {"name": "Hyderabad"}, 5):
+        assert _parse_report(dict(HYDERABAD, district=name))["districtId"] == located
+
+
+def test_accepted_report_updates_aggregates(client):
+    before = client.get('/api/reports/aggregates').get_json()
+    response = client.post('/api/reports', json=dict(HYDERABAD, category="accident"))
+    assert response.status_code == 201
+    created = response.get_json()
+
+    after = client.get('/api/reports/aggregates').get_json()
+    assert created["id"] == after["lastId"]
+    assert after["total"] == before["total"] + 1
+    assert after["byCategory"]["accident"] == before["byCategory"].get("accident", 0) + 1
+    assert after["byDistrict"][created["districtId"]] == before["byDistrict"].get(created["districtId"], 0) + 1
+    assert sum(cell["count"] for cell in after["cells"]) == after["total"]
+
+    assert client.get('/api/reports/aggregates?cells=0').get_json()["cells"] == []
+
+
+def test_rejected_report_is_not_stored(client):
+    before = client.get('/api/reports/aggregates?cells=0').get_json()["total"]
+    client.post('/api/reports', json=[HYDERABAD])
+    assert client.get('/api/reports/aggregates?cells=0').get_json()["total"] == before
+
+
+def test_slow_writer_gets_503_with_retry_after(client, safecity, monkeypatch):
+    def slow_append(report, timeout=5.0):
+        raise safecity.FutureTimeoutError()
+
+    monkeypatch.setattr(safecity.report_log, "append", slow_append)
+    response = client.post('/api/reports', json=HYDERABAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "error" in response.get_json()
+
+
+def test_report_abandoned_in_the_queue_is_not_stored(safecity, tmp_path):
+    log = safecity.ReportLog(str(tmp_path / "reports.sqlite3"))
+    report = _parse_report(HYDERABAD)
+    # Hold the writer thread inside a listener so the next report waits in the queue
+    release = safecity.threading.Event()
+    log.listeners.append(lambda rows: release.wait(10))
+    first = safecity.threading.Thread(target=log.append, args=(report,))
+    first.start()
+    while log.batches == 0:
+        safecity.time.sleep(0.01)
+
+    with pytest.raises(safecity.FutureTimeoutError):
+        log.append(report, timeout=0.1)
+    log.listeners.clear()
+    release.set()
+    first.join(5)
+
+    assert log.append(report) == 2
+    assert log.catch_up().total == 2
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from SafeCityDraft1 import SNAPSHOT_FORMAT_VERSION, load_snapshot, snapshot_source_sha256, write_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = [{"district": "Hyderabad", "crimeCount": 120, "latitude": 17.385, "longitude": 78.4867}]
+
+
+def corrupt(path):
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot")
+
+
+def truncated(path):
+    write_snapshot(SAMPLE, path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+
+def old_format(path):
+    write_snapshot(SAMPLE, path)
+    with np.load(path, allow_pickle=False) as data:
+        columns = {name: data[name] for name in data.files}
+    columns["format_version"] = np.array(SNAPSHOT_FORMAT_VERSION - 1, dtype=np.int32)
+    with open(path, "wb") as f:
+        np.savez(f, **columns)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "districts.npz")
+    write_snapshot(SAMPLE, path)
+    assert load_snapshot(path) == SAMPLE
+    assert snapshot_source_sha256(path) == ""
+
+
+@pytest.mark.parametrize("damage", [corrupt, truncated, old_format])
+def test_unusable_snapshot_has_no_source_hash(tmp_path, damage):
+    path = str(tmp_path / "districts.npz")
+    damage(path)
+    assert snapshot_source_sha256(path) is None
+
+
+@pytest.mark.parametrize("damage", [corrupt, truncated, old_format])
+def test_import_survives_an_unusable_snapshot_and_warm_up_rebuilds_it(tmp_path, damage):
+    path = str(tmp_path / "districts.npz")
+    damage(path)
+    env = dict(os.environ,
+               SAFECITY_SNAPSHOT=path,
+               SAFECITY_GEOCODE_CACHE=str(tmp_path / "geocode_cache.sqlite3"),
+               SAFECITY_REPORTS_DB=str(tmp_path / "reports.sqlite3"),
+               SAFECITY_TILE_CACHE=str(tmp_path / "tile_cache"),
+               SAFECITY_TIMESERIES=str(tmp_path / "timeseries.npz"))
+    script = ("import SafeCityDraft1 as app\n"
+              "assert app.dataset_cache.stats()['version'] is None\n"
+              "app.warm_up()\n"
+              "print('districts', len(app.get_dataset().districts))\n")
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert "is unreadable" in result.stdout
+    assert snapshot_source_sha256(path) == ""
+    assert len(load_snapshot(path)) > 1
+
+
+def test_unreadable_snapshot_is_dataset_unavailable(safecity, tmp_path):
+    # The request path answers DatasetUnavailable with a 503 rather than a 500
+    path = str(tmp_path / "districts.npz")
+    corrupt(path)
+    cache = safecity.DatasetCache(path, safecity._load_snapshot)
+    with pytest.raises(safecity.DatasetUnavailable):
+        cache.get()
@@ -0,0 +1,130 @@
+import json
+import time
+
+import pytest
+
+from SafeCityDraft1 import STREAM_BUFFER_SIZE, DatasetSnapshot, EventHub, StreamSubscriber
+
+HYDERABAD = {"lat": 17.385, "lng": 78.4867}
+
+
+def next_event(subscriber, timeout=5.0):
+    """The next message delivered to `subscriber`, failing the test if none arrives in time"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        messages = subscriber.drain(deadline - time.monotonic())
+        if messages:
+            assert len(messages) == 1
+            return messages[0]
+    pytest.fail("no event delivered")
+
+
+def read_sse(chunks):
+    """Next event from a streamed /api/stream body as (event, data), skipping comments and retry lines"""
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.decode("utf-8").splitlines() if line)
+        if "event" in fields:
+            return fields["event"], json.loads(fields["data"])
+    pytest.fail("stream ended")
+
+
+def changed_dataset(dataset):
+    records = [dict(d) for d in dataset.districts]
+    records[0]["crimeCount"] += 1
+    return DatasetSnapshot(records, None)
+
+
+def test_subscriber_overflow_asks_for_a_resync(safecity):
+    subscriber = StreamSubscriber(buffer_size=3)
+    for i in range(1, 3):
+        subscriber.push({"id": i, "event": "reports", "data": {}})
+    assert [m["id"] for m in subscriber.drain(0)] == [1, 2]
+
+    for i in range(3, 8):
+        subscriber.push({"id": i, "event": "reports", "data": {}})
+    assert subscriber.drain(0) == [{"id": 7, "event": "resync",
+                                    "data": {"version": safecity.get_dataset().version}}]
+    # Back to deltas once the client has been told
+    subscriber.push({"id": 8, "event": "reports", "data": {}})
+    assert subscriber.drain(0)[0]["event"] == "reports"
+
+
+def test_hub_resyncs_a_client_that_fell_behind(safecity):
+    hub = EventHub(poll_interval=3600, max_subscribers=2)
+    subscriber = hub.subscribe()
+    for i in range(STREAM_BUFFER_SIZE + 1):
+        hub.publish("reports", {"lastId": i})
+    assert next_event(subscriber)["event"] == "resync"
+
+
+def test_hub_rejects_subscribers_beyond_its_limit(safecity):
+    hub = EventHub(poll_interval=3600, max_subscribers=2)
+    first, second = hub.subscribe(), hub.subscribe()
+    assert first and second
+    assert hub.subscribe() is None
+    assert hub.stats()["rejected"] == 1
+
+    hub.unsubscribe(first)
+    assert hub.subscribe() is not None
+
+
+def test_hub_publishes_dataset_changes(safecity, monkeypatch):
+    hub = EventHub(poll_interval=3600)
+    subscriber = hub.subscribe()
+    dataset = safecity.get_dataset()
+    changed = changed_dataset(dataset)
+    monkeypatch.setattr(safecity, "get_dataset", lambda: changed)
+    hub.wake()
+
+    message = next_event(subscriber)
+    assert message["event"] == "dataset"
+    assert message["data"]["version"] == changed.version
+    assert message["data"]["previousVersion"] == dataset.version
+    assert message["data"]["changed"] == [changed.districts[0]]
+    assert message["data"]["removed"] == []
+
+
+def test_hub_publishes_report_deltas(safecity, client):
+    hub = EventHub(poll_interval=3600)
+    subscriber = hub.subscribe()
+    created = client.post('/api/reports', json=HYDERABAD).get_json()
+    hub.wake()
+
+    message = next_event(subscriber)
+    assert message["event"] == "reports"
+    assert message["data"]["lastId"] == created["id"]
+    by_district = client.get('/api/reports/aggregates?cells=0').get_json()["byDistrict"]
+    assert message["data"]["byDistrict"] == {created["districtId"]: by_district[created["districtId"]]}
+
+
+def test_stream_says_hello_then_sends_report_deltas(client, safecity):
+    response = client.get('/api/stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    chunks = iter(response.response)
+    try:
+        event, hello = read_sse(chunks)
+        aggregates = client.get('/api/reports/aggregates?cells=0').get_json()
+        assert event == "hello"
+        assert hello == {"version": safecity.get_dataset().version,
+                         "reportsLastId": aggregates["lastId"],
+                         "reportsByDistrict": aggregates["byDistrict"]}
+
+        # A report written by this process is pushed straight away
+        created = client.post('/api/reports', json=HYDERABAD).get_json()
+        event, delta = read_sse(chunks)
+        assert event == "reports"
+        assert delta["lastId"] == created["id"]
+        assert created["districtId"] in delta["byDistrict"]
+    finally:
+        response.close()
+    assert safecity.event_hub.stats()["subscribers"] == 0
+
+
+def test_stream_is_503_when_no_slot_is_free(client, safecity, monkeypatch):
+    monkeypatch.setattr(safecity, "event_hub", EventHub(max_subscribers=0))
+    response = client.get('/api/stream')
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(safecity.STREAM_POLL_FALLBACK_SECONDS)
+    assert response.get_json()["pollInterval"] == safecity.STREAM_POLL_FALLBACK_SECONDS
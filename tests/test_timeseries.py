@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pytest
+
+from SafeCityDraft1 import TIMESERIES_PATH, TimeSeriesStore, format_period, parse_period
+
+DISTRICTS = ["Hyderabad", "Warangal", "Nizamabad"]
+FIRST, LAST = parse_period("2019-03"), parse_period("2021-10")
+
+
+@pytest.fixture
+def monthly():
+    rng = np.random.default_rng(3)
+    counts = {(d, m): int(rng.integers(0, 50)) for d in DISTRICTS for m in range(FIRST, LAST + 1)}
+    rows = [(d, format_period(m, "month"), c) for (d, m), c in counts.items()]
+    return TimeSeriesStore.from_rows(rows), counts
+
+
+def expected_sums(store, counts, first, last, bucket_months):
+    # Brute force: add up every stored month that falls in each calendar bucket
+    first, last = max(first, store.start), min(last, store.end - 1)
+    starts = range(first // bucket_months * bucket_months, last + 1, bucket_months)
+    return [[sum(counts.get((name, m), 0) for m in range(max(s, first), min(s + bucket_months - 1, last) + 1))
+             for s in starts] for name in store.districts]
+
+
+def test_parse_and_format_period():
+    assert parse_period("2021-07") == 2021 * 12 + 6
+    assert parse_period("2021") == 2021 * 12
+    assert parse_period("2021", end=True) == 2021 * 12 + 11
+    assert format_period(parse_period("2021-07"), "month") == "2021-07"
+    assert format_period(parse_period("2021-07"), "quarter") == "2021-Q3"
+    assert format_period(parse_period("2021-07"), "year") == "2021"
+    for text in ("2021-13", "2021-00", "21", "July 2021", ""):
+        with pytest.raises(ValueError):
+            parse_period(text)
+
+
+@pytest.mark.parametrize("granularity, bucket_months", [("month", 1), ("quarter", 3), ("year", 12)])
+@pytest.mark.parametrize("first, last", [("2019-03", "2021-10"), ("2019-05", "2020-02"), ("2020-12", "2020-12"),
+                                         ("2018-01", "2019-04"), ("2021-08", "2023-12"), ("2017", "2025")])
+def test_range_query_matches_brute_force(monthly, granularity, bucket_months, first, last):
+    store, counts = monthly
+    first, last = parse_period(first), parse_period(last, end=True)
+    labels, sums = store.query(first, last, granularity)
+
+    expected = expected_sums(store, counts, first, last, bucket_months)
+    assert sums.tolist() == expected
+    assert len(labels) == len(expected[0])
+    clamped = max(first, store.start)
+    assert labels[0] == format_period(clamped // bucket_months * bucket_months, granularity)
+
+
+def test_total_granularity(monthly):
+    store, counts = monthly
+    first, last = parse_period("2019-11"), parse_period("2021-02")
+    labels, sums = store.query(first, last, "total")
+    assert labels == ["2019-11..2021-02"]
+    assert sums[:, 0].tolist() == [sum(counts[(d, m)] for m in range(first, last + 1)) for d in DISTRICTS]
+
+
+def test_range_outside_the_data_is_empty(monthly):
+    store, _ = monthly
+    labels, sums = store.query(parse_period("2010"), parse_period("2012", end=True), "year")
+    assert labels == []
+    assert sums.shape == (len(DISTRICTS), 0)
+
+
+def test_yearly_store_cannot_answer_finer_buckets():
+    store = TimeSeriesStore.from_rows([("Hyderabad", "2019", 10), ("Hyderabad", "2021", 5), ("Warangal", "2020", 7)])
+    assert store.granularity == "year"
+    labels, sums = store.query(store.start, store.end - 1)
+    assert labels == ["2019", "2020", "2021"]
+    assert sums.tolist() == [[10, 0, 5], [0, 7, 0]]
+    for granularity in ("month", "quarter"):
+        with pytest.raises(ValueError):
+            store.query(store.start, store.end - 1, granularity)
+    with pytest.raises(ValueError):
+        store.query(store.start, store.end - 1, "week")
+
+
+def test_duplicate_rows_are_summed():
+    store = TimeSeriesStore.from_rows([("Hyderabad", "2020-01", 3), ("Hyderabad", "2020-01", 4),
+                                       ("Hyderabad", "2020-03", 1)])
+    assert store.counts.tolist() == [[7, 0, 1]]
+
+
+def test_save_and_load_round_trip(monthly, tmp_path):
+    store, _ = monthly
+    path = str(tmp_path / "timeseries.npz")
+    store.save(path)
+    loaded = TimeSeriesStore.load(path)
+    assert loaded.districts == store.districts
+    assert (loaded.start, loaded.step) == (store.start, store.step)
+    np.testing.assert_array_equal(loaded.counts, store.counts)
+
+
+@pytest.fixture
+def published(monthly, safecity):
+    store, counts = monthly
+    store.save(TIMESERIES_PATH)
+    yield store, counts
+    os.remove(TIMESERIES_PATH)
+
+
+def test_crime_data_range_endpoint(client, published):
+    store, counts = published
+    response = client.get('/api/crime-data?from=2020-02&to=2020&granularity=quarter')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["granularity"] == "quarter"
+    assert body["periods"] == ["2020-Q1", "2020-Q2", "2020-Q3", "2020-Q4"]
+
+    expected = expected_sums(store, counts, parse_period("2020-02"), parse_period("2020", end=True), 3)
+    assert [d["series"] for d in body["districts"]] == expected
+    assert [d["total"] for d in body["districts"]] == [sum(series) for series in expected]
+    hyderabad = body["districts"][0]
+    assert hyderabad["district"] == "Hyderabad" and hyderabad["latitude"] is not None
+
+
+@pytest.mark.parametrize("query", ["from=2020-13", "to=soon", "granularity=week"])
+def test_crime_data_range_endpoint_rejects_bad_input(client, published, query):
+    response = client.get(f'/api/crime-data?{query}')
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_crime_data_range_without_a_store(client, safecity):
+    assert not os.path.exists(TIMESERIES_PATH)
+    response = client.get('/api/crime-data?from=2020')
+    assert response.status_code == 404